@@ -0,0 +1,196 @@
+# Per-session resolution and frame-rate tiers driven by RTCP, REMB and track cadence
+
+import asyncio
+from aiortc.rtp import RtcpPsfbPacket, RTCP_PSFB_APP, unpack_remb_fci
+from pipeline_log import get_logger
+
+log = get_logger("adaptive")
+
+# (fraction of the full size, fps divisor), best first
+TIERS = ((1.0, 1), (1.0, 2), (0.75, 2), (0.5, 2), (0.5, 3))
+
+
+def tiers_for(width, height, fps, tiers=TIERS):
+    """[(width, height, stride)] for a session whose full size and rate are width x height at fps."""
+    result = []
+    for scale, stride in tiers:
+        tier = (int(width * scale) // 2 * 2, int(height * scale) // 2 * 2, min(stride, fps))
+        if tier not in result:
+            result.append(tier)
+    return result
+
+
+class TierPolicy:
+    """Decides which tier a session should be on from one round of signals.
+
+    Any congestion signal that persists for `down_after` rounds steps one
+    tier down; `up_after` clean rounds in a row step one tier up, so a
+    session doesn't flap between two tiers. Signals (None if unknown):
+    fraction_lost and rtt from RTCP receiver reports, bitrate from REMB and
+    send_rate (what we actually sent, bps), recv_interval from the track
+    (how fast the sender asks for frames) and skipped_ratio, the share of
+    produced frames the track never sent. Stepping up needs REMB room for
+    the send rate scaled by the next tier's pixel rate.
+    """
+
+    def __init__(self, tiers, fps, down_after=2, up_after=5, max_loss=0.05, max_rtt=0.3, max_lag=1.3,
+                 max_skipped=0.2):
+        self.tiers = tiers
+        self.fps = fps
+        self.down_after = down_after
+        self.up_after = up_after
+        self.max_loss = max_loss
+        self.max_rtt = max_rtt
+        self.max_lag = max_lag
+        self.max_skipped = max_skipped
+        self.index = 0
+        self.bad = 0
+        self.good = 0
+        self.reason = None
+
+    def pixel_rate(self, index):
+        width, height, stride = self.tiers[index]
+        return width * height * self.fps / stride
+
+    def congestion(self, signals):
+        """Why the current tier is too much for this peer, or None."""
+        lost = signals.get("fraction_lost")
+        if lost is not None and lost > self.max_loss:
+            return "loss"
+        rtt = signals.get("rtt")
+        if rtt is not None and rtt > self.max_rtt:
+            return "rtt"
+        bitrate, sent = signals.get("bitrate"), signals.get("send_rate")
+        if bitrate is not None and sent is not None and sent > bitrate:
+            return "bandwidth"
+        interval = signals.get("recv_interval")
+        if interval is not None and interval > self.max_lag * self.tiers[self.index][2] / self.fps:
+            return "slow_sender"
+        skipped = signals.get("skipped_ratio")
+        if skipped is not None and skipped > self.max_skipped:
+            return "lag"
+        return None
+
+    def has_room(self, signals):
+        bitrate, sent = signals.get("bitrate"), signals.get("send_rate")
+        if bitrate is None or sent is None:
+            return True
+        return bitrate >= sent * self.pixel_rate(self.index - 1) / self.pixel_rate(self.index)
+
+    def update(self, signals):
+        """Feed one round of signals; returns the tier index to use."""
+        self.reason = self.congestion(signals)
+        if self.reason is not None:
+            self.bad, self.good = self.bad + 1, 0
+            if self.bad >= self.down_after and self.index < len(self.tiers) - 1:
+                self.index += 1
+                self.bad = 0
+        else:
+            self.good, self.bad = self.good + 1, 0
+            if self.good >= self.up_after and self.index > 0 and self.has_room(signals):
+                self.index -= 1
+                self.good = 0
+        return self.index
+
+
+def watch_remb(sender, callback):
+    """Call `callback(bitrate)` for every REMB the peer sends about this sender.
+
+    aiortc only hands REMB to its own encoder, so this wraps the sender's
+    RTCP handler; the packet is still processed as before.
+    """
+    handle = sender._handle_rtcp_packet
+
+    async def handle_rtcp_packet(packet):
+        if isinstance(packet, RtcpPsfbPacket) and packet.fmt == RTCP_PSFB_APP:
+            try:
+                bitrate, ssrcs = unpack_remb_fci(packet.fci)
+            except ValueError:
+                pass
+            else:
+                if sender._ssrc in ssrcs:
+                    callback(bitrate)
+        await handle(packet)
+
+    sender._handle_rtcp_packet = handle_rtcp_packet
+
+
+class AdaptiveController:
+    """Moves one peer's producer between tiers, so rendering and encoding both scale down.
+
+    Every `interval` seconds it gathers the peer's signals, asks the
+    TierPolicy for a tier and, on a change, requests that size and frame
+    stride from the producer through the session's FrameRing and paces the
+    track to the new frame rate.
+    """
+
+    def __init__(self, ring, track, sender, fps, interval=1.0, policy=None):
+        self.ring = ring
+        self.track = track
+        self.sender = sender
+        self.fps = fps
+        self.interval = interval
+        self.tiers = tiers_for(ring.width, ring.height, fps)
+        self.policy = policy or TierPolicy(self.tiers, fps)
+        self.remb = None
+        self.changes = 0
+        self._seen = (0, 0)  # (last_seq, frames_skipped) at the previous round
+        self._sent = None  # (time, bytesSent) at the previous round
+        self._task = None
+        if sender is not None:
+            watch_remb(sender, self._on_remb)
+
+    def _on_remb(self, bitrate):
+        self.remb = bitrate
+
+    @property
+    def tier(self):
+        return self.tiers[self.policy.index]
+
+    async def signals(self):
+        signals = {"bitrate": self.remb, "recv_interval": self.track.recv_interval}
+        if self.sender is not None:
+            for stats in (await self.sender.getStats()).values():
+                if stats.type == "remote-inbound-rtp":
+                    signals["fraction_lost"] = stats.fractionLost / 256  # RTCP's 8-bit fixed point
+                    signals["rtt"] = stats.roundTripTime
+                elif stats.type == "outbound-rtp":
+                    now = asyncio.get_running_loop().time()
+                    if self._sent is not None and now > self._sent[0]:
+                        signals["send_rate"] = 8 * (stats.bytesSent - self._sent[1]) / (now - self._sent[0])
+                    self._sent = (now, stats.bytesSent)
+        seq, skipped = self.track.last_seq, self.track.frames_skipped
+        if seq > self._seen[0]:
+            signals["skipped_ratio"] = (skipped - self._seen[1]) / (seq - self._seen[0])
+        self._seen = (seq, skipped)
+        return signals
+
+    def apply(self, index):
+        width, height, stride = self.tiers[index]
+        self.ring.request(width, height, stride)
+        self.track.frame_duration = stride / self.fps
+        self.changes += 1
+
+    async def step(self):
+        index = self.policy.index
+        if self.policy.update(await self.signals()) != index:
+            self.apply(self.policy.index)
+            width, height, stride = self.tier
+            log.info("Tier changed", width=width, height=height, fps=self.fps / stride,
+                     reason=self.policy.reason or "recovered")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.step()
+            except Exception as e:
+                log.error("Adaptive step failed", error=e)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self.run())
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
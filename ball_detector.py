@@ -0,0 +1,87 @@
+# Vectorized reference ball detector, the server-side twin of the browser tracker
+
+import numpy as np
+from renderer import planes
+
+
+def green_mask(frame, pixel_format="bgr24"):
+    """Ball pixels of a BGR frame or an I420 chroma pair, as the browser's isGreen() tests them."""
+    if pixel_format == "bgr24":
+        return (frame[..., 1] > 150) & (frame[..., 2] < 100) & (frame[..., 0] < 100)
+    u, v = frame
+    # Pure green is U~54, V~34 and black is U=V=128; chroma alone separates them.
+    return (u < 90) & (v < 90)
+
+
+class BallDetector:
+    """Finds the ball centroid in FrameProducer / BouncingBallTrack frames.
+
+    Like detectBallAndSendCoordinates in index.html it averages the green
+    pixels on a grid of every `stride`-th row and column, but as one NumPy
+    mask over a strided view rather than a per-pixel loop. I420 frames are
+    searched on the half-size chroma planes, which are already downsampled.
+
+    With `roi` set, the search is limited to a window of +/- roi pixels
+    around the predicted position (the last detection unless one is
+    given). If the ball reaches the window's edge the window is recentred
+    on what was found, and if the ball is still cut off, or not there at
+    all, the whole frame is searched; a clipped ball would bias the
+    centroid towards the window.
+    """
+
+    def __init__(self, width, height, pixel_format="bgr24", stride=2, roi=None):
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self.stride = stride
+        self.roi = roi
+        self.last = None
+        self.searched = 0  # grid points tested by the latest detect()
+        self._clipped = False  # the latest _search() found ball pixels on an inner edge of its window
+
+    def detect(self, frame, predicted=None):
+        """Return the (x, y) centroid in frame pixels, or None if no ball is visible."""
+        if predicted is None:
+            predicted = self.last
+        found = None
+        if self.roi is not None and predicted is not None:
+            found = self._search(frame, self._window(predicted))
+            if found is not None and self._clipped:
+                found = self._search(frame, self._window(found))
+                if self._clipped:
+                    found = None
+        if found is None:
+            found = self._search(frame, (0, 0, self.width, self.height))
+        self.last = found
+        return found
+
+    def _window(self, centre):
+        # Aligned to the chroma grid and the stride, so the ROI samples the same points as a full search.
+        step = 2 * self.stride
+        x0 = max(0, int(centre[0] - self.roi) // step * step)
+        y0 = max(0, int(centre[1] - self.roi) // step * step)
+        return x0, y0, min(self.width, int(centre[0] + self.roi) + 1), min(self.height, int(centre[1] + self.roi) + 1)
+
+    def _search(self, frame, window):
+        x0, y0, x1, y1 = window
+        if self.pixel_format == "bgr24":
+            step, offset = self.stride, 0.0
+            mask = green_mask(frame[y0:y1:step, x0:x1:step])
+        else:
+            # A chroma sample covers a 2x2 luma block centred half a pixel in.
+            step, offset = 2 * max(1, self.stride // 2), 0.5
+            (_, _), (u, _), (v, _) = planes(frame, self.pixel_format)
+            grid = np.s_[y0 // 2:(y1 + 1) // 2:step // 2, x0 // 2:(x1 + 1) // 2:step // 2]
+            mask = green_mask((u[grid], v[grid]), self.pixel_format)
+        self.searched = mask.size
+        self._clipped = mask.size > 0 and bool(
+            (y0 > 0 and mask[0].any()) or (y1 < self.height and mask[-1].any())
+            or (x0 > 0 and mask[:, 0].any()) or (x1 < self.width and mask[:, -1].any()))
+        rows = np.count_nonzero(mask, axis=1)
+        count = int(rows.sum())
+        if not count:
+            return None
+        cols = np.count_nonzero(mask, axis=0)
+        x = x0 + step * float(cols @ np.arange(len(cols))) / count + offset
+        y = y0 + step * float(rows @ np.arange(len(rows))) / count + offset
+        return x, y
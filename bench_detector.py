@@ -0,0 +1,39 @@
+# Benchmarks BallDetector throughput on rendered frames, full-frame and ROI
+
+import argparse
+import time
+from bouncing_ball import BouncingBall
+from renderer import FrameRenderer
+from ball_detector import BallDetector
+
+
+def bench_detect(width=640, height=480, pixel_format="bgr24", stride=2, roi=None, frames=300):
+    """Return detections per second over `frames` frames of a moving ball."""
+    ball = BouncingBall(width, height, radius=20)
+    renderer = FrameRenderer(width, height, pixel_format=pixel_format)
+    clip = []
+    for _ in range(frames):
+        ball.step(1 / 30)
+        clip.append(renderer.render(ball.field).copy())
+    detector = BallDetector(width, height, pixel_format, stride=stride, roi=roi)
+
+    start = time.perf_counter()
+    for frame in clip:
+        detector.detect(frame)
+    return frames / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the reference ball detector.")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=300, help="Frames timed per configuration")
+    parser.add_argument("--roi", type=int, default=48, help="ROI half-size for the tracked runs")
+    args = parser.parse_args()
+
+    print(f"{'format':>8} {'stride':>6} {'search':>6} {'fps':>10}")
+    for pixel_format in ("bgr24", "yuv420p"):
+        for stride in (1, 2, 4):
+            for roi in (None, args.roi):
+                fps = bench_detect(args.width, args.height, pixel_format, stride, roi, args.frames)
+                print(f"{pixel_format:>8} {stride:>6} {'roi' if roi else 'full':>6} {fps:>10.0f}")
@@ -0,0 +1,37 @@
+# Benchmarks BallField step time as the ball count grows
+
+import argparse
+import time
+from bouncing_ball import BallField
+
+
+def bench_step(count, collisions=True, steps=20, density=600.0, seed=0):
+    """Return mean milliseconds per step for a field of `count` balls.
+
+    The field is sized so every ball gets roughly `density` square pixels,
+    which keeps cell occupancy comparable across counts.
+    """
+    height = int((count * density / 2) ** 0.5)
+    width = 2 * height
+    field = BallField.random(count, width, height, radius=(3, 6), seed=seed, collisions=collisions)
+    field.step(1 / 60)  # warm up the grid
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        field.step(1 / 60)
+    return (time.perf_counter() - start) / steps * 1000.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark BallField step time against ball count.")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 5000, 10000, 50000, 100000])
+    parser.add_argument("--steps", type=int, default=20, help="Steps timed per count")
+    parser.add_argument("--budget", type=float, default=33.3, help="Frame budget in milliseconds")
+    parser.add_argument("--no-collisions", action="store_true", help="Time wall reflections only")
+    args = parser.parse_args()
+
+    print(f"{'balls':>8} {'ms/step':>10} {'us/ball':>10}  budget")
+    for count in args.counts:
+        ms = bench_step(count, collisions=not args.no_collisions, steps=args.steps)
+        status = "ok" if ms <= args.budget else "over"
+        print(f"{count:>8} {ms:>10.2f} {ms * 1000 / count:>10.3f}  {status}")
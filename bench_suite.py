@@ -0,0 +1,201 @@
+# Benchmarks every pipeline stage, saves JSON baselines and flags regressions against one
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import numpy as np
+from av.video.frame import VideoFrame
+from bouncing_ball import BouncingBall
+from renderer import FrameRenderer
+from frame_ring import FrameRing
+from frame_worker import FrameProducer
+from video_track import BouncingBallTrack, VideoFramePool
+from bench_transport import bench_queue, bench_ring, RESOLUTIONS
+
+LOWER = "lower"  # times: a bigger value is a regression
+HIGHER = "higher"  # rates: a smaller value is a regression
+
+
+def timed(fn, iterations):
+    """Mean milliseconds per call of fn()."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000.0
+
+
+def bench_ball_step(iterations=20000):
+    ball = BouncingBall(640, 480, radius=40, speed=(400, 300))
+    return timed(lambda: ball.step(1 / 30), iterations)
+
+
+def bench_ball_render(iterations=300):
+    ball = BouncingBall(640, 480, radius=40, speed=(400, 300))
+    return timed(lambda: (ball.step(1 / 30), ball.render()), iterations)
+
+
+def bench_renderer(pixel_format, iterations=1000):
+    ball = BouncingBall(640, 480, radius=40, speed=(400, 300))
+    renderer = FrameRenderer(640, 480, buffers=2, pixel_format=pixel_format)
+    return timed(lambda: (ball.step(1 / 30), ball.render(renderer)), iterations)
+
+
+def bench_producer_fps(seconds=1.0):
+    """Frames per second FrameProducer sustains when it never waits for a deadline."""
+    ring = FrameRing(width=640, height=480, slots=3)
+    try:
+        producer = FrameProducer(ring, fps=10000, duration=seconds, incremental=True)
+        start = time.perf_counter()
+        producer.run()
+        return producer.clock_stats["frames"] / (time.perf_counter() - start)
+    finally:
+        ring.close()
+
+
+def bench_track_recv(pixel_format="bgr24", iterations=300):
+    """Mean ms from a committed ring frame to the VideoFrame recv() returns."""
+    ring = FrameRing(width=640, height=480, slots=4, pixel_format=pixel_format)
+    track = BouncingBallTrack(ring, fps=30)
+
+    async def run():
+        total = 0.0
+        for i in range(iterations):
+            seq, _, view = ring.begin_write()
+            view[0, 0] = i % 256
+            ring.commit(seq, pts=i * 3000)
+            start = time.perf_counter()
+            await track.recv()
+            total += time.perf_counter() - start
+            del view
+        return total / iterations * 1000.0
+
+    try:
+        return asyncio.run(run())
+    finally:
+        track.pool = None
+        track.last_frame = None
+        ring.close()
+
+
+def rendered_frame(pixel_format):
+    ball = BouncingBall(640, 480, radius=40)
+    return FrameRenderer(640, 480, pixel_format=pixel_format).render(ball.field).copy()
+
+
+def bench_video_frame(pixel_format, iterations=500):
+    """Mean ms to turn one ndarray frame into a freshly allocated av.VideoFrame."""
+    frame = rendered_frame(pixel_format)
+    return timed(lambda: VideoFrame.from_ndarray(frame, format=pixel_format), iterations)
+
+
+def bench_frame_pool(pixel_format, iterations=500):
+    """Mean ms to copy one ndarray frame into a pooled av.VideoFrame."""
+    frame = rendered_frame(pixel_format)
+    pool = VideoFramePool.for_array(frame)
+    return timed(lambda: pool.fill(frame), iterations)
+
+
+def stages():
+    """{name: (callable, unit, better)} for every benchmarked stage."""
+    suite = {
+        "ball_step_ms": (bench_ball_step, "ms", LOWER),
+        "ball_render_ms": (bench_ball_render, "ms", LOWER),
+        "renderer_bgr24_ms": (lambda: bench_renderer("bgr24"), "ms", LOWER),
+        "renderer_yuv420p_ms": (lambda: bench_renderer("yuv420p"), "ms", LOWER),
+        "producer_fps": (bench_producer_fps, "fps", HIGHER),
+        "track_recv_bgr24_ms": (lambda: bench_track_recv("bgr24"), "ms", LOWER),
+        "track_recv_yuv420p_ms": (lambda: bench_track_recv("yuv420p"), "ms", LOWER),
+        "video_frame_bgr24_ms": (lambda: bench_video_frame("bgr24"), "ms", LOWER),
+        "video_frame_yuv420p_ms": (lambda: bench_video_frame("yuv420p"), "ms", LOWER),
+        "frame_pool_bgr24_ms": (lambda: bench_frame_pool("bgr24"), "ms", LOWER),
+        "frame_pool_yuv420p_ms": (lambda: bench_frame_pool("yuv420p"), "ms", LOWER),
+    }
+    for label, (width, height) in RESOLUTIONS.items():
+        suite[f"queue_{label}_ms"] = (lambda w=width, h=height: bench_queue(w, h, 20), "ms", LOWER)
+        suite[f"ring_{label}_ms"] = (lambda w=width, h=height: bench_ring(w, h, 20), "ms", LOWER)
+    return suite
+
+
+def run_suite(names=None, repeat=5, progress=None):
+    """Run each stage `repeat` times after one warm-up run and keep the median, to damp scheduler noise."""
+    results = {}
+    for name, (bench, unit, better) in stages().items():
+        if names and name not in names:
+            continue
+        bench()  # page faults, imports and caches on the first run
+        samples = [bench() for _ in range(repeat)]
+        results[name] = {"value": statistics.median(samples), "unit": unit, "better": better,
+                         "spread": (max(samples) - min(samples)) / 2}
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.15):
+    """[(name, baseline, current, change)] for the stages that got worse by more than `threshold`.
+
+    `change` is the fractional slowdown: +0.2 means 20% slower (or 20%
+    fewer fps). Stages missing from either run are ignored.
+    """
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or not before["value"]:
+            continue
+        change = (now["value"] - before["value"]) / before["value"]
+        if now["better"] == HIGHER:
+            change = -change
+        if change > threshold:
+            regressions.append((name, before["value"], now["value"], change))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage against a stored baseline.")
+    parser.add_argument("--output", help="Write the results to this JSON file (e.g. to refresh a baseline)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Exit non-zero if a stage regressed against BASELINE")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed fractional slowdown per stage")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per stage; the median is kept")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", choices=list(stages()), help="Run only these stages")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    def report(name, result):
+        line = f"{name:>28} {result['value']:>12.4f} {result['unit']:<4}"
+        before = baseline and baseline["results"].get(name)
+        if before:
+            line += f" baseline {before['value']:>12.4f}"
+        print(line, flush=True)
+
+    results = run_suite(args.only, args.repeat, progress=report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {args.output}")
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for name, before, now, change in regressions:
+            print(f"REGRESSION {name}: {before:.4f} -> {now:.4f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage regressed by more than {args.threshold:.0%}")
@@ -0,0 +1,63 @@
+# Benchmarks handing frames over through mp.Queue versus the shared-memory FrameRing
+
+import argparse
+import multiprocessing as mp
+import time
+import numpy as np
+from frame_ring import FrameRing
+
+RESOLUTIONS = {"480p": (640, 480), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+
+def bench_queue(width, height, frames=50):
+    """Mean ms for put() then get() of one frame through mp.Queue.
+
+    This is the pickle, pipe copy and unpickle path FrameProducer uses.
+    """
+    queue = mp.Queue(maxsize=2)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    queue.put(frame)
+    queue.get()  # start the feeder thread outside the timing
+
+    start = time.perf_counter()
+    for i in range(frames):
+        frame[0, 0, 0] = i
+        queue.put(frame)
+        got = queue.get()
+    elapsed = time.perf_counter() - start
+    assert got[0, 0, 0] == (frames - 1) % 256
+    queue.close()
+    return elapsed / frames * 1000.0
+
+
+def bench_ring(width, height, frames=50, slots=4):
+    """Mean ms to publish one frame rendered in place and get a view of it."""
+    ring = FrameRing(width=width, height=height, slots=slots)
+    try:
+        start = time.perf_counter()
+        last = -1
+        for i in range(frames):
+            seq, _, view = ring.begin_write()
+            view[0, 0, 0] = i
+            ring.commit(seq)
+            last, got = ring.latest(last)
+        elapsed = time.perf_counter() - start
+        assert got[0, 0, 0] == (frames - 1) % 256
+        del got, view
+        return elapsed / frames * 1000.0
+    finally:
+        ring.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare frame transport cost per resolution.")
+    parser.add_argument("--frames", type=int, default=50, help="Frames timed per transport")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    args = parser.parse_args()
+
+    print(f"{'res':>6} {'queue ms':>10} {'ring ms':>10} {'speedup':>9}")
+    for label in args.resolutions:
+        width, height = RESOLUTIONS[label]
+        queue_ms = bench_queue(width, height, args.frames)
+        ring_ms = bench_ring(width, height, args.frames)
+        print(f"{label:>6} {queue_ms:>10.3f} {ring_ms:>10.4f} {queue_ms / ring_ms:>8.0f}x")
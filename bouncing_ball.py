@@ -2,31 +2,164 @@
 
 import numpy as np
 import cv2
+from collisions import SpatialHash, resolve_collisions
+from pipeline_log import get_logger
+from renderer import FrameRenderer
+
+log = get_logger("ball")
+
+
+def reflect(start, velocity, lo, hi, t):
+    """Exact wall-bouncing trajectory along one axis: a triangle wave in t.
+
+    Returns (position, velocity) at each t (seconds after `start`), for a
+    point moving at `velocity` and bouncing elastically between lo and hi.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    span = hi - lo
+    if span <= 0:
+        return np.full(t.shape, lo, dtype=np.float64), np.zeros(t.shape)
+    # Unfold the walls into a line of period 2 * span, then fold back.
+    unfolded = np.mod(start - lo + velocity * t, 2 * span)
+    forward = unfolded <= span
+    position = lo + np.where(forward, unfolded, 2 * span - unfolded)
+    return position, np.where(forward, velocity, -velocity)
+
+
+class BallField:
+    """Many balls stored as contiguous arrays and stepped in one batch."""
+
+    def __init__(self, width, height, positions, velocities, radii, collisions=False):
+        self.width = width
+        self.height = height
+        self.positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 2)
+        self.velocities = np.ascontiguousarray(velocities, dtype=np.float32).reshape(-1, 2)
+        self.radii = np.ascontiguousarray(
+            np.broadcast_to(np.asarray(radii, dtype=np.float32), (len(self.positions),))
+        )
+        self.bounds = np.array([width, height], dtype=np.float32)
+        self.collisions = collisions
+        self.contacts = 0
+        self._grid = None
+
+    @classmethod
+    def random(cls, count, width, height, radius=(4, 12), speed=400.0, seed=None, collisions=False):
+        """Scatter `count` balls uniformly with random headings."""
+        rng = np.random.default_rng(seed)
+        radii = rng.uniform(radius[0], radius[1], count).astype(np.float32)
+        positions = np.empty((count, 2), dtype=np.float32)
+        positions[:, 0] = rng.uniform(radii, width - radii)
+        positions[:, 1] = rng.uniform(radii, height - radii)
+        angle = rng.uniform(0, 2 * np.pi, count)
+        velocities = np.stack([np.cos(angle), np.sin(angle)], axis=1) * speed
+        return cls(width, height, positions, velocities, radii, collisions=collisions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def step(self, dt: float):
+        """Advance every ball by dt seconds and reflect off the walls."""
+        pos = self.positions
+        vel = self.velocities
+        pos += vel * np.float32(dt)
+
+        lo = self.radii[:, None]
+        hi = self.bounds - lo
+        below = pos < lo
+        above = pos > hi
+        np.copyto(pos, np.broadcast_to(lo, pos.shape), where=below)
+        np.copyto(pos, hi, where=above)
+        np.negative(vel, out=vel, where=below | above)
+
+        if self.collisions and len(pos) > 1:
+            self.collide()
+
+    def collide(self):
+        """Resolve ball-to-ball contacts through the spatial hash."""
+        cell = 2.0 * float(self.radii.max())
+        if self._grid is None or self._grid.cell_size != cell:
+            self._grid = SpatialHash(self.width, self.height, cell)
+        self._grid.rebuild(self.positions)
+        pairs_i, pairs_j = self._grid.candidate_pairs()
+        self.contacts = resolve_collisions(self.positions, self.velocities, self.radii, pairs_i, pairs_j)
+
 
 class BouncingBall:
-    def __init__(self, width, height, radius=20, speed=(400, 300)):
+    """Single-ball view over a BallField."""
+
+    def __init__(self, width, height, radius=20, speed=(400, 300), field=None, index=0):
+        if field is None:
+            field = BallField(width, height, [[width // 2, height // 2]], [speed], [radius])
+        self.field = field
+        self.index = index
         self.width = width
         self.height = height
-        self.radius = radius
-        self.position = np.array([width // 2, height // 2], dtype=np.float32)
-        self.velocity = np.array(speed, dtype=np.float32)
+        self._renderers = {}  # pixel format -> FrameRenderer for render() calls without one
+
+    @property
+    def position(self):
+        return self.field.positions[self.index]
+
+    @position.setter
+    def position(self, value):
+        self.field.positions[self.index] = value
+
+    @property
+    def velocity(self):
+        return self.field.velocities[self.index]
+
+    @velocity.setter
+    def velocity(self, value):
+        self.field.velocities[self.index] = value
+
+    @property
+    def radius(self):
+        return int(self.field.radii[self.index])
 
     def step(self, dt: float):
         """Update ball position by dt seconds, handle wall collisions."""
-        self.position += self.velocity * dt
-
-        for i in range(2):  # 0: x, 1: y
-            if self.position[i] - self.radius < 0:
-                self.position[i] = self.radius
-                self.velocity[i] *= -1
-            elif self.position[i] + self.radius > (self.width if i == 0 else self.height):
-                self.position[i] = (self.width if i == 0 else self.height) - self.radius
-                self.velocity[i] *= -1
-
-    def render(self):
-        """Render current ball position to a frame (numpy image)."""
-        print("[Ball] Rendering at", tuple(self.position.astype(int)))
-        
+        self.field.step(dt)
+
+    def _trajectory(self, t):
+        radius = float(self.field.radii[self.index])
+        return [reflect(float(self.position[axis]), float(self.velocity[axis]), radius, bound - radius, t)
+                for axis, bound in enumerate((self.width, self.height))]
+
+    def position_at(self, t):
+        """Exact position t seconds after the current state, without stepping.
+
+        `t` may be an array; the result then has shape t.shape + (2,). Unlike
+        step(), this never depends on dt and ignores ball-to-ball collisions.
+        """
+        (x, _), (y, _) = self._trajectory(t)
+        return np.stack([x, y], axis=-1)
+
+    def velocity_at(self, t):
+        """Velocity t seconds after the current state; see position_at."""
+        (_, vx), (_, vy) = self._trajectory(t)
+        return np.stack([vx, vy], axis=-1)
+
+    def render(self, renderer=None, index=None, pixel_format="bgr24"):
+        """Render current ball position to a frame (numpy image).
+
+        With a FrameRenderer the frame is a reused buffer (buffer `index`
+        if given) that only had the previous ball box cleared; otherwise a
+        fresh frame is returned. pixel_format="yuv420p" draws straight
+        into I420 planes (see renderer.frame_shape for the layout) with a
+        renderer kept per format, so its sprites are rasterized once.
+        """
+        if log.debug_on:
+            log.debug_every("render", 1.0, "Rendering", position=self.get_position())
+
+        if renderer is not None:
+            return renderer.render(self.field, index)
+        if pixel_format != "bgr24":
+            renderer = self._renderers.get(pixel_format)
+            if renderer is None:
+                renderer = self._renderers[pixel_format] = FrameRenderer(self.width, self.height,
+                                                                         pixel_format=pixel_format)
+            return renderer.render(self.field).copy()
+
         frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
         center = tuple(self.position.astype(int))
         cv2.circle(frame, center, self.radius, (0, 255, 0), -1)
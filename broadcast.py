@@ -0,0 +1,116 @@
+# One producer rendering into a shared ring, fanned out to many tracks
+
+import asyncio
+import multiprocessing as mp
+from frame_ring import FrameRing
+from frame_signal import FrameSignal
+from frame_timeline import FrameTimeline
+from frame_worker import FrameProducer
+from video_track import BouncingBallTrack
+from pipeline_log import get_logger
+
+log = get_logger("broadcast")
+
+
+class Subscription:
+    """A subscriber's wakeup on a FrameBroadcast, used by a track in place of a FrameSignal.
+
+    The read cursor is the track's own `last_seq` into the shared ring, so
+    every subscriber moves at its own pace: a peer that stops reading just
+    falls behind and resumes at the newest frame, and never holds up the
+    producer or the other peers.
+    """
+
+    def __init__(self, broadcast):
+        self.broadcast = broadcast
+        self._ready = asyncio.Event()
+
+    def wake(self):
+        self._ready.set()
+
+    async def wait(self, timeout):
+        """Wait up to `timeout` seconds for a new frame; True if one arrived."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._ready.clear()
+        return True
+
+    def detach(self):
+        self.broadcast.unsubscribe(self)
+
+
+class FrameBroadcast:
+    """Renders one scene once per frame for any number of viewers.
+
+    A single FrameProducer draws into a FrameRing. The loop watches the
+    producer's FrameSignal once and sets each subscriber's event, so
+    adding a viewer costs one event and one VideoFrame pool instead of a
+    process, a simulation and a render.
+    """
+
+    def __init__(self, width=640, height=480, fps=30, slots=6, pixel_format="bgr24", duration=None,
+                 producer=True, metrics=None):
+        self.fps = fps
+        self.ring = FrameRing(width=width, height=height, slots=slots, pixel_format=pixel_format)
+        self.signal = FrameSignal()
+        self.timeline = FrameTimeline(fps=fps)
+        self.stop_event = mp.Event()
+        self.subscribers = set()
+        self.encoders = {}  # bitrate -> encoded_track.TierEncoder
+        self.metrics = metrics  # SharedMetrics the producer writes; released by whoever created it
+        self.producer = None
+        if producer:
+            self.producer = FrameProducer(self.ring, fps=fps, stop_event=self.stop_event, duration=duration,
+                                          signal=self.signal, incremental=True, timeline=self.timeline,
+                                          metrics=metrics)
+
+    def start(self):
+        if self.producer is not None and not self.producer.is_alive():
+            self.producer.start()
+            log.info("Broadcast producer started", width=self.ring.width, height=self.ring.height, fps=self.fps)
+        return self
+
+    def _on_frame(self):
+        for subscription in self.subscribers:
+            subscription.wake()
+
+    def subscribe(self):
+        """A new Subscription; call from the event loop that will serve the track."""
+        self.signal.attach(on_frame=self._on_frame)
+        subscription = Subscription(self)
+        self.subscribers.add(subscription)
+        log.debug("Subscriber added", subscribers=len(self.subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+        log.debug("Subscriber removed", subscribers=len(self.subscribers))
+
+    def track(self):
+        """A BouncingBallTrack reading this broadcast through its own cursor."""
+        return BouncingBallTrack(self.ring, fps=self.fps, signal=self.subscribe())
+
+    @property
+    def idle(self):
+        return not self.subscribers
+
+    async def aclose(self, timeout=2.0):
+        """stop() for the event loop: the producer is joined on an executor thread, so other peers keep running."""
+        self.stop_event.set()
+        if self.producer is not None and self.producer.pid is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.producer.join, timeout)
+        self.stop(timeout=0)
+
+    def stop(self, timeout=2.0):
+        for encoder in self.encoders.values():
+            encoder.close()
+        self.stop_event.set()
+        if self.producer is not None and self.producer.pid is not None:
+            self.producer.join(timeout)
+        self.subscribers.clear()
+        self.signal.close()
+        self.ring.close()
+        self.timeline.close()
+        log.info("Broadcast stopped")
@@ -0,0 +1,50 @@
+# Fixed-layout binary coords/error messages for WebTransport datagrams
+
+import struct
+import numpy as np
+
+VERSION = 1
+COORDS = 1
+ERRORS = 2
+
+# version, message kind, sample count; then `count` little-endian samples
+HEADER = struct.Struct("<BBH")
+
+# frame is the producer frame id (-1 if unknown); media_time is the video
+# element's mediaTime in seconds (NaN if unknown). seq is the client's
+# sample number and comes back on the matching error.
+COORDS_SAMPLE = np.dtype([("seq", "<u4"), ("frame", "<i4"), ("media_time", "<f4"), ("x", "<f4"), ("y", "<f4")])
+ERROR_SAMPLE = np.dtype([("seq", "<u4"), ("error_x", "<f4"), ("error_y", "<f4")])
+
+_SAMPLES = {COORDS: COORDS_SAMPLE, ERRORS: ERROR_SAMPLE}
+
+
+def encode(kind, samples):
+    """Pack a structured array (or sequence of tuples) of `kind` samples."""
+    samples = np.asarray(samples, dtype=_SAMPLES[kind])
+    return HEADER.pack(VERSION, kind, len(samples)) + samples.tobytes()
+
+
+def decode(data):
+    """Return (kind, samples) where samples is a read-only view over `data`."""
+    if len(data) < HEADER.size:
+        raise ValueError("datagram shorter than header")
+    version, kind, count = HEADER.unpack_from(data)
+    if version != VERSION or kind not in _SAMPLES:
+        raise ValueError(f"unknown datagram version {version} kind {kind}")
+    dtype = _SAMPLES[kind]
+    if len(data) < HEADER.size + count * dtype.itemsize:
+        raise ValueError("truncated datagram")
+    return kind, np.frombuffer(data, dtype=dtype, count=count, offset=HEADER.size)
+
+
+def encode_coords(samples):
+    return encode(COORDS, samples)
+
+
+def encode_errors(seq, error_x, error_y):
+    samples = np.empty(len(seq), dtype=ERROR_SAMPLE)
+    samples["seq"] = seq
+    samples["error_x"] = error_x
+    samples["error_y"] = error_y
+    return encode(ERRORS, samples)
@@ -0,0 +1,183 @@
+# Encode-once H.264 packets fanned out to every peer watching a broadcast scene
+
+import asyncio
+import fractions
+import threading
+import time
+from collections import deque
+import av
+from aiortc import MediaStreamTrack
+from aiortc.mediastreams import MediaStreamError
+from video_track import VideoFramePool
+from pipeline_log import get_logger
+from metrics import REGISTRY, ENCODER_METRICS
+
+log = get_logger("encoder")
+metrics = REGISTRY.local(ENCODER_METRICS)
+
+
+class TierEncoder:
+    """Encodes a FrameBroadcast once at one bitrate and hands the packets to every track.
+
+    aiortc packetizes av.Packets a track returns (RTCRtpSender skips its own
+    encoder for them), so N peers on a tier cost one libx264 encode rather
+    than N. The packets since the last keyframe are kept so a late joiner
+    can start decoding straight away. The encoder state is swapped out
+    under a lock, so close() never tears it down under a running encode(),
+    and an encode() queued before close() finds a newer generation and
+    does nothing.
+    """
+
+    def __init__(self, broadcast, bitrate=1_000_000, keyframe_interval=2.0, codec="libx264"):
+        self.broadcast = broadcast
+        self.bitrate = bitrate
+        self.codec = codec
+        self.gop_frames = max(1, int(round(keyframe_interval * broadcast.fps)))
+        self.gop = []  # keyframe plus the packets after it
+        self.tracks = set()
+        self.frames_encoded = 0
+        self.context = None
+        self.pool = None
+        self._subscription = None
+        self._task = None
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by close()
+
+    def _open(self, width, height):
+        context = av.CodecContext.create(self.codec, "w")
+        context.width = width
+        context.height = height
+        context.bit_rate = self.bitrate
+        context.pix_fmt = "yuv420p"
+        context.framerate = fractions.Fraction(self.broadcast.fps, 1)
+        context.time_base = fractions.Fraction(1, self.broadcast.fps)
+        context.options = {"level": "31", "tune": "zerolatency"}
+        context.profile = "Baseline"
+        return context
+
+    def encode(self, video_frame, generation):
+        """Encode one pooled frame for run `generation`; runs in an executor thread."""
+        with self._lock:
+            if generation != self._generation:
+                return []
+            if self.context is None:
+                self.context = self._open(video_frame.width, video_frame.height)
+            keyframe = self.frames_encoded % self.gop_frames == 0
+            video_frame.pts = self.frames_encoded
+            video_frame.pict_type = av.video.frame.PictureType.I if keyframe else av.video.frame.PictureType.NONE
+            self.frames_encoded += 1
+            started = time.perf_counter()
+            packets = self.context.encode(video_frame)
+        metrics["ball_encode_seconds"].observe(time.perf_counter() - started)
+        metrics["ball_encoded_frames_total"].inc()
+        return packets
+
+    async def run(self):
+        ring = self.broadcast.ring
+        loop = asyncio.get_running_loop()
+        generation = self._generation
+        last_seq = -1
+        while True:
+            await self._subscription.wait(1.0)
+            seq, view = ring.latest(last_seq)
+            if seq is None:
+                continue
+            last_seq = seq
+            if self.pool is None:
+                self.pool = VideoFramePool.for_array(view)
+            video_frame = self.pool.fill(view)
+            if not ring.still_valid(seq):
+                continue  # lapped mid-copy; the next frame is already waiting
+            for packet in await loop.run_in_executor(None, self.encode, video_frame, generation):
+                self.publish(packet)
+
+    def publish(self, packet):
+        if packet.is_keyframe:
+            self.gop = [packet]
+        elif self.gop:
+            self.gop.append(packet)
+        for track in self.tracks:
+            track.push(packet)
+
+    def track(self):
+        """A new EncodedTrack on this tier, primed with the cached GOP."""
+        track = EncodedTrack(self, list(self.gop), max_pending=2 * self.gop_frames)
+        self.tracks.add(track)
+        if self._task is None:
+            self._subscription = self.broadcast.subscribe()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+            log.info("Tier encoder started", bitrate=self.bitrate, keyframe_every=self.gop_frames)
+        return track
+
+    def remove(self, track):
+        self.tracks.discard(track)
+        if not self.tracks:
+            self.close()
+
+    def close(self):
+        """Stop encoding; the next track() starts again from a keyframe."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._subscription.detach()
+        self._task = self._subscription = None
+        self.gop = []
+        with self._lock:  # waits out an encode() already running on the old context
+            self._generation += 1
+            self.frames_encoded = 0
+            self.context = None
+        log.info("Tier encoder stopped", bitrate=self.bitrate)
+
+
+def tier_encoder(broadcast, bitrate):
+    """The shared TierEncoder for `bitrate` on a broadcast scene."""
+    encoder = broadcast.encoders.get(bitrate)
+    if encoder is None:
+        encoder = broadcast.encoders[bitrate] = TierEncoder(broadcast, bitrate)
+    return encoder
+
+
+class EncodedTrack(MediaStreamTrack):
+    """Serves a TierEncoder's packets to one peer.
+
+    A peer that falls `max_pending` packets behind drops its backlog and
+    waits for the next keyframe rather than buffering without bound; it
+    can't skip delta frames the way a raw-frame track skips frames.
+    """
+
+    kind = "video"
+
+    def __init__(self, encoder, primer=(), max_pending=120):
+        super().__init__()
+        self.encoder = encoder
+        self.max_pending = max_pending
+        self.pending = deque(primer)
+        self.waiting_keyframe = not self.pending
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, packet):
+        if len(self.pending) >= self.max_pending:
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            self.waiting_keyframe = True
+            log.debug_every("behind", 1.0, "Peer fell behind, resyncing at next keyframe", dropped=self.dropped)
+        if self.waiting_keyframe:
+            if not packet.is_keyframe:
+                return
+            self.waiting_keyframe = False
+        self.pending.append(packet)
+        self._ready.set()
+
+    async def recv(self):
+        while not self.pending:
+            if self.readyState != "live":
+                raise MediaStreamError
+            self._ready.clear()
+            await self._ready.wait()
+        return self.pending.popleft()
+
+    def stop(self):
+        super().stop()
+        self._ready.set()
+        self.encoder.remove(self)
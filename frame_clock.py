@@ -0,0 +1,87 @@
+# Deadline-based frame pacing with a fixed physics timestep
+
+import time
+
+
+class FrameClock:
+    """Paces frames against absolute deadlines on a monotonic clock.
+
+    Deadlines are start + n * period, so time spent stepping, rendering or
+    publishing never pushes later frames back. When the caller falls more
+    than a whole period behind, the missed deadlines are skipped (and
+    counted) instead of being rendered late in a burst. Simulated time
+    advances one period per deadline, whether rendered or skipped, and is
+    handed out as whole fixed `dt` physics steps through an accumulator.
+    """
+
+    def __init__(self, fps, physics_hz=None, max_steps=32, clock=time.monotonic, sleep=time.sleep):
+        self.period = 1.0 / fps
+        self.dt = 1.0 / (physics_hz or fps)
+        self.max_steps = max_steps
+        self._clock = clock
+        self._sleep = sleep
+        self.start_time = None
+        self.frame_index = 0
+        self.frames = 0  # deadlines rendered
+        self.missed = 0  # deadlines skipped because we were late
+        self.late = 0  # deadlines reached after they had passed
+        self.max_lateness = 0.0
+        self._accumulator = 0.0
+
+    def start(self):
+        self.start_time = self._clock()
+        self.frame_index = 0
+        self._accumulator = 0.0
+        return self.start_time
+
+    @property
+    def deadline(self):
+        return self.start_time + self.frame_index * self.period
+
+    def elapsed(self):
+        return self._clock() - self.start_time
+
+    def physics_steps(self):
+        """Whole fixed-dt steps owed since the last call."""
+        steps = int(self._accumulator / self.dt + 1e-9)
+        self._accumulator -= steps * self.dt
+        if steps > self.max_steps:
+            steps = self.max_steps  # don't spiral; the surplus time is dropped
+            self._accumulator = 0.0
+        return steps
+
+    def wait(self):
+        """Sleep until the next deadline, skipping any that already passed.
+
+        Returns the number of deadlines skipped.
+        """
+        self.frames += 1
+        target = self.frame_index + 1
+        now = self._clock()
+        lateness = now - (self.start_time + target * self.period)
+        skipped = 0
+        if lateness > 0:
+            # Less than a period late: render now. Later than that: drop the
+            # deadlines that are gone and render the one still in progress.
+            self.late += 1
+            self.max_lateness = max(self.max_lateness, lateness)
+            skipped = int(lateness / self.period)
+            self.missed += skipped
+            target += skipped
+        self._accumulator += (target - self.frame_index) * self.period
+        self.frame_index = target
+
+        delay = self.deadline - now
+        if delay > 0:
+            self._sleep(delay)
+        return skipped
+
+    def stats(self):
+        elapsed = self.elapsed() if self.start_time is not None else 0.0
+        return {
+            "frames": self.frames,
+            "missed": self.missed,
+            "late": self.late,
+            "fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "max_lateness_ms": self.max_lateness * 1000.0,
+        }
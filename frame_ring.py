@@ -0,0 +1,167 @@
+# Shared-memory ring of frame slots between the producer and the track
+
+from multiprocessing import shared_memory
+import numpy as np
+from renderer import frame_shape
+
+HEADER_WORDS = 8  # latest sequence number, requested width, height and frame stride, then spare
+EMPTY = -1
+
+
+class FrameRing:
+    """Fixed ring of frame slots in shared memory with a latest-frame cursor.
+
+    The producer takes a slot with begin_write(), renders straight into it
+    and publishes it with commit(). Each slot carries the sequence number
+    of the frame it holds (EMPTY while being written), and the header holds
+    the sequence number of the newest committed frame. Readers get
+    zero-copy views and should confirm with still_valid() after using one,
+    since the producer reuses the slot once it has gone all the way round.
+
+    The ring pickles by name, so it can be handed to a child process and
+    the child attaches to the same block.
+
+    Slots are sized for width x height, but a frame may be smaller: the
+    consumer asks for a size and frame stride with request(), the producer
+    renders at that size into the front of each slot, and every slot
+    records the dimensions it holds so latest() returns a matching view.
+    """
+
+    def __init__(self, width=640, height=480, slots=4, pixel_format="bgr24", name=None):
+        self.width = width
+        self.height = height
+        self.slots = slots
+        self.pixel_format = pixel_format  # "bgr24", or "yuv420p" for I420 planes
+        self.owner = name is None
+        self._open(name)
+
+    @property
+    def frame_shape(self):
+        return frame_shape(self.width, self.height, self.pixel_format)
+
+    def _open(self, name):
+        frame_bytes = int(np.prod(self.frame_shape))
+        header_bytes = 8 * (HEADER_WORDS + 4 * self.slots)
+        data_offset = -(-header_bytes // 64) * 64
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=data_offset + frame_bytes * self.slots)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=buf)
+        self.slot_seq = np.ndarray((self.slots,), dtype=np.int64, buffer=buf, offset=8 * HEADER_WORDS)
+        self.slot_pts = np.ndarray((self.slots,), dtype=np.int64, buffer=buf, offset=8 * (HEADER_WORDS + self.slots))
+        self.slot_dims = np.ndarray((self.slots, 2), dtype=np.int64, buffer=buf,
+                                    offset=8 * (HEADER_WORDS + 2 * self.slots))
+        self._data = np.ndarray((self.slots, frame_bytes), dtype=np.uint8, buffer=buf, offset=data_offset)
+        self._views = {}
+        self.frames = self.views(self.width, self.height)
+        if self.owner:
+            self.header[:] = 0
+            self.header[0] = EMPTY
+            self.slot_seq[:] = EMPTY
+            self.slot_pts[:] = EMPTY
+            self.slot_dims[:] = (self.width, self.height)
+
+    def __getstate__(self):
+        return {"width": self.width, "height": self.height, "slots": self.slots,
+                "pixel_format": self.pixel_format, "name": self.shm.name}
+
+    def __setstate__(self, state):
+        name = state.pop("name")
+        self.__dict__.update(state)
+        self.owner = False
+        self._open(name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def views(self, width, height):
+        """One view per slot of a width x height frame at the front of the slot."""
+        key = (width, height)
+        if key not in self._views:
+            if width > self.width or height > self.height:
+                raise ValueError(f"{width}x{height} frames don't fit {self.width}x{self.height} slots")
+            shape = frame_shape(width, height, self.pixel_format)
+            size = int(np.prod(shape))
+            self._views[key] = [slot[:size].reshape(shape) for slot in self._data]
+        return self._views[key]
+
+    # Control, written by the consumer and read by the producer
+
+    def request(self, width=None, height=None, stride=1):
+        """Ask the producer for width x height frames, publishing every `stride`-th tick."""
+        width, height = width or self.width, height or self.height
+        self.views(width, height)  # validates the size
+        self.header[1:4] = (width, height, stride)
+
+    @property
+    def requested(self):
+        """(width, height, stride) the consumer asked for; the full size and every tick by default."""
+        width, height, stride = (int(v) for v in self.header[1:4])
+        return width or self.width, height or self.height, stride or 1
+
+    # Producer side
+
+    def begin_write(self, width=None, height=None):
+        """Reserve the slot for the next frame; returns (seq, slot, frame view)."""
+        width, height = width or self.width, height or self.height
+        seq = int(self.header[0]) + 1
+        slot = seq % self.slots
+        self.slot_seq[slot] = EMPTY
+        self.slot_dims[slot] = (width, height)
+        return seq, slot, self.views(width, height)[slot]
+
+    def commit(self, seq, pts=EMPTY):
+        """Publish frame `seq` as the latest, optionally stamped with its pts."""
+        self.slot_pts[seq % self.slots] = pts
+        self.slot_seq[seq % self.slots] = seq
+        self.header[0] = seq
+
+    def publish(self, frame):
+        """Copy a finished frame into the next slot (for callers that can't render in place)."""
+        seq, _, slot = self.begin_write()
+        slot[...] = frame
+        self.commit(seq)
+        return seq
+
+    # Consumer side
+
+    @property
+    def latest_seq(self):
+        return int(self.header[0])
+
+    def latest(self, after=EMPTY):
+        """Return (seq, view) of the newest frame newer than `after`, or (None, None)."""
+        seq = int(self.header[0])
+        if seq <= after:
+            return None, None
+        slot = seq % self.slots
+        if self.slot_seq[slot] != seq:
+            return None, None  # lapped while we looked
+        width, height = self.slot_dims[slot]
+        return seq, self.views(int(width), int(height))[slot]
+
+    def pts(self, seq):
+        """The pts frame `seq` was committed with, or None if unstamped or already reused."""
+        pts = int(self.slot_pts[seq % self.slots])
+        if pts == EMPTY or not self.still_valid(seq):
+            return None
+        return pts
+
+    def still_valid(self, seq):
+        """True while the slot holding `seq` has not been reused."""
+        return self.slot_seq[seq % self.slots] == seq
+
+    def close(self):
+        self.header = self.slot_seq = self.slot_pts = self.slot_dims = self._data = None
+        self.frames = []
+        self._views = {}
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a reader still holds a view; the mapping goes when it is dropped
+        if self.owner:
+            self.shm.unlink()
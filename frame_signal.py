@@ -0,0 +1,99 @@
+# Pipe-based wakeup from the producer process into the asyncio loop
+
+import asyncio
+import multiprocessing as mp
+import os
+
+
+class FrameSignal:
+    """One-way pipe the producer pokes after publishing a frame.
+
+    The consumer registers the read end with loop.add_reader, so a waiting
+    recv() resumes as soon as a frame lands instead of polling on a timer.
+    Pokes that find the pipe full are dropped: one unread byte already
+    means "something new", and readers always take the newest frame.
+    The pipe ends are multiprocessing Connections, which makes the signal
+    picklable to spawned producers.
+    """
+
+    def __init__(self):
+        self._reader, self._writer = mp.Pipe(duplex=False)
+        self._writer_nonblocking = False
+        self._loop = None
+        self._ready = None
+        self._on_frame = None
+
+    # Producer side
+
+    def notify(self):
+        fd = self._writer.fileno()
+        if not self._writer_nonblocking:
+            os.set_blocking(fd, False)
+            self._writer_nonblocking = True
+        try:
+            os.write(fd, b"\x01")
+        except (BlockingIOError, BrokenPipeError):
+            pass
+
+    # Consumer side
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def drain(self):
+        fd = self._reader.fileno()
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def attach(self, loop=None, on_frame=None):
+        """Start watching the pipe on `loop` (the running loop by default).
+
+        `on_frame` is called after each drained poke, for fanning one
+        signal out to several waiters.
+        """
+        if self._loop is not None:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._on_frame = on_frame
+        os.set_blocking(self.fileno(), False)
+        self._loop.add_reader(self.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        self.drain()
+        self._ready.set()
+        if self._on_frame is not None:
+            self._on_frame()
+
+    async def wait(self, timeout):
+        """Wait up to `timeout` seconds for a poke; True if one arrived."""
+        self.attach()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._ready.clear()
+        return True
+
+    def detach(self):
+        if self._loop is not None:
+            self._loop.remove_reader(self.fileno())
+            self._loop = None
+
+    def close(self):
+        self.detach()
+        self._reader.close()
+        self._writer.close()
+
+    def __getstate__(self):
+        return {"_reader": self._reader, "_writer": self._writer}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._writer_nonblocking = False
+        self._loop = None
+        self._ready = None
+        self._on_frame = None
@@ -0,0 +1,105 @@
+# Shared-memory ring of per-frame ground truth (frame, pts, ball position)
+
+from multiprocessing import shared_memory
+import numpy as np
+
+PTS_RATE = 90000  # RTP video clock
+RECORD = np.dtype([("frame", np.int64), ("pts", np.int64), ("x", np.float64), ("y", np.float64)])
+EMPTY = -1
+
+
+class FrameTimeline:
+    """Where the ball really was for each recent frame, readable from any process.
+
+    The producer writes one record per rendered frame, keyed by the frame
+    clock's deadline index, so pts = frame * PTS_RATE / fps exactly and
+    skipped deadlines simply leave a hole. Records live at frame % capacity:
+    a lookup by frame id or by pts is one index and one check that the slot
+    still holds that frame. There is a single writer and readers never
+    lock; a record is only trusted once its `frame` field matches.
+
+    Like FrameRing it pickles by name, so producers in other processes
+    attach to the same block.
+    """
+
+    def __init__(self, fps=30, capacity=1024, name=None):
+        self.fps = fps
+        self.capacity = capacity
+        self.owner = name is None
+        self._open(name)
+
+    def _open(self, name):
+        size = 64 + RECORD.itemsize * self.capacity
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.header = np.ndarray((8,), dtype=np.int64, buffer=self.shm.buf)
+        self.records = np.ndarray((self.capacity,), dtype=RECORD, buffer=self.shm.buf, offset=64)
+        if self.owner:
+            self.header[:] = EMPTY
+            self.records["frame"] = EMPTY
+
+    def __getstate__(self):
+        return {"fps": self.fps, "capacity": self.capacity, "name": self.shm.name}
+
+    def __setstate__(self, state):
+        name = state.pop("name")
+        self.__dict__.update(state)
+        self.owner = False
+        self._open(name)
+
+    def pts(self, frame):
+        return frame * PTS_RATE // self.fps
+
+    # Producer side
+
+    def record(self, frame, x, y):
+        """Store the ball position for deadline `frame`; returns its pts."""
+        pts = self.pts(frame)
+        slot = self.records[frame % self.capacity]
+        slot["frame"] = EMPTY  # readers skip it while it is half written
+        slot["pts"] = pts
+        slot["x"] = x
+        slot["y"] = y
+        slot["frame"] = frame
+        self.header[0] = frame
+        return pts
+
+    # Consumer side
+
+    @property
+    def latest_frame(self):
+        return int(self.header[0])
+
+    def by_frame(self, frame):
+        """(x, y) for `frame`, or None if it was skipped or has been overwritten."""
+        if frame < 0:
+            return None
+        record = self.records[frame % self.capacity]
+        if record["frame"] != frame:
+            return None
+        x, y = float(record["x"]), float(record["y"])
+        return (x, y) if record["frame"] == frame else None
+
+    def by_pts(self, pts, search=2):
+        """(x, y) of the frame nearest `pts`, looking up to `search` frames either side."""
+        frame = int(round(pts * self.fps / PTS_RATE))
+        for offset in range(search + 1):
+            for candidate in (frame - offset, frame + offset) if offset else (frame,):
+                position = self.by_frame(candidate)
+                if position is not None:
+                    return position
+        return None
+
+    def latest(self):
+        return self.by_frame(self.latest_frame)
+
+    def close(self):
+        self.header = self.records = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            self.shm.unlink()
@@ -1,64 +1,172 @@
 # Multiprocessing class that generates video frames in a background process
 
-import time
 import multiprocessing as mp
-import cv2
+import time
 from bouncing_ball import BouncingBall
+from renderer import FrameRenderer
+from frame_ring import FrameRing
+from frame_clock import FrameClock
+from frame_timeline import PTS_RATE
+from pipeline_log import get_logger, configure, FrameSnapshotter
+from metrics import MetricSet, PRODUCER_METRICS
+
+log = get_logger("producer")
+
+
+def initial_ball(width, height):
+    """The ball every producer starts from."""
+    return BouncingBall(width=width, height=height, radius=40, speed=(400, 300))
+
+
+def render_primer(ring):
+    """Render the opening scene into `ring` in the calling process; returns its seq.
+
+    A track can then send a real frame before the producer process has
+    started. The primer is unstamped and not in the timeline, like the
+    track's own placeholder frames; the producer's frames follow it.
+    """
+    renderer = FrameRenderer(ring.width, ring.height, frames=ring.frames, incremental=False,
+                             pixel_format=ring.pixel_format)
+    seq, slot, _ = ring.begin_write()
+    initial_ball(ring.width, ring.height).render(renderer, index=slot)
+    ring.commit(seq)
+    return seq
+
 
 class FrameProducer(mp.Process):
-    def __init__(self, frame_queue: mp.Queue, width=640, height=480, fps=30, stop_event=None, duration=None, debug=False):
+    def __init__(self, frame_queue, width=640, height=480, fps=30, stop_event=None, duration=None, debug=False,
+                 incremental=False, buffers=2, physics_hz=None, snapshot_every=None, signal=None,
+                 pixel_format="bgr24", timeline=None, metrics=None):
         super().__init__()
-        self.frame_queue = frame_queue
+        self.frame_queue = frame_queue  # mp.Queue, or a FrameRing to render straight into shared memory
         self.width = width
         self.height = height
         self.fps = fps
         self.stop_event = stop_event or mp.Event()
         self.duration = duration  # new: run time limit in seconds
         self.debug = debug
+        self.incremental = incremental  # reuse frame buffers and clear only dirty boxes
+        self.buffers = buffers
+        self.physics_hz = physics_hz  # fixed physics rate; defaults to one step per frame
+        self.signal = signal  # FrameSignal poked after every published frame
+        self.pixel_format = pixel_format  # queue frames only; a FrameRing carries its own format
+        self.timeline = timeline  # FrameTimeline that gets the ball position of every frame
+        self.metrics = metrics  # SharedMetrics(PRODUCER_METRICS) read by the server; private if None
+        self.snapshot_every = snapshot_every  # write every Nth frame to /tmp/test_frame.png; None reads $BALL_SNAPSHOT_EVERY
 
     def run(self):
-        print(f"[Producer] Generating frame at {self.fps} FPS")
-        ball = BouncingBall(width=640, height=480, radius=40, speed=(400, 300))
-        frame_duration = 1.0 / self.fps
-        start_time = time.time()
+        if mp.current_process() is self:
+            configure("DEBUG" if self.debug else None)  # a child process starts with fresh logging
+        log.info("Generating frames", fps=self.fps)
+        ring = self.frame_queue if isinstance(self.frame_queue, FrameRing) else None
+        if ring is not None:
+            ball = initial_ball(ring.width, ring.height)
+            renderer = FrameRenderer(ring.width, ring.height, frames=ring.frames, incremental=self.incremental,
+                                     pixel_format=ring.pixel_format)
+        else:
+            ball = initial_ball(640, 480)
+            renderer = None
+            if self.incremental or self.pixel_format != "bgr24":
+                renderer = FrameRenderer(640, 480, buffers=self.buffers, incremental=self.incremental,
+                                         pixel_format=self.pixel_format)
+        self.snapshots = FrameSnapshotter(self.snapshot_every, pixel_format=renderer.pixel_format if renderer else "bgr24")
+        metrics = self.metrics if self.metrics is not None else MetricSet(PRODUCER_METRICS)
+        produced = metrics["ball_frames_produced_total"]
+        missed = metrics["ball_deadlines_missed_total"]
+        render_seconds = metrics["ball_render_seconds"]
+        fps_gauge = metrics["ball_producer_fps"]
+        self._dropped = metrics["ball_frames_dropped_total"]
+        self._depth = metrics["ball_queue_depth"] if ring is None else None
+        clock = FrameClock(self.fps, physics_hz=self.physics_hz)
+        target = (ring.width, ring.height, 1) if ring is not None else None
+        published = 0
+        next_publish = 0  # frame index of the next tick that renders, given the requested stride
+        window = (clock.start(), published)
 
-        if self.debug:
-            print("[Worker] Frame generated")
-
-        last_time = start_time
         while not self.stop_event.is_set():
-            now = time.time()
-
             # new: check for max duration
-            if self.duration is not None and (now - start_time) >= self.duration:
-                if self.debug:
-                    print("[Worker] Duration exceeded, stopping.")
+            if self.duration is not None and clock.elapsed() >= self.duration:
+                log.debug("Duration exceeded, stopping")
                 break
 
-            dt = now - last_time
-            last_time = now
+            started = time.perf_counter()
+            for _ in range(clock.physics_steps()):
+                ball.step(clock.dt)
+            if self.timeline is not None:
+                x, y = ball.position
+                pts = self.timeline.record(clock.frame_index, x, y)
+            else:
+                pts = clock.frame_index * PTS_RATE // self.fps
+            if ring is not None:
+                if ring.requested != target:
+                    target = ring.requested
+                    renderer = self.resize(ring, renderer, target)
+                if clock.frame_index < next_publish:
+                    # Not a rendered tick at the requested frame rate: physics and timeline only.
+                    self.wait(clock, missed)
+                    continue
+                next_publish = clock.frame_index + target[2]
+                seq, slot, _ = ring.begin_write(target[0], target[1])
+                frame = ball.render(renderer, index=slot)
+                ring.commit(seq, pts)
+            else:
+                frame = ball.render(renderer)
+                if renderer is not None:
+                    # mp.Queue pickles on a feeder thread after put() returns,
+                    # so a reused buffer has to be handed over as a copy.
+                    frame = frame.copy()
+                self.enqueue(frame)
+            if self.signal is not None:
+                self.signal.notify()
+            render_seconds.observe(time.perf_counter() - started)
+            produced.inc()
+            published += 1
+            self.snapshots.maybe(frame, clock.frames)
+
+            now = time.monotonic()
+            if now - window[0] >= 1.0:
+                fps_gauge.set((published - window[1]) / (now - window[0]))
+                window = (now, published)
+
+            self.wait(clock, missed)
 
-            ball.step(dt)
-            frame = ball.render()
-            print("[FrameProducer] Sending frame of shape", frame.shape)
+        self.snapshots.close()
+        fps_gauge.set(0)
+        if self._depth is not None:
+            self._depth.set(0)
+        self.clock_stats = clock.stats()
+        log.info("Stopped", **self.clock_stats)
+
+    def wait(self, clock, missed):
+        if not self.stop_event.is_set():
+            skipped = clock.wait()
+            if skipped:
+                missed.inc(skipped)
+            if skipped and log.debug_on:
+                log.debug_every("skip", 1.0, "Behind schedule", skipped=skipped, missed=clock.missed)
+
+    def resize(self, ring, renderer, target):
+        """A renderer drawing the full-size scene at the consumer's requested size."""
+        width, height, stride = target
+        log.info("Frame size changed", width=width, height=height, fps=self.fps / stride)
+        return FrameRenderer(width, height, frames=ring.views(width, height), incremental=self.incremental,
+                             pixel_format=ring.pixel_format, sprites=renderer.sprites, scale=ring.width / width)
+
+    def enqueue(self, frame):
+        try:
+            self.frame_queue.put_nowait(frame)
+            if log.debug_on:
+                log.debug_every("enqueue", 1.0, "Frame enqueued", shape=frame.shape)
+        except mp.queues.Full:
+            self._dropped.inc()
             try:
-                print("[Producer] Putting frame into queue")
-                cv2.imwrite("/tmp/test_frame.png", frame)
+                self.frame_queue.get_nowait()
                 self.frame_queue.put_nowait(frame)
-                if self.debug:
-                    print("[Worker] Frame enqueued")
-            except mp.queues.Full:
-                try:
-                    self.frame_queue.get_nowait()
-                    self.frame_queue.put_nowait(frame)
-                    if self.debug:
-                        print("[Worker] Frame queue full — dropped one and enqueued")
-                except Exception:
-                    if self.debug:
-                        print("[Worker] Frame skipped (queue full)")
-
-            if not self.stop_event.is_set():
-                time.sleep(frame_duration)
-
-        if self.debug:
-            print("[Worker] Stopped")
+                log.debug_every("full", 1.0, "Frame queue full, dropped one and enqueued")
+            except Exception:
+                log.debug_every("skip-full", 1.0, "Frame skipped (queue full)")
+        if self._depth is not None:
+            try:
+                self._depth.set(self.frame_queue.qsize())
+            except NotImplementedError:
+                pass  # macOS has no sem_getvalue
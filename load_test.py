@@ -0,0 +1,354 @@
+# Browserless load generator: many concurrent WebTransport + WebRTC sessions against server/app.py
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import ssl
+import subprocess
+import sys
+import time
+import numpy as np
+from aioquic.asyncio import connect, QuicConnectionProtocol
+from aioquic.h3.connection import H3Connection, H3_ALPN
+from aioquic.h3.events import HeadersReceived, DataReceived, DatagramReceived
+from aioquic.quic.configuration import QuicConfiguration
+from aiortc import RTCPeerConnection, RTCSessionDescription
+from aiortc.mediastreams import MediaStreamError
+import coords_protocol
+from ball_detector import BallDetector
+from message_framing import MessageDecoder, encode_message
+from pipeline_log import get_logger, configure
+
+log = get_logger("load")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CANVAS = (640, 480)  # index.html scales every frame to this canvas before detecting, whatever the tier
+
+
+class LoadClient(QuicConnectionProtocol):
+    """One QUIC connection carrying one WebTransport session, as a browser tab would.
+
+    Control messages go over the session's CONNECT stream, which is where
+    server/app.py reads them; coords and errors travel as datagrams.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._http = H3Connection(self._quic, enable_webtransport=True)
+        self.session_id = None
+        self._accepted = None
+        self._decoder = MessageDecoder()
+        self.messages = asyncio.Queue()
+        self.errors = []  # (seq, error_x, error_y) arrays from error datagrams
+
+    async def open_session(self, authority, path="/"):
+        self.session_id = self._quic.get_next_available_stream_id()
+        self._accepted = asyncio.get_running_loop().create_future()
+        self._http.send_headers(self.session_id, [
+            (b":method", b"CONNECT"),
+            (b":scheme", b"https"),
+            (b":authority", authority.encode()),
+            (b":path", path.encode()),
+            (b":protocol", b"webtransport"),
+        ])
+        self.transmit()
+        status = await self._accepted
+        if status != b"200":
+            raise ConnectionError(f"WebTransport session rejected with status {status.decode()}")
+
+    def send_message(self, message):
+        self._quic.send_stream_data(self.session_id, encode_message(message))
+        self.transmit()
+
+    def send_datagram(self, data):
+        self._http.send_datagram(self.session_id, data)
+        self.transmit()
+
+    def quic_event_received(self, event):
+        for http_event in self._http.handle_event(event):
+            if isinstance(http_event, HeadersReceived) and http_event.stream_id == self.session_id:
+                if not self._accepted.done():
+                    self._accepted.set_result(dict(http_event.headers).get(b":status"))
+            elif isinstance(http_event, DataReceived) and http_event.stream_id == self.session_id:
+                for raw in self._decoder.feed(http_event.data):
+                    self.messages.put_nowait(raw)
+            elif isinstance(http_event, DatagramReceived):
+                try:
+                    kind, samples = coords_protocol.decode(http_event.data)
+                except ValueError:
+                    continue
+                if kind == coords_protocol.ERRORS:
+                    self.errors.append(samples.copy())
+
+
+class SessionResult:
+    """What one simulated viewer measured."""
+
+    def __init__(self):
+        self.handshake = None  # s from dialling to the accepted CONNECT
+        self.answer = None  # s from dialling to the SDP answer
+        self.first_frame = None  # s from dialling to the first decoded frame
+        self.frames = 0  # decoded frames inside the measurement window
+        self.window = 0.0  # s the window lasted
+        self.window_start = None
+        self.coords_sent = 0
+        self.errors = np.empty(0)  # |error| per scored coords sample
+        self.failure = None
+
+    @property
+    def fps(self):
+        return self.frames / self.window if self.window else 0.0
+
+
+async def receive_video(track, result, started, latest):
+    """Decode frames until the track ends; frames after the first are counted towards fps."""
+    first = None
+    while True:
+        try:
+            frame = await track.recv()
+        except MediaStreamError:
+            return
+        now = time.perf_counter()
+        if first is None:
+            first = frame
+            result.first_frame = now - started
+            result.window_start = now
+        else:
+            result.frames += 1
+            result.window = now - result.window_start
+        latest[0] = (frame, float((frame.pts - first.pts) * frame.time_base))
+
+
+async def send_coords(client, result, latest, rate, batch):
+    """Detect the ball in the newest frame `rate` times a second, sending `batch` samples per datagram."""
+    detector = None
+    samples, seq, last = [], 0, None
+    track = []  # the last two (media_time, position) detections, for a constant-velocity prediction
+    while True:
+        await asyncio.sleep(1.0 / rate)
+        if latest[0] is None or latest[0] is last:
+            continue
+        last = latest[0]
+        frame, media_time = last
+        image = frame.to_ndarray(format="yuv420p")
+        if detector is None:
+            detector = BallDetector(frame.width, frame.height, "yuv420p", stride=4, roi=48)
+        predicted = None
+        if len(track) == 2 and track[1][0] > track[0][0]:
+            (t0, p0), (t1, p1) = track
+            scale = (media_time - t1) / (t1 - t0)
+            predicted = (p1[0] + (p1[0] - p0[0]) * scale, p1[1] + (p1[1] - p0[1]) * scale)
+        found = detector.detect(image, predicted=predicted)
+        if found is None:
+            track = []
+            continue
+        track = (track + [(media_time, found)])[-2:]
+        x, y = found[0] * CANVAS[0] / frame.width, found[1] * CANVAS[1] / frame.height
+        samples.append((seq, -1, media_time, x, y))
+        seq += 1
+        if len(samples) >= batch:
+            client.send_datagram(coords_protocol.encode_coords(samples))
+            result.coords_sent += len(samples)
+            samples = []
+
+
+async def run_session(host, port, duration, coords_rate=10.0, batch=1, timeout=20.0):
+    """Open one session, negotiate WebRTC, watch for `duration` seconds and return a SessionResult."""
+    result = SessionResult()
+    configuration = QuicConfiguration(is_client=True, alpn_protocols=H3_ALPN, verify_mode=ssl.CERT_NONE,
+                                      max_datagram_frame_size=65536)
+    pc = RTCPeerConnection()
+    tasks = []
+    latest = [None]
+    started = time.perf_counter()
+    try:
+        async with connect(host, port, configuration=configuration, create_protocol=LoadClient) as client:
+            await asyncio.wait_for(client.open_session(f"{host}:{port}"), timeout)
+            result.handshake = time.perf_counter() - started
+
+            @pc.on("track")
+            def on_track(track):
+                tasks.append(asyncio.ensure_future(receive_video(track, result, started, latest)))
+
+            pc.addTransceiver("video", direction="recvonly")
+            await pc.setLocalDescription(await pc.createOffer())
+            client.send_message({"type": "offer", "sdp": pc.localDescription.sdp})
+            answer = json.loads(await asyncio.wait_for(client.messages.get(), timeout))
+            result.answer = time.perf_counter() - started
+            await pc.setRemoteDescription(RTCSessionDescription(sdp=answer["sdp"], type=answer["type"]))
+
+            if coords_rate > 0:
+                tasks.append(asyncio.ensure_future(send_coords(client, result, latest, coords_rate, batch)))
+            await asyncio.sleep(duration)
+            if client.errors:
+                errors = np.concatenate(client.errors)
+                result.errors = np.hypot(errors["error_x"], errors["error_y"])
+    except Exception as e:
+        result.failure = f"{type(e).__name__}: {e}"
+    finally:
+        for task in tasks:
+            task.cancel()
+        await pc.close()
+    return result
+
+
+class ProcessTreeCPU:
+    """CPU seconds used by a process and all its descendants, from /proc (Linux)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._tick = os.sysconf("SC_CLK_TCK")
+        self._last = None
+
+    def _stat(self, pid):
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return int(fields[1]), (int(fields[11]) + int(fields[12])) / self._tick  # ppid, utime + stime
+
+    def seconds(self):
+        stats = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    stats[int(entry)] = self._stat(entry)
+                except (OSError, IndexError, ValueError):
+                    pass  # exited while we looked
+        children = {}
+        for pid, (ppid, _) in stats.items():
+            children.setdefault(ppid, []).append(pid)
+        total, todo = 0.0, [self.pid]
+        while todo:
+            pid = todo.pop()
+            if pid in stats:
+                total += stats[pid][1]
+                todo.extend(children.get(pid, ()))
+        return total
+
+    def percent(self):
+        """Average CPU % (100 = one core) since the previous call."""
+        now = (time.perf_counter(), self.seconds())
+        last, self._last = self._last, now
+        if last is None or now[0] <= last[0]:
+            return None
+        return 100.0 * (now[1] - last[1]) / (now[0] - last[0])
+
+
+def percentiles(values, *qs):
+    values = [v for v in values if v is not None]
+    if not values:
+        return [math.nan] * len(qs)
+    return [float(np.percentile(values, q)) for q in qs]
+
+
+def summarize(level, results, cpu):
+    ok = [r for r in results if r.failure is None]
+    handshake = percentiles([r.handshake for r in ok], 50, 95)
+    answer = percentiles([r.answer for r in ok], 50, 95)
+    first_frame = percentiles([r.first_frame for r in ok], 50, 95)
+    fps = [r.fps for r in ok if r.first_frame is not None]
+    errors = np.concatenate([r.errors for r in ok]) if ok else np.empty(0)
+    return {
+        "sessions": level,
+        "failed": len(results) - len(ok),
+        "no_video": sum(1 for r in ok if r.first_frame is None),
+        "handshake_ms": [v * 1000 for v in handshake],
+        "answer_ms": [v * 1000 for v in answer],
+        "first_frame_ms": [v * 1000 for v in first_frame],
+        "fps_mean": float(np.mean(fps)) if fps else 0.0,
+        "fps_min": float(np.min(fps)) if fps else 0.0,
+        "coords_sent": sum(r.coords_sent for r in ok),
+        "errors_received": int(errors.size),
+        "error_p50": float(np.median(errors)) if errors.size else math.nan,
+        "server_cpu": cpu,
+        "failures": sorted({r.failure for r in results if r.failure}),
+    }
+
+
+async def run_level(level, args, cpu):
+    """Start `level` sessions (spread over --ramp seconds) and wait for all of them."""
+    async def delayed(index):
+        await asyncio.sleep(args.ramp * index / level)
+        return await run_session(args.host, args.port, args.duration, args.coords_rate, args.batch, args.timeout)
+
+    if cpu is not None:
+        cpu.percent()
+    results = await asyncio.gather(*(delayed(i) for i in range(level)))
+    return summarize(level, results, cpu.percent() if cpu is not None else None)
+
+
+def start_server(args):
+    """Run server/app.py on loopback with the bundled localhost certificate."""
+    command = [sys.executable, os.path.join(ROOT, "server", "app.py"), "--host", args.host, "--port", str(args.port),
+               "--cert", os.path.join(ROOT, "localhost.pem"), "--key", os.path.join(ROOT, "localhost-key.pem"),
+               "--duration", str(int(len(args.sessions) * (args.duration + args.ramp + args.timeout) + 60))]
+    server = subprocess.Popen(command + args.server_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in server.stdout:
+        if "QUIC server running" in line:
+            break
+    else:
+        raise RuntimeError("server exited before it started listening")
+    # Keep draining its output so the pipe never fills up and blocks it.
+    asyncio.get_running_loop().run_in_executor(None, lambda: [None for _ in server.stdout])
+    return server
+
+
+def print_row(row):
+    cpu = f"{row['server_cpu']:.0f}%" if row["server_cpu"] is not None else "-"
+    print(f"{row['sessions']:>8} {row['failed']:>6} {row['handshake_ms'][0]:>8.1f} {row['handshake_ms'][1]:>8.1f} "
+          f"{row['first_frame_ms'][0]:>8.0f} {row['first_frame_ms'][1]:>8.0f} {row['fps_mean']:>7.1f} "
+          f"{row['fps_min']:>7.1f} {row['errors_received']:>8} {row['error_p50']:>8.1f} {cpu:>8}", flush=True)
+    for failure in row["failures"]:
+        print(f"{'':>8} failure: {failure}")
+
+
+async def main(args):
+    server = None if args.server_pid or args.external else start_server(args)
+    pid = args.server_pid or (server.pid if server is not None else None)
+    cpu = ProcessTreeCPU(pid) if pid and os.path.isdir("/proc") else None
+    rows = []
+    try:
+        print(f"{'sessions':>8} {'failed':>6} {'hs p50':>8} {'hs p95':>8} {'ttff p50':>8} {'ttff p95':>8} "
+              f"{'fps':>7} {'fps min':>7} {'errors':>8} {'err p50':>8} {'srv cpu':>8}")
+        for level in args.sessions:
+            rows.append(await run_level(level, args, cpu))
+            print_row(rows[-1])
+            await asyncio.sleep(args.cooldown)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "levels": rows}, f, indent=2)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Drive many concurrent WebTransport + WebRTC sessions on loopback.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50, 100],
+                        help="Concurrency levels, run one after another")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds each session watches the video")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which a level's sessions are started")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Pause between levels")
+    parser.add_argument("--timeout", type=float, default=20.0, help="Handshake and answer timeout per session")
+    parser.add_argument("--coords-rate", type=float, default=10.0, help="Coords samples per second per session (0 = none)")
+    parser.add_argument("--batch", type=int, default=1, help="Coords samples per datagram")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--external", action="store_true", help="Use a server that is already running")
+    parser.add_argument("--server-pid", type=int, help="Already-running server to measure CPU of (implies --external)")
+    parser.add_argument("--output", help="Also write the results as JSON")
+    parser.add_argument("--min-fps", type=float, help="Exit non-zero if any level's mean fps falls below this")
+    parser.add_argument("--log-level", default=None)
+    parser.add_argument("server_args", nargs=argparse.REMAINDER,
+                        help="After --, extra arguments for server/app.py (e.g. -- --broadcast --pool-min 4)")
+    args = parser.parse_args()
+    if args.server_args[:1] == ["--"]:
+        args.server_args = args.server_args[1:]
+    configure(args.log_level or "WARNING")
+    rows = asyncio.run(main(args))
+    if args.min_fps is not None and any(row["fps_mean"] < args.min_fps for row in rows):
+        print(f"FAILED: mean fps below {args.min_fps}")
+        sys.exit(1)
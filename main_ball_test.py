@@ -4,12 +4,20 @@ import time
 import cv2
 import argparse
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import av
 from bouncing_ball import BouncingBall
+from renderer import FrameRenderer
 
+RADIUS = 40
+SPEED = (400, 300)
 
-def run_simulation(width=640, height=480, fps=30, duration=5, output_dir="output", save_video=True):
+
+def run_simulation(width=640, height=480, fps=30, duration=5, output_dir="output", save_video=True, incremental=False):
     os.makedirs(output_dir, exist_ok=True)
-    ball = BouncingBall(width, height, radius=40, speed=(400, 300))
+    ball = BouncingBall(width, height, radius=RADIUS, speed=SPEED)
+    renderer = FrameRenderer(width, height) if incremental else None
     frame_duration = 1.0 / fps
     total_frames = int(fps * duration)
 
@@ -35,7 +43,7 @@ def run_simulation(width=640, height=480, fps=30, duration=5, output_dir="output
 
             print(f"[Frame {frame_id}] Position: {pos} | Velocity: {vel} | Δt: {dt:.3f}s")
 
-            frame = ball.render()
+            frame = ball.render(renderer)
 
             if save_video:
                 out.write(frame)
@@ -53,12 +61,110 @@ def run_simulation(width=640, height=480, fps=30, duration=5, output_dir="output
         print("Simulation finished.")
 
 
+def chunk_states(width, height, fps, total_frames, chunk_frames):
+    """[(start, count, position, velocity)] for each chunk, with a fixed dt of 1/fps.
+
+    Only the physics is stepped here, which is cheap; the state recorded at
+    each chunk's first frame is exactly what a sequential run would have.
+    """
+    ball = BouncingBall(width, height, radius=RADIUS, speed=SPEED)
+    dt = 1.0 / fps
+    chunks = []
+    for start in range(0, total_frames, chunk_frames):
+        chunks.append((start, min(chunk_frames, total_frames - start), ball.position.copy(), ball.velocity.copy()))
+        for _ in range(chunks[-1][1]):
+            ball.step(dt)
+    return chunks
+
+
+def render_segment(path, width, height, fps, count, position, velocity, codec="libx264"):
+    """Render and encode `count` frames starting from the given ball state."""
+    ball = BouncingBall(width, height, radius=RADIUS, speed=SPEED)
+    ball.position = position
+    ball.velocity = velocity
+    renderer = FrameRenderer(width, height, pixel_format="yuv420p")
+    dt = 1.0 / fps
+    with av.open(path, "w") as container:
+        stream = container.add_stream(codec, rate=fps)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        for index in range(count):
+            ball.step(dt)
+            frame = av.VideoFrame.from_ndarray(ball.render(renderer), format="yuv420p")
+            frame.pts = index
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    return path
+
+
+def concat_segments(paths, output_path, fps):
+    """Remux the segments back to back into one file, without re-encoding."""
+    with av.open(output_path, "w") as output:
+        out_stream = None
+        offset = 0  # segment start, in seconds
+        for path in paths:
+            with av.open(path) as segment:
+                in_stream = segment.streams.video[0]
+                if out_stream is None:
+                    out_stream = output.add_stream_from_template(in_stream)
+                shift = int(round(offset / in_stream.time_base))
+                frames = 0
+                for packet in segment.demux(in_stream):
+                    if packet.dts is None:
+                        continue
+                    packet.pts += shift
+                    packet.dts += shift
+                    packet.stream = out_stream
+                    output.mux(packet)
+                    frames += 1
+            offset += frames / fps
+    return output_path
+
+
+def run_offline(width=640, height=480, fps=30, duration=5, output_dir="output", workers=None, chunk_seconds=10.0,
+                codec="libx264"):
+    """Render a clip faster than real time: fixed-dt chunks encoded in a process pool, then concatenated.
+
+    The result is deterministic and frame-for-frame identical to stepping
+    the ball by 1/fps sequentially, whatever the number of workers.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    total_frames = int(fps * duration)
+    chunk_frames = max(1, int(round(chunk_seconds * fps)))
+    chunks = chunk_states(width, height, fps, total_frames, chunk_frames)
+    video_path = os.path.join(output_dir, "bouncing_ball.mp4")
+    print(f"Rendering {total_frames} frames offline in {len(chunks)} chunks.")
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmp, ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(render_segment, os.path.join(tmp, f"segment_{start:06d}.mp4"), width, height, fps,
+                               count, position, velocity, codec)
+                   for start, count, position, velocity in chunks]
+        concat_segments([future.result() for future in futures], video_path, fps)
+    elapsed = time.perf_counter() - started
+    print(f"Saved {video_path} in {elapsed:.2f}s ({duration / elapsed:.1f}x real time).")
+    return video_path
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Visualize a bouncing ball simulation.")
     parser.add_argument("--duration", type=float, default=5.0, help="Simulation duration (seconds)")
     parser.add_argument("--fps", type=int, default=30, help="Frames per second")
     parser.add_argument("--output", type=str, default="output", help="Output directory for frames or video")
     parser.add_argument("--video", action="store_true", default=True, help="Save as video instead of frames")
+    parser.add_argument("--incremental", action="store_true", help="Reuse one frame buffer and redraw only the ball box")
+    parser.add_argument("--offline", action="store_true",
+                        help="Render with a fixed dt as fast as possible, in parallel chunks")
+    parser.add_argument("--workers", type=int, default=None, help="Offline worker processes (default: all cores)")
+    parser.add_argument("--chunk-seconds", type=float, default=10.0, help="Offline chunk length")
 
     args = parser.parse_args()
-    run_simulation(fps=args.fps, duration=args.duration, output_dir=args.output, save_video=args.video)
+    if args.offline:
+        run_offline(fps=args.fps, duration=args.duration, output_dir=args.output, workers=args.workers,
+                    chunk_seconds=args.chunk_seconds)
+    else:
+        run_simulation(fps=args.fps, duration=args.duration, output_dir=args.output, save_video=args.video,
+                       incremental=args.incremental)
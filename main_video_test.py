@@ -7,6 +7,7 @@ import unittest
 import os
 import cv2
 import numpy as np
+from pipeline_log import configure
 import test_video_track
 
 def run_tests():
@@ -17,18 +18,21 @@ def run_tests():
     print("Tests complete.\n")
     return result.wasSuccessful()
 
-async def simulate_track_output(duration=5.0, fps=30, output="output", save_video=True):
+async def simulate_track_output(duration=5.0, fps=30, output="output", save_video=True, ring=False):
     from video_track import BouncingBallTrack
     from frame_worker import FrameProducer
+    from frame_ring import FrameRing
+    from frame_signal import FrameSignal
 
     os.makedirs(output, exist_ok=True)
-    frame_queue = mp.Queue(maxsize=2)
+    frame_queue = FrameRing(width=640, height=480) if ring else mp.Queue(maxsize=2)
     stop_event = mp.Event()
-    producer = FrameProducer(frame_queue, fps=fps, stop_event=stop_event, duration=duration)
+    signal = FrameSignal()
+    producer = FrameProducer(frame_queue, fps=fps, stop_event=stop_event, duration=duration, signal=signal)
     producer.start()
 
     try:
-        track = BouncingBallTrack(frame_queue, fps=fps)
+        track = BouncingBallTrack(frame_queue, fps=fps, signal=signal)
         num_frames = int(duration * fps)
 
         print(f"Simulating {num_frames} frames at {fps} FPS:")
@@ -60,15 +64,20 @@ async def simulate_track_output(duration=5.0, fps=30, output="output", save_vide
         stop_event.set()
         producer.terminate()
         producer.join()
+        signal.close()
+        if ring:
+            frame_queue.close()
 
 if __name__ == '__main__':
     mp.set_start_method('spawn', force=True)
+    configure()
 
     parser = argparse.ArgumentParser(description="Visualize a bouncing ball simulation.")
     parser.add_argument("--duration", type=float, default=5.0, help="Simulation duration (seconds)")
     parser.add_argument("--fps", type=int, default=30, help="Frames per second")
     parser.add_argument("--output", type=str, default="output", help="Output directory for frames or video")
     parser.add_argument("--video", action="store_true", default=True, help="Save as video instead of frames")
+    parser.add_argument("--ring", action="store_true", help="Use the shared-memory frame ring instead of mp.Queue")
 
     args = parser.parse_args()
 
@@ -77,7 +86,8 @@ if __name__ == '__main__':
             duration=args.duration,
             fps=args.fps,
             output=args.output,
-            save_video=args.video
+            save_video=args.video,
+            ring=args.ring
         ))
     else:
         print("Tests failed. Simulation skipped.")
@@ -7,6 +7,7 @@ import cv2
 import argparse
 import os
 from frame_worker import FrameProducer
+from pipeline_log import configure
 import test_frame_worker  # unit test module
 
 def run_tests():
@@ -62,6 +63,7 @@ def simulate_track_output(duration=5.0, fps=30, output="output", save_video=True
 
 if __name__ == "__main__":
     mp.set_start_method('spawn', force=True)
+    configure()
 
     parser = argparse.ArgumentParser(description="Simulate bouncing ball output to file.")
     parser.add_argument("--duration", type=float, default=5.0, help="Simulation duration (seconds)")
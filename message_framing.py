@@ -0,0 +1,116 @@
+# Incremental newline-delimited message decoder for the WebTransport control stream
+
+import json
+import re
+
+DELIMITER = b"\n"
+
+# Bytes that change a JSON document's nesting depth or string state
+_JSON_STRUCTURE = re.compile(rb'[{}"\\]')
+
+
+def encode_message(message):
+    """Encode one JSON message as a newline-terminated frame."""
+    return json.dumps(message).encode() + DELIMITER
+
+
+class MessageDecoder:
+    """Splits a byte stream into newline-delimited messages, whatever the chunking.
+
+    Bytes are appended to one reusable bytearray. Each feed() scans only the
+    new bytes for delimiters and returns every complete message, while a
+    partial message stays buffered for the next chunk. Consumed bytes are
+    dropped lazily, once they make up half the buffer, so the front of the
+    buffer is not shifted on every call.
+
+    With `legacy_json`, an unterminated remainder that parses as a whole
+    JSON document is also returned, for clients that send one bare
+    document per write. The remainder's brace depth is tracked across
+    chunks, so json.loads runs once per closed document rather than on
+    the whole remainder for every chunk.
+    """
+
+    def __init__(self, max_message=1 << 20, legacy_json=True):
+        self.max_message = max_message
+        self.legacy_json = legacy_json
+        self._buffer = bytearray()
+        self._start = 0  # first byte of the pending message
+        self._scan = 0  # first byte not yet searched for a delimiter
+        self._json_state = (0, False, False)  # remainder's brace depth, in a string, after a backslash
+
+    @property
+    def pending(self):
+        return len(self._buffer) - self._start
+
+    def feed(self, data):
+        buffer = self._buffer
+        new = len(buffer)
+        buffer += data
+        messages = []
+        view = memoryview(buffer)
+        try:
+            start = self._start
+            while True:
+                end = buffer.find(DELIMITER, self._scan)
+                if end < 0:
+                    break
+                if end > self._start:
+                    messages.append(view[self._start:end].tobytes())
+                self._start = self._scan = end + 1
+            self._scan = len(buffer)
+            if self._start != start:
+                self._json_state = (0, False, False)
+                new = self._start
+            if self.legacy_json and self.pending and self._closes_document(new):
+                remainder = view[self._start:].tobytes()
+                try:
+                    json.loads(remainder)
+                except ValueError:
+                    pass
+                else:
+                    messages.append(remainder)
+                    self._start = len(buffer)
+                    self._json_state = (0, False, False)
+        finally:
+            view.release()
+
+        if self.pending > self.max_message:
+            self._reset()
+            raise ValueError(f"message exceeds {self.max_message} bytes without a delimiter")
+        if self._start == len(buffer):
+            self._reset()
+        elif self._start * 2 > len(buffer):
+            del buffer[:self._start]
+            self._scan -= self._start
+            self._start = 0
+        return messages
+
+    def _closes_document(self, new):
+        """Advance the remainder's JSON state over buffer[new:]; True if that ends an object."""
+        buffer = self._buffer
+        if buffer[self._start] != ord("{"):
+            return False
+        depth, in_string, escaped = self._json_state
+        skip = new if escaped else -1  # byte escaped by a backslash
+        for match in _JSON_STRUCTURE.finditer(buffer, new):
+            if match.start() == skip:
+                continue
+            token = match.group()
+            if in_string:
+                if token == b"\\":
+                    skip = match.end()
+                elif token == b'"':
+                    in_string = False
+            elif token == b'"':
+                in_string = True
+            elif token == b"{":
+                depth += 1
+            elif token == b"}":
+                depth -= 1
+        self._json_state = (depth, in_string, skip == len(buffer))
+        return depth == 0 and not in_string and buffer.endswith(b"}")
+
+    def _reset(self):
+        del self._buffer[:]
+        self._start = self._scan = 0
+        self._json_state = (0, False, False)
@@ -0,0 +1,315 @@
+# Counters, gauges and histograms over flat float64 slots, rendered for Prometheus
+
+import bisect
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+STARTUP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Written by FrameProducer, usually from another process through SharedMetrics.
+PRODUCER_METRICS = (
+    ("ball_frames_produced_total", COUNTER, "Frames rendered by producers"),
+    ("ball_frames_dropped_total", COUNTER, "Frames dropped because the frame queue was full"),
+    ("ball_deadlines_missed_total", COUNTER, "Frame deadlines skipped because a producer fell behind"),
+    ("ball_producer_fps", GAUGE, "Frames per second rendered, summed over live producers"),
+    ("ball_queue_depth", GAUGE, "Frames waiting in producer queues (queue transport only)"),
+    ("ball_render_seconds", HISTOGRAM, "Time to step and render one frame", SECONDS_BUCKETS),
+)
+
+TRACK_METRICS = (
+    ("ball_track_frames_total", COUNTER, "Frames handed to WebRTC by BouncingBallTrack"),
+    ("ball_track_wait_seconds", HISTOGRAM, "Time recv() waited for a new frame", SECONDS_BUCKETS),
+    ("ball_track_repeated_frames_total", COUNTER, "Frames repeated, or sent black, because no new frame arrived"),
+    ("ball_track_black_frames_total", COUNTER, "Black frames sent before the first real frame"),
+)
+
+ENCODER_METRICS = (
+    ("ball_encoded_frames_total", COUNTER, "Frames encoded once for a broadcast tier"),
+    ("ball_encode_seconds", HISTOGRAM, "Time to encode one broadcast frame", SECONDS_BUCKETS),
+)
+
+SERVER_METRICS = (
+    ("ball_sessions_active", GAUGE, "Accepted WebTransport sessions"),
+    ("ball_peer_connections", GAUGE, "Open RTCPeerConnections"),
+    ("ball_quic_events_total", COUNTER, "QUIC events received"),
+    ("ball_quic_events_per_second", GAUGE, "QUIC events per second since the previous scrape"),
+)
+
+# Session start-up, each measured from the WebTransport CONNECT.
+SESSION_METRICS = (
+    ("ball_session_offer_seconds", HISTOGRAM, "CONNECT to the SDP offer arriving", STARTUP_BUCKETS),
+    ("ball_session_answer_seconds", HISTOGRAM, "CONNECT to the SDP answer being sent", STARTUP_BUCKETS),
+    ("ball_session_ice_connected_seconds", HISTOGRAM, "CONNECT to ICE connectivity", STARTUP_BUCKETS),
+    ("ball_time_to_first_frame_seconds", HISTOGRAM, "CONNECT to the first video frame handed to WebRTC",
+     STARTUP_BUCKETS),
+)
+SESSION_PHASES = {
+    "offer": "ball_session_offer_seconds",
+    "answer": "ball_session_answer_seconds",
+    "ice_connected": "ball_session_ice_connected_seconds",
+    "first_frame": "ball_time_to_first_frame_seconds",
+}
+
+# Kept by the supervisor of a multi-worker server.
+WORKER_METRICS = (
+    ("ball_workers", GAUGE, "Server worker processes configured"),
+    ("ball_workers_up", GAUGE, "Server worker processes answering health checks"),
+    ("ball_worker_restarts_total", COUNTER, "Server worker processes restarted after exiting"),
+)
+
+
+def _size(spec):
+    return len(spec[3]) + 3 if spec[1] == HISTOGRAM else 1  # buckets, +Inf, sum, count
+
+
+def layout_size(specs):
+    return sum(_size(spec) for spec in specs)
+
+
+class Counter:
+    def __init__(self, values, offset):
+        self._values = values
+        self._offset = offset
+
+    def inc(self, amount=1.0):
+        self._values[self._offset] += amount
+
+    @property
+    def value(self):
+        return float(self._values[self._offset])
+
+
+class Gauge(Counter):
+    def set(self, value):
+        self._values[self._offset] = value
+
+    def dec(self, amount=1.0):
+        self._values[self._offset] -= amount
+
+
+class Histogram:
+    """Fixed buckets stored non-cumulatively, then +Inf, sum and count."""
+
+    def __init__(self, values, offset, buckets):
+        self._values = values
+        self._offset = offset
+        self.buckets = buckets
+        self._sum = offset + len(buckets) + 1
+
+    def observe(self, value):
+        values = self._values
+        values[self._offset + bisect.bisect_left(self.buckets, value)] += 1
+        values[self._sum] += value
+        values[self._sum + 1] += 1
+
+    @property
+    def count(self):
+        return float(self._values[self._sum + 1])
+
+
+class MetricSet:
+    """A fixed list of metrics laid out over one float64 array.
+
+    Updating a metric is one indexed add on the array, so a set can live in
+    shared memory with a single writing process and any number of readers,
+    no locks involved.
+    """
+
+    def __init__(self, specs, values=None):
+        self.specs = specs
+        self.values = values if values is not None else np.zeros(layout_size(specs))
+        self._metrics = {}
+        offset = 0
+        for spec in specs:
+            name, kind = spec[0], spec[1]
+            if kind == HISTOGRAM:
+                self._metrics[name] = Histogram(self.values, offset, spec[3])
+            else:
+                self._metrics[name] = (Counter if kind == COUNTER else Gauge)(self.values, offset)
+            offset += _size(spec)
+
+    def __getitem__(self, name):
+        return self._metrics[name]
+
+
+class SharedMetrics(MetricSet):
+    """A MetricSet in shared memory; pickles by name like FrameRing."""
+
+    def __init__(self, specs, name=None):
+        self.owner = name is None
+        size = 8 * layout_size(specs)
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        values = np.ndarray((layout_size(specs),), dtype=np.float64, buffer=self.shm.buf)
+        if self.owner:
+            values[:] = 0
+        super().__init__(specs, values)
+
+    def __getstate__(self):
+        return {"specs": self.specs, "name": self.shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["specs"], state["name"])
+
+    def close(self):
+        self.values = None
+        self._metrics = {}
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+class MetricsRegistry:
+    """All metric sets of a process, rendered as one Prometheus text page.
+
+    Sets sharing the same specs are summed, which is how values from many
+    producer processes are aggregated. When a shared set is released its
+    counters and histograms are folded into a retired total so they never
+    go backwards; its gauges simply stop contributing.
+    """
+
+    def __init__(self):
+        self._sets = []
+        self._retired = {}
+        self._collectors = []
+
+    def local(self, specs):
+        metrics = MetricSet(specs)
+        self._sets.append(metrics)
+        return metrics
+
+    def shared(self, specs):
+        metrics = SharedMetrics(specs)
+        self._sets.append(metrics)
+        return metrics
+
+    def release(self, metrics):
+        """Stop reading a shared set (its writer is done) and close it."""
+        if metrics not in self._sets:
+            return
+        self._sets.remove(metrics)
+        retired = self._retired.setdefault(metrics.specs, np.zeros(layout_size(metrics.specs)))
+        offset = 0
+        for spec in metrics.specs:
+            size = _size(spec)
+            if spec[1] != GAUGE:
+                retired[offset:offset + size] += metrics.values[offset:offset + size]
+            offset += size
+        if isinstance(metrics, SharedMetrics):
+            metrics.close()
+
+    def on_collect(self, callback):
+        """Run `callback()` before each render, e.g. to refresh derived gauges."""
+        self._collectors.append(callback)
+
+    def totals(self):
+        """{specs: summed values} over live and retired sets."""
+        totals = {specs: values.copy() for specs, values in self._retired.items()}
+        for metrics in self._sets:
+            if metrics.specs in totals:
+                totals[metrics.specs] += metrics.values
+            else:
+                totals[metrics.specs] = metrics.values.copy()
+        return totals
+
+    def render(self):
+        for callback in self._collectors:
+            callback()
+        lines = []
+        for specs, values in self.totals().items():
+            offset = 0
+            for spec in specs:
+                name, kind, help_text = spec[:3]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == HISTOGRAM:
+                    buckets = spec[3]
+                    cumulative = np.cumsum(values[offset:offset + len(buckets) + 1])
+                    for bound, count in zip(buckets, cumulative):
+                        lines.append(f'{name}_bucket{{le="{bound}"}} {count:g}')
+                    lines.append(f'{name}_bucket{{le="+Inf"}} {cumulative[-1]:g}')
+                    lines.append(f"{name}_sum {values[offset + len(buckets) + 1]:g}")
+                    lines.append(f"{name}_count {values[offset + len(buckets) + 2]:g}")
+                else:
+                    lines.append(f"{name} {values[offset]:g}")
+                offset += _size(spec)
+        return "\n".join(lines) + "\n"
+
+
+def merge_pages(pages):
+    """Sum Prometheus text pages sample by sample, e.g. the pages of several server processes.
+
+    Every metric here is a counter, a gauge or histogram series that adds
+    up across processes, so merging is a sum per series; HELP and TYPE
+    lines are kept once, in first-seen order.
+    """
+    order, values = [], {}
+    for page in pages:
+        for line in page.splitlines():
+            if not line:
+                continue
+            if line.startswith("#"):
+                if line not in values:
+                    order.append(line)
+                    values[line] = None
+                continue
+            series, value = line.rsplit(" ", 1)
+            if series not in values:
+                order.append(series)
+                values[series] = 0.0
+            values[series] += float(value)
+    return "\n".join(key if values[key] is None else f"{key} {values[key]:g}" for key in order) + "\n"
+
+
+class RateGauge:
+    """Turns a counter into a per-second gauge, refreshed at each scrape."""
+
+    def __init__(self, counter, gauge, clock=time.monotonic):
+        self.counter = counter
+        self.gauge = gauge
+        self._clock = clock
+        self._last = (clock(), counter.value)
+
+    def __call__(self):
+        now, value = self._clock(), self.counter.value
+        then, before = self._last
+        if now > then:
+            self.gauge.set((value - before) / (now - then))
+        self._last = (now, value)
+
+
+class PhaseTimer:
+    """Seconds from a start (e.g. a session's CONNECT) to each named phase.
+
+    Each phase counts once, into the histogram `phases` maps it to, so a
+    repeated event (a second ICE check, every later frame) is ignored.
+    """
+
+    def __init__(self, metrics, phases=SESSION_PHASES, clock=time.monotonic):
+        self.metrics = metrics
+        self.phases = phases
+        self._clock = clock
+        self.started = clock()
+        self.elapsed = {}
+
+    def mark(self, phase):
+        """Record `phase` now; returns its seconds since the start, or None if it was already recorded."""
+        if phase in self.elapsed:
+            return None
+        elapsed = self.elapsed[phase] = self._clock() - self.started
+        self.metrics[self.phases[phase]].observe(elapsed)
+        return elapsed
+
+
+REGISTRY = MetricsRegistry()
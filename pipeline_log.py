@@ -0,0 +1,155 @@
+# Leveled, rate-limited logging and sampled frame snapshots for the pipeline
+
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+ROOT = "ball"
+LEVEL_ENV = "BALL_LOG_LEVEL"
+SNAPSHOT_ENV = "BALL_SNAPSHOT_EVERY"
+
+_loggers = {}
+
+
+class FieldFormatter(logging.Formatter):
+    """Appends structured fields passed through `extra={"fields": ...}` as key=value."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class PipelineLogger:
+    """Wraps a logging.Logger with cached level checks and rate limiting.
+
+    Hot paths test `log.debug_on` (a plain attribute) before building any
+    message, so a disabled debug line costs one attribute read per frame.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self._last = {}
+        self._suppressed = {}
+        self.refresh()
+
+    def refresh(self):
+        self.debug_on = self.logger.isEnabledFor(logging.DEBUG)
+        self.info_on = self.logger.isEnabledFor(logging.INFO)
+
+    def _log(self, level, msg, args, fields):
+        self.logger.log(level, msg, *args, extra={"fields": fields} if fields else None)
+
+    def debug(self, msg, *args, **fields):
+        if self.debug_on:
+            self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg, *args, **fields):
+        if self.info_on:
+            self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg, *args, **fields):
+        self._log(logging.WARNING, msg, args, fields)
+
+    def error(self, msg, *args, **fields):
+        self._log(logging.ERROR, msg, args, fields)
+
+    def every(self, key, interval):
+        """True at most once per `interval` seconds for `key`; counts the rest."""
+        now = time.monotonic()
+        if now - self._last.get(key, -interval) < interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        self._last[key] = now
+        return True
+
+    def debug_every(self, key, interval, msg, *args, **fields):
+        """Rate-limited debug line; reports how many were suppressed since the last one."""
+        if not self.debug_on or not self.every(key, interval):
+            return
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            fields["suppressed"] = suppressed
+        self._log(logging.DEBUG, msg, args, fields)
+
+
+def get_logger(name):
+    """Return the shared PipelineLogger for `ball.<name>`."""
+    log = _loggers.get(name)
+    if log is None:
+        log = _loggers[name] = PipelineLogger(logging.getLogger(f"{ROOT}.{name}"))
+    return log
+
+
+def configure(level=None):
+    """Set the pipeline log level (argument, then $BALL_LOG_LEVEL, then INFO).
+
+    Called by entry points and at the top of spawned processes, never on
+    import, so importing the pipeline leaves a host's logging alone. Safe
+    to call again.
+    """
+    level = level or os.environ.get(LEVEL_ENV, "INFO")
+    root = logging.getLogger(ROOT)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(FieldFormatter("%(levelname)s [%(name)s] %(message)s"))
+        root.addHandler(handler)
+        root.propagate = False
+    for log in _loggers.values():
+        log.refresh()
+
+
+class FrameSnapshotter:
+    """Writes one frame every `every` frames to disk from a background thread.
+
+    The hot path only copies the sampled frame into a one-slot queue; if the
+    writer is still busy with the previous snapshot the new one is dropped.
+    every=0 disables it entirely.
+    """
+
+    def __init__(self, every=None, path="/tmp/test_frame.png", pixel_format="bgr24"):
+        if every is None:
+            every = int(os.environ.get(SNAPSHOT_ENV, "0"))
+        self.every = every
+        self.path = path
+        self.pixel_format = pixel_format
+        self.written = 0
+        self.dropped = 0
+        self._pending = queue.Queue(maxsize=1)
+        self._thread = None
+
+    def maybe(self, frame, index):
+        if not self.every or index % self.every:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="frame-snapshot", daemon=True)
+            self._thread.start()
+        try:
+            self._pending.put_nowait(frame.copy())
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        while True:
+            frame = self._pending.get()
+            if frame is None:
+                return
+            if self.pixel_format == "yuv420p":
+                frame = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+            cv2.imwrite(self.path, frame)
+            self.written += 1
+
+    def close(self):
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
@@ -0,0 +1,202 @@
+# Pre-spawned FrameProducer workers that take sessions without a process start
+
+import multiprocessing as mp
+import multiprocessing.connection
+import threading
+import time
+from frame_worker import FrameProducer
+from pipeline_log import get_logger, configure
+
+log = get_logger("pool")
+
+
+def serve_sessions(conn, pool_conn, stop_event):
+    """Pool worker main loop: runs one FrameProducer session at a time.
+
+    numpy, cv2 and the renderer are imported once at spawn. Sessions arrive
+    over a Pipe as FrameProducer keyword arguments; the frame transport has
+    to be a FrameRing (it pickles by name) because mp.Queue and mp.Event can
+    only be inherited, not sent. The worker's own `stop_event` is inherited
+    at spawn and reused to end each session. If the pool's process dies the
+    current session is stopped and the pipe reads EOF, so the worker exits
+    rather than outliving the server.
+    """
+    pool_conn.close()  # with fork we'd hold the pool's end open ourselves and never see EOF
+    configure()
+    threading.Thread(target=_stop_when_orphaned, args=(stop_event,), daemon=True).start()
+    try:
+        conn.send(("ready", None))
+        while True:
+            session = conn.recv()
+            if session is None:
+                return
+            conn.send(("done", _run_session(stop_event, session)))
+    except (EOFError, OSError):
+        return
+
+
+def _stop_when_orphaned(stop_event):
+    mp.connection.wait([mp.parent_process().sentinel])
+    stop_event.set()
+
+
+def _run_session(stop_event, session):
+    producer = FrameProducer(stop_event=stop_event, **session)
+    try:
+        producer.run()
+        return producer.clock_stats
+    except Exception as e:
+        log.error("Session failed", error=e)
+        return None
+    finally:
+        producer.frame_queue.close()
+        if producer.timeline is not None:
+            producer.timeline.close()
+        if producer.signal is not None:
+            producer.signal.close()
+        if producer.metrics is not None:
+            producer.metrics.close()
+
+
+class PoolSession:
+    """Handle for a session running on a pool worker."""
+
+    def __init__(self, pool, worker):
+        self.pool = pool
+        self.worker = worker
+        self.started = time.monotonic()
+
+    def stop(self):
+        # The worker may have finished this session and moved on to another peer's.
+        if self.worker.session is self:
+            self.worker.stop_event.set()
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.stop_event = ctx.Event()
+        self.process = ctx.Process(target=serve_sessions, args=(child, self.conn, self.stop_event), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.session = None
+        self.sessions = 0
+        self.retired_at = None
+
+
+class ProducerPool:
+    """Keeps `min_workers` warm producer processes and hands sessions to idle ones.
+
+    Up to `max_workers` processes run at once; a worker is retired after
+    `max_sessions` sessions so leaks can't accumulate. Finished sessions and
+    retired processes are collected lazily whenever the pool is used, and
+    never waited on, because the pool is used from the server's event loop.
+    """
+
+    def __init__(self, min_workers=1, max_workers=8, max_sessions=100, start_method="spawn"):
+        self.min_workers = min_workers
+        self.max_workers = max(max_workers, min_workers)
+        self.max_sessions = max_sessions
+        self.ctx = mp.get_context(start_method)
+        self.workers = []
+        self.retiring = []  # told to exit, not yet seen to have exited
+        self.counters = {"spawned": 0, "retired": 0, "started": 0, "finished": 0, "warm": 0, "cold": 0,
+                         "rejected": 0}
+
+    def start(self):
+        while len(self.workers) < self.min_workers:
+            self._spawn()
+        return self
+
+    def _spawn(self):
+        worker = _Worker(self.ctx)
+        self.workers.append(worker)
+        self.counters["spawned"] += 1
+        return worker
+
+    def _retire(self, worker):
+        self.workers.remove(worker)
+        try:
+            worker.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        worker.retired_at = time.monotonic()
+        self.retiring.append(worker)
+        self.counters["retired"] += 1
+
+    def _collect_retired(self, grace=2.0):
+        """Close retired workers that have exited; terminate any still running after `grace` seconds."""
+        for worker in list(self.retiring):
+            if worker.process.is_alive() and time.monotonic() - worker.retired_at > grace:
+                worker.process.terminate()
+            if not worker.process.is_alive():  # also reaps the exited child
+                worker.conn.close()
+                self.retiring.remove(worker)
+
+    def reap(self):
+        """Collect finished sessions and replace dead or worn-out workers."""
+        self._collect_retired()
+        for worker in list(self.workers):
+            if not worker.process.is_alive():
+                self.workers.remove(worker)
+                log.warning("Worker died", pid=worker.process.pid, exitcode=worker.process.exitcode)
+                continue
+            while worker.conn.poll():
+                kind, stats = worker.conn.recv()
+                if kind == "ready":
+                    worker.ready = True
+                elif kind == "done":
+                    worker.session = None
+                    self.counters["finished"] += 1
+                    log.debug("Session finished", pid=worker.process.pid, stats=stats)
+            if worker.session is None and worker.sessions >= self.max_sessions:
+                self._retire(worker)
+        self.start()
+
+    def start_session(self, ring, signal=None, **producer_args):
+        """Run a FrameProducer into `ring` on an idle worker; None if the pool is full."""
+        self.reap()
+        idle = [worker for worker in self.workers if worker.session is None]
+        # Prefer a worker that has finished importing.
+        idle.sort(key=lambda worker: not worker.ready)
+        if idle:
+            worker = idle[0]
+        elif len(self.workers) < self.max_workers:
+            worker = self._spawn()
+        else:
+            self.counters["rejected"] += 1
+            log.warning("Producer pool exhausted", workers=len(self.workers))
+            return None
+
+        self.counters["warm" if worker.ready else "cold"] += 1
+        worker.stop_event.clear()
+        worker.conn.send(dict(producer_args, frame_queue=ring, signal=signal))
+        worker.session = PoolSession(self, worker)
+        worker.sessions += 1
+        self.counters["started"] += 1
+
+        # Keep a spare warm for the next arrival.
+        busy = sum(1 for w in self.workers if w.session is not None)
+        if busy == len(self.workers) and len(self.workers) < self.max_workers:
+            self._spawn()
+        return worker.session
+
+    def stats(self):
+        self.reap()
+        busy = sum(1 for worker in self.workers if worker.session is not None)
+        return dict(self.counters, workers=len(self.workers), busy=busy, idle=len(self.workers) - busy,
+                    ready=sum(1 for worker in self.workers if worker.ready))
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop_event.set()
+        for worker in list(self.workers):
+            self._retire(worker)
+        # Shutting down, so here it's fine to wait.
+        for worker in self.retiring:
+            worker.process.join(timeout=2)
+        self._collect_retired(grace=0)
+        for worker in self.retiring:
+            worker.process.join(timeout=1)
+        self._collect_retired(grace=0)
@@ -0,0 +1,144 @@
+# Incremental ball renderer that reuses preallocated frame buffers
+
+import numpy as np
+from sprites import SpriteCache, blit
+
+PIXEL_FORMATS = ("bgr24", "yuv420p")
+
+
+def frame_shape(width, height, pixel_format="bgr24"):
+    """Array shape of one frame; I420 is stored as Y, U, V planes stacked in one 2-D array."""
+    if pixel_format == "bgr24":
+        return (height, width, 3)
+    if pixel_format == "yuv420p":
+        if width % 2 or height % 2:
+            raise ValueError("yuv420p frames need even dimensions")
+        return (height * 3 // 2, width)
+    raise ValueError(f"unsupported pixel format {pixel_format!r}")
+
+
+def bgr_to_yuv(color):
+    """BT.601 limited-range (Y, U, V) for a BGR colour, as encoders expect."""
+    b, g, r = (float(c) for c in color)
+    y = 16 + (65.481 * r + 128.553 * g + 24.966 * b) / 255
+    u = 128 + (-37.797 * r - 74.203 * g + 112.0 * b) / 255
+    v = 128 + (112.0 * r - 93.786 * g - 18.214 * b) / 255
+    return tuple(int(round(min(max(c, 0), 255))) for c in (y, u, v))
+
+
+def planes(frame, pixel_format="bgr24"):
+    """(plane, scale) views into a frame; chroma planes are half size."""
+    if pixel_format == "bgr24":
+        return [(frame, 1)]
+    height = frame.shape[0] * 2 // 3
+    width = frame.shape[1]
+    quarter = height // 4
+    u = frame[height:height + quarter].reshape(height // 2, width // 2)
+    v = frame[height + quarter:].reshape(height // 2, width // 2)
+    return [(frame[:height], 1), (u, 2), (v, 2)]
+
+
+def blank_frame(width, height, pixel_format="bgr24"):
+    """A black frame (Y=16, U=V=128 for I420)."""
+    frame = np.zeros(frame_shape(width, height, pixel_format), dtype=np.uint8)
+    if pixel_format == "yuv420p":
+        for (plane, _), level in zip(planes(frame, pixel_format), bgr_to_yuv((0, 0, 0))):
+            plane.fill(level)
+    return frame
+
+
+class FrameRenderer:
+    """Draw a BallField into reused frames, clearing only dirty rectangles.
+
+    Each buffer remembers the boxes it last drew, so with several buffers
+    (double buffering) a buffer is cleared where *it* was drawn, not where
+    the previous frame was. Returned frames are views into the buffers and
+    stay valid until the same buffer comes round again.
+
+    Balls are stamped from a SpriteCache, one scatter per distinct
+    (radius, sub-pixel phase) group rather than one cv2.circle per ball.
+    With pixel_format="yuv420p" a ball is a luma disc plus a half-size
+    disc in each chroma plane, so the frame needs no colour conversion
+    before encoding.
+
+    `scale` is field units per output pixel: scale=2 draws a 640x480 field
+    into a 320x240 frame.
+    """
+
+    def __init__(self, width, height, buffers=1, color=(0, 255, 0), incremental=True, frames=None,
+                 sprites=None, pixel_format="bgr24", scale=1):
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.color = color
+        self.incremental = incremental
+        self.pixel_format = pixel_format
+        self.sprites = sprites if sprites is not None else SpriteCache()
+        if pixel_format == "bgr24":
+            self._colors = [tuple(color)]
+            self._background = [0]
+        else:
+            self._colors = [(level,) for level in bgr_to_yuv(color)]
+            self._background = list(bgr_to_yuv((0, 0, 0)))
+        if frames is None:
+            frames = [blank_frame(width, height, pixel_format) for _ in range(buffers)]
+        self.frames = list(frames)
+        self._dirty = [None] * len(self.frames)
+        self._next = 0
+
+    def layout(self, field, scale=1, width=None, height=None):
+        """Integer centres, sub-pixel phases, radii and clipped sprite boxes."""
+        width = width or self.width
+        height = height or self.height
+        subpixel = self.sprites.subpixel
+        scaled = np.floor(field.positions * (subpixel / scale)).astype(np.int32)
+        centers = scaled // subpixel
+        phases = scaled - centers * subpixel
+        radii = (field.radii / scale).astype(np.int32)
+        reach = radii + 2  # sprite padding covers the phase offset and AA fringe
+        x0 = np.clip(centers[:, 0] - reach, 0, width)
+        y0 = np.clip(centers[:, 1] - reach, 0, height)
+        x1 = np.clip(centers[:, 0] + reach + 1, 0, width)
+        y1 = np.clip(centers[:, 1] + reach + 1, 0, height)
+        return centers, phases, radii, np.stack([x0, y0, x1, y1], axis=1)
+
+    def clear(self, plane, dirty, level):
+        if not self.incremental or dirty is None:
+            plane.fill(level)
+            return
+        area = np.sum((dirty[:, 2] - dirty[:, 0]) * (dirty[:, 3] - dirty[:, 1]))
+        if area * 2 > plane.shape[0] * plane.shape[1]:
+            plane.fill(level)  # cheaper than walking thousands of boxes
+            return
+        for x0, y0, x1, y1 in dirty.tolist():
+            plane[y0:y1, x0:x1] = level
+
+    def draw(self, plane, field, scale, color):
+        """Stamp every ball into one plane; returns the boxes touched."""
+        height, width = plane.shape[:2]
+        centers, phases, radii, boxes = self.layout(field, scale, width, height)
+        subpixel = self.sprites.subpixel
+        keys = (radii * subpixel + phases[:, 0]) * subpixel + phases[:, 1]
+        order = np.argsort(keys, kind="stable")
+        splits = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, splits):
+            first = group[0]
+            sprite = self.sprites.get(int(radii[first]), color, int(phases[first, 0]), int(phases[first, 1]))
+            blit(plane, sprite, centers[group, 0], centers[group, 1])
+        return boxes
+
+    def render(self, field, index=None):
+        """Draw `field` into the next buffer (or buffer `index`) and return it."""
+        if index is None:
+            index = self._next
+            self._next = (self._next + 1) % len(self.frames)
+        frame = self.frames[index]
+        dirty = self._dirty[index] or [None] * len(self._colors)
+
+        touched = []
+        for (plane, scale), color, level, boxes in zip(planes(frame, self.pixel_format), self._colors,
+                                                         self._background, dirty):
+            self.clear(plane, boxes, level)
+            touched.append(self.draw(plane, field, scale * self.scale, color))
+        self._dirty[index] = touched
+        return frame
@@ -8,30 +8,55 @@ import json
 import asyncio
 import logging
 import argparse
+import time
 import multiprocessing as mp
 import traceback
+import numpy as np
 
 from aioquic.asyncio import QuicConnectionProtocol, serve
 from aioquic.h3.connection import H3Connection
-from aioquic.h3.events import HeadersReceived, DataReceived
+from aioquic.h3.events import HeadersReceived, DataReceived, DatagramReceived
 from aioquic.quic.events import ProtocolNegotiated, StreamDataReceived
 from aioquic.quic.configuration import QuicConfiguration
 from aioquic.h3.connection import H3_ALPN
 from OpenSSL import crypto
 import hashlib
-from aiortc import RTCPeerConnection, RTCSessionDescription
+from aiortc import RTCPeerConnection, RTCSessionDescription, RTCRtpSender
 
 from video_track import BouncingBallTrack
-from frame_worker import FrameProducer
+from frame_worker import FrameProducer, render_primer
+from frame_signal import FrameSignal
+from frame_ring import FrameRing
+from frame_timeline import FrameTimeline
+import coords_protocol
+from message_framing import MessageDecoder, encode_message
+from tracking_stats import TrackingRegistry
+from producer_pool import ProducerPool
+from broadcast import FrameBroadcast
+from encoded_track import tier_encoder
+from adaptive import AdaptiveController
+from aioquic.asyncio.server import QuicServer
+from server_workers import reuseport_sockets, stop_with_parent, WorkerSupervisor
+from metrics import (REGISTRY, PRODUCER_METRICS, SERVER_METRICS, SESSION_METRICS, WORKER_METRICS, PhaseTimer,
+                     RateGauge, merge_pages)
+from pipeline_log import get_logger, configure
 import contextlib
 
+log = get_logger("server")
+
 pcs = set()
 
+server_metrics = REGISTRY.local(SERVER_METRICS)
+session_metrics = REGISTRY.local(SESSION_METRICS)
+REGISTRY.on_collect(RateGauge(server_metrics["ball_quic_events_total"],
+                              server_metrics["ball_quic_events_per_second"]))
+
 from aiohttp import web
 
-async def serve_http():
-    app = web.Application()
+STARTED = time.monotonic()
 
+
+def add_static_routes(app):
     # Explicit route for "/"
     app.router.add_get("/", lambda req: web.FileResponse(
         os.path.join(os.path.dirname(__file__), "static/index.html")
@@ -40,124 +65,419 @@ async def serve_http():
     # Static files
     app.router.add_static("/", path=os.path.join(os.path.dirname(__file__), "static"), show_index=True)
 
-    runner = web.AppRunner(app)
+
+def prometheus_response(text):
+    return web.Response(body=text.encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+def make_http_app(app_ctx=None):
+    app = web.Application()
+    app_ctx = app_ctx if app_ctx is not None else {}
+
+    async def stats(request):
+        # Tracking accuracy per live session and across all sessions; ?sessions=0 for the aggregate only
+        tracking = app_ctx.get("tracking")
+        if request.query.get("state"):
+            # Mergeable state, for the front of a multi-worker server
+            return web.json_response((tracking or TrackingRegistry()).state())
+        if tracking is None:
+            return web.json_response({})
+        return web.json_response(tracking.summary(per_session=request.query.get("sessions") != "0"))
+
+    async def metrics(request):
+        # Producer, queue, track, encoder and server metrics in the Prometheus text format
+        return prometheus_response(REGISTRY.render())
+
+    async def health(request):
+        return web.json_response({"pid": os.getpid(), "uptime": time.monotonic() - STARTED,
+                                  "sessions": server_metrics["ball_sessions_active"].value,
+                                  "peer_connections": len(pcs)})
+
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/health", health)
+    add_static_routes(app)
+    return app
+
+
+def make_front_app(supervisor):
+    """The port-8000 app of a multi-worker server: static files plus every worker's stats, metrics and health."""
+    app = web.Application()
+
+    async def stats(request):
+        registry = TrackingRegistry()
+        for worker, state in zip(supervisor.workers, await supervisor.gather("/stats?state=1")):
+            if state is not None:
+                registry.merge_state(state, prefix=f"{worker.index}/")
+        return web.json_response(registry.summary(per_session=request.query.get("sessions") != "0"))
+
+    async def metrics(request):
+        await supervisor.health()  # refreshes the workers-up gauge
+        pages = await supervisor.gather("/metrics", text=True)
+        return prometheus_response(merge_pages([REGISTRY.render()] + [page for page in pages if page is not None]))
+
+    async def health(request):
+        workers = await supervisor.health()
+        healthy = sum(worker["healthy"] for worker in workers)
+        return web.json_response({"healthy": healthy, "total": len(workers), "workers": workers},
+                                 status=200 if healthy == len(workers) else 503)
+
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/health", health)
+    add_static_routes(app)
+    return app
+
+
+async def serve_http(app_ctx=None, path=None, app=None):
+    """Serve on port 8000, or on the Unix socket `path` (a worker's admin endpoint)."""
+    runner = web.AppRunner(app if app is not None else make_http_app(app_ctx))
     await runner.setup()
-    site = web.TCPSite(runner, host="0.0.0.0", port=8000)
+    if path is None:
+        site = web.TCPSite(runner, host="0.0.0.0", port=8000)
+    else:
+        site = web.UnixSite(runner, path)
     await site.start()
-    print("[DEBUG] HTTP server running on http://0.0.0.0:8000")
+    print(f"[DEBUG] HTTP server running on {path or 'http://0.0.0.0:8000'}")
+    return runner
 
 class WebTransportProtocol(QuicConnectionProtocol):
     def __init__(self, *args, app_ctx=None, **kwargs):
         super().__init__(*args, **kwargs)
         self._sessions = set()
         self.app_ctx = app_ctx
+        self.tracking = {}  # stream id -> (FrameTimeline, track) for coords lookups
+        self._decoders = {}  # stream id -> MessageDecoder
+        self.timers = {}  # stream id -> PhaseTimer from CONNECT until the first frame
         self._http = None
 
     def connection_made(self, transport):
         super().connection_made(transport)
         self._http = H3Connection(self._quic, enable_webtransport=True)
 
+    def connection_lost(self, exc):
+        # The peer connections may outlive this QUIC connection, so their
+        # close handlers can't be relied on to finish our tracking stats.
+        registry = self.app_ctx.get("tracking")
+        if registry is not None:
+            prefix = f"{id(self):x}/"
+            for key in [key for key in registry.sessions if key.startswith(prefix)]:
+                registry.close(key)
+        server_metrics["ball_sessions_active"].dec(len(self._sessions))
+        self._sessions.clear()
+        self._decoders.clear()
+        self.timers.clear()
+        super().connection_lost(exc)
+
     def quic_event_received(self, event):
-        print("[DEBUG] Received QUIC event:", type(event).__name__)
+        server_metrics["ball_quic_events_total"].inc()
+        if log.debug_on:
+            log.debug_every("quic-event", 1.0, "Received QUIC event", type=type(event).__name__)
         if isinstance(event, ProtocolNegotiated):
-            print(f" ALPN negotiated: {event.alpn_protocol}")
+            log.info("ALPN negotiated", alpn=event.alpn_protocol)
         if isinstance(event, StreamDataReceived):
-            print(f"[DEBUG] StreamDataReceived: stream_id={event.stream_id}, session_ids={self._sessions}")
-            # Add this:
-            if not self._sessions:
-                print("[ERROR] No WebTransport sessions accepted yet!")
             if event.stream_id in self._sessions:
-                print("[DEBUG] Dispatching stream data to handle_stream_data")
-                asyncio.ensure_future(self.handle_stream_data(event.stream_id, event.data))
-            else:
-                print("[DEBUG] Ignoring non-WebTransport stream:", event.stream_id)
+                asyncio.ensure_future(self.handle_stream_data(event.stream_id, event.data, event.end_stream))
+            elif not self._sessions:
+                log.debug_every("no-session", 1.0, "No WebTransport sessions accepted yet", stream_id=event.stream_id)
 
         try:
             for http_event in self._http.handle_event(event):
                 asyncio.ensure_future(self.handle_event(http_event))
         except Exception as e:
-            print("[ERROR] Failed to handle HTTP/3 event:", e)
+            log.error("Failed to handle HTTP/3 event", error=e)
 
     async def handle_event(self, event):
-        print(f"[DEBUG] handle_event called: {event}")
-        if isinstance(event, HeadersReceived):
+        if isinstance(event, DatagramReceived):
+            self.handle_datagram(event.stream_id, event.data)
+        elif isinstance(event, HeadersReceived):
             headers = dict(event.headers)
-            print("[DEBUG] HeadersReceived:", headers)
+            if log.debug_on:
+                log.debug("HeadersReceived", headers=headers)
             method = headers.get(b":method", b"").decode()
             protocol = headers.get(b":protocol", b"").decode()
             authority = headers.get(b":authority", b"").decode()
 
             if method == "CONNECT" and protocol == "webtransport":
                 stream_id = event.stream_id
-                print(f"[QUIC] Accepted WebTransport session on stream {stream_id} from {authority}")
+                self.timers[stream_id] = PhaseTimer(session_metrics)
+                log.info("Accepted WebTransport session", stream_id=stream_id, authority=authority)
                 self._sessions.add(stream_id)
-                await self._http.send_headers(stream_id, [
+                server_metrics["ball_sessions_active"].inc()
+                self._http.send_headers(stream_id, [
                     (b":status", b"200"),
                     (b"sec-webtransport-http3-draft", b"draft02"),
                     (b"access-control-allow-origin", b"*")
                 ])
                 self._quic.send_stream_data(stream_id, b"", end_stream=False)
             else:
-                print(f"[WARN] Rejected stream {event.stream_id}: method={method}, protocol={protocol}")
+                log.warning("Rejected stream", stream_id=event.stream_id, method=method, protocol=protocol)
                 self._http.send_headers(event.stream_id, [(b":status", b"400")])
+            # We're outside quic_event_received here, so nothing flushes for us.
+            self.transmit()
 
-    async def handle_stream_data(self, stream_id, data):
+    async def handle_stream_data(self, stream_id, data, end_stream=False):
+        # Split before the first await so chunks are decoded in arrival order.
+        decoder = self._decoders.get(stream_id)
+        if decoder is None:
+            decoder = self._decoders[stream_id] = MessageDecoder()
+        if end_stream:
+            del self._decoders[stream_id]
         try:
-            print(f"[DEBUG] Raw stream data on stream {stream_id}: {data!r}")
-            message = json.loads(data.decode())
-            print("[DEBUG] Stream data received:", message)
+            messages = decoder.feed(data)
+        except ValueError as e:
+            log.error("Dropped oversized message", stream_id=stream_id, error=e)
+            return
+        for raw in messages:
+            await self.handle_message(stream_id, raw)
+
+    async def handle_message(self, stream_id, raw):
+        try:
+            message = json.loads(raw)
+            if log.debug_on:
+                log.debug_every("stream-data", 1.0, "Stream data received", stream_id=stream_id, type=message.get("type"))
             if message.get("type") == "offer":
                 await self.process_offer(stream_id, message)
             elif message.get("type") == "coords":
                 cx, cy = message["x"], message["y"]
-                tx, ty = self.app_ctx.get("ground_truth", (320, 240))
+                tx, ty = self.ground_truth(stream_id, message.get("frame"), message.get("media_time"))
                 error = {"type": "error", "error_x": tx - cx, "error_y": ty - cy}
-                await self._http.send_data(stream_id, json.dumps(error).encode(), end_stream=False)
-                print("[DEBUG] Sent SDP answer to stream", stream_id)
+                self.tracking_stats(stream_id).add(error["error_x"], error["error_y"])
+                self._http.send_data(stream_id, encode_message(error), end_stream=False)
+                self.transmit()
         except Exception as e:
-            print("[ERROR] Failed to handle stream data:", e)
+            log.error("Failed to handle stream data", stream_id=stream_id, error=e)
+
+    def tracking_stats(self, stream_id):
+        """This session's TrackingStats in the server-wide registry."""
+        registry = self.app_ctx.setdefault("tracking", TrackingRegistry())
+        return registry.session(f"{id(self):x}/{stream_id}")
+
+    def close_tracking_stats(self, stream_id):
+        registry = self.app_ctx.get("tracking")
+        if registry is not None:
+            registry.close(f"{id(self):x}/{stream_id}")
+
+    def ground_truth(self, stream_id, frame=None, media_time=None):
+        """Ball position in the frame the client measured.
+
+        Clients identify the frame by producer frame id or by the video
+        element's mediaTime; otherwise the newest frame is used. Sessions
+        without a timeline fall back to app_ctx.
+        """
+        timeline, track = self.tracking.get(stream_id, (None, None))
+        position = None
+        if timeline is not None:
+            if frame is not None and frame >= 0:
+                position = timeline.by_frame(int(frame))
+            elif media_time is not None and media_time == media_time:  # NaN means unknown
+                pts = track.producer_pts(float(media_time)) if hasattr(track, "producer_pts") else None
+                if pts is not None:
+                    position = timeline.by_pts(pts)
+            if position is None:
+                position = timeline.latest()
+        return position or self.app_ctx.get("ground_truth", (320, 240))
+
+    def handle_datagram(self, stream_id, data):
+        """Score a batch of binary coords samples and reply with one error datagram."""
+        try:
+            kind, samples = coords_protocol.decode(data)
+        except ValueError as e:
+            log.debug_every("bad-datagram", 1.0, "Dropped datagram", stream_id=stream_id, error=e)
+            return
+        if kind != coords_protocol.COORDS or not len(samples):
+            return
+        truth = [self.ground_truth(stream_id, int(frame), float(media_time))
+                 for frame, media_time in zip(samples["frame"], samples["media_time"])]
+        tx, ty = zip(*truth)
+        error_x = np.subtract(tx, samples["x"])
+        error_y = np.subtract(ty, samples["y"])
+        self.tracking_stats(stream_id).add_many(error_x, error_y)
+        reply = coords_protocol.encode_errors(samples["seq"], error_x, error_y)
+        self._http.send_datagram(stream_id, reply)
+        self.transmit()
 
     async def process_offer(self, stream_id, message):
-        print("[DEBUG] Received offer with SDP length:", len(message.get("sdp", "")))
+        timer = self.timers.setdefault(stream_id, PhaseTimer(session_metrics))
+        timer.mark("offer")
+        log.info("Received offer", stream_id=stream_id, sdp_length=len(message.get("sdp", "")))
+
+        if self.app_ctx.get("broadcast"):
+            # Every viewer reads the one shared scene through its own cursor.
+            scene = shared_scene(self.app_ctx)
+            timeline = scene.timeline
+            if self.app_ctx.get("encode_once"):
+                track = tier_encoder(scene, self.app_ctx.get("bitrate", 1_000_000)).track()
+            else:
+                track = scene.track()
+            source = None
+        else:
+            # Start rendering before the SDP round trip, with a primer frame ready for the first recv().
+            scene = None
+            source = SessionSource(self.app_ctx)
+            timeline = source.timeline
+            track = BouncingBallTrack(source.ring, fps=self.app_ctx["fps"], signal=source.signal)
+
         pc = RTCPeerConnection()
         pcs.add(pc)
-        await pc.setRemoteDescription(RTCSessionDescription(sdp=message["sdp"], type=message["type"]))
+        server_metrics["ball_peer_connections"].set(len(pcs))
+        sender = None
+        if self.app_ctx.get("encode_once"):
+            # aiortc settles the codecs in setRemoteDescription, so the H.264-only transceiver has to exist first.
+            sender = h264_sender(pc, track)
+        try:
+            await pc.setRemoteDescription(RTCSessionDescription(sdp=message["sdp"], type=message["type"]))
+        except Exception:
+            # The producer is already running; don't leave it behind with an unusable offer.
+            if source is not None:
+                source.close()
+            if scene is not None:
+                track.stop()
+                release_scene(self.app_ctx, scene)
+            pcs.discard(pc)
+            server_metrics["ball_peer_connections"].set(len(pcs))
+            await pc.close()
+            raise
 
-        frame_queue = mp.Queue(maxsize=2)
-        stop_event = mp.Event()
-        producer = FrameProducer(frame_queue, fps=self.app_ctx["fps"], stop_event=stop_event, duration=self.app_ctx["duration"], debug=True)
-        producer.start()
+        if sender is None:
+            # addTrack takes the video transceiver the offer created; a new one would have no mid and break the answer.
+            sender = pc.addTrack(track)
+        self.tracking[stream_id] = (timeline, track)
+        controller = None
+        if scene is None and self.app_ctx.get("adaptive"):
+            # The producer is this peer's alone, so it can render at whatever tier the peer keeps up with.
+            controller = AdaptiveController(source.ring, track, sender, self.app_ctx["fps"]).start()
+        on_first_frame(track, lambda: self.first_frame_sent(stream_id, timer))
+        log.debug("Track added to peer connection", stream_id=stream_id)
 
-        track = BouncingBallTrack(frame_queue, fps=self.app_ctx["fps"])
-        pc.addTransceiver("video", direction="sendonly")  # <-- add this
-        pc.addTrack(track)
-        print("[SERVER] Track added to peer connection.")
-        print("[DEBUG] pc.addTrack(track) completed")
+        @pc.on("iceconnectionstatechange")
+        def on_ice_state_change():
+            if pc.iceConnectionState == "completed":
+                timer.mark("ice_connected")
 
         @pc.on("connectionstatechange")
         def on_state_change():
-            print(f"[SERVER] WebRTC state: {pc.connectionState}")
-            if pc.connectionState == "connected":
-                print("[SERVER] WebRTC connection established.")
+            log.info("WebRTC state changed", state=pc.connectionState)
+            if pc.connectionState in ("failed", "closed"):
+                if controller is not None:
+                    controller.stop()
+                track.stop()
+                self.tracking.pop(stream_id, None)
+                self._decoders.pop(stream_id, None)
+                self.close_tracking_stats(stream_id)
+                if source is not None:
+                    source.close()
+                pcs.discard(pc)
+                server_metrics["ball_peer_connections"].set(len(pcs))
+                if scene is not None:
+                    release_scene(self.app_ctx, scene)
 
         # Optionally log if anything is received (not expected in sendonly mode)
         @pc.on("track")
         def on_track(track):
-            print(f"[SERVER] Unexpected incoming track: kind={track.kind}")
+            log.warning("Unexpected incoming track", kind=track.kind)
 
-        print("[DEBUG] Creating and setting local description")
+        # setLocalDescription returns once ICE gathering is complete, so the answer carries every candidate.
         await pc.setLocalDescription(await pc.createAnswer())
-        await asyncio.sleep(0.1)
-        print("[DEBUG] pc.setLocalDescription() completed")
-        print("[SERVER] Local description set.")
+        log.debug("Local description set", stream_id=stream_id)
 
         response = {
             "sdp": pc.localDescription.sdp,
             "type": pc.localDescription.type
         }
-        await self._http.send_data(stream_id, json.dumps(response).encode(), end_stream=False)
+        self._http.send_data(stream_id, encode_message(response), end_stream=False)
+        self.transmit()
+        timer.mark("answer")
 
-async def run_app():
+    def first_frame_sent(self, stream_id, timer):
+        timer.mark("first_frame")
+        self.timers.pop(stream_id, None)
+        log.info("Session started", stream_id=stream_id,
+                 **{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in timer.elapsed.items()})
+
+
+class SessionSource:
+    """One peer's own producer: its FrameRing (primed with the opening frame), timeline, signal and metrics.
+
+    Producers come from the warm pool when there is one, else a new
+    FrameProducer process.
+    """
+
+    def __init__(self, app_ctx):
+        self.metrics = REGISTRY.shared(PRODUCER_METRICS)
+        self.signal = FrameSignal()
+        pixel_format = app_ctx.get("pixel_format", "bgr24")
+        self.timeline = FrameTimeline(fps=app_ctx["fps"])
+        # A FrameRing carries each frame's pts, and is the only transport a pool worker can be handed.
+        self.ring = FrameRing(pixel_format=pixel_format)
+        render_primer(self.ring)
+        producer_args = dict(fps=app_ctx["fps"], duration=app_ctx["duration"], signal=self.signal,
+                             pixel_format=pixel_format, timeline=self.timeline, metrics=self.metrics)
+        pool = app_ctx.get("pool")
+        session = pool.start_session(self.ring, **producer_args) if pool is not None else None
+        if session is not None:
+            self.stop_producer = session.stop
+        else:
+            stop_event = mp.Event()
+            FrameProducer(self.ring, stop_event=stop_event, **producer_args).start()
+            self.stop_producer = stop_event.set
+
+    def close(self):
+        self.stop_producer()
+        self.signal.close()  # the track only detaches it
+        self.ring.close()
+        self.timeline.close()
+        REGISTRY.release(self.metrics)
+
+
+def on_first_frame(track, callback):
+    """Call `callback()` once, when the track hands its first frame to the sender."""
+    recv = track.recv
+
+    async def first_recv():
+        frame = await recv()
+        track.recv = recv
+        callback()
+        return frame
+
+    track.recv = first_recv
+
+
+def h264_sender(pc, track):
+    """Send `track` on a transceiver that can only negotiate H.264, as encoded tracks carry H.264 packets.
+
+    Call it before setRemoteDescription: the offer's video m-line then
+    binds to this transceiver, whose codec preferences are already set.
+    """
+    codecs = [c for c in RTCRtpSender.getCapabilities("video").codecs if c.mimeType in ("video/H264", "video/rtx")]
+    transceiver = pc.addTransceiver(track, direction="sendonly")
+    transceiver.setCodecPreferences(codecs)
+    return transceiver.sender
+
+
+def shared_scene(app_ctx):
+    """The broadcast scene all peers watch, started by the first offer."""
+    scene = app_ctx.get("scene")
+    if scene is None:
+        scene = app_ctx["scene"] = FrameBroadcast(fps=app_ctx["fps"],
+                                                  pixel_format=app_ctx.get("pixel_format", "bgr24"),
+                                                  metrics=REGISTRY.shared(PRODUCER_METRICS)).start()
+    return scene
+
+
+def release_scene(app_ctx, scene):
+    """Stop the broadcast producer once its last viewer has gone, without waiting for it on the loop."""
+    if scene.idle and app_ctx.get("scene") is scene:
+        del app_ctx["scene"]
+        asyncio.ensure_future(close_scene(scene))
+
+
+async def close_scene(scene):
+    await scene.aclose()
+    REGISTRY.release(scene.metrics)
+
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--port", type=int, default=8080)
@@ -165,46 +485,143 @@ async def run_app():
     parser.add_argument("--fps", type=int, default=10)
     parser.add_argument("--cert", type=str, default="localhost.pem")
     parser.add_argument("--key", type=str, default="localhost-key.pem")
-    args = parser.parse_args()
+    parser.add_argument("--log-level", type=str, default=None, help="Pipeline log level (default: $BALL_LOG_LEVEL or INFO)")
+    parser.add_argument("--pixel-format", choices=("yuv420p", "bgr24"), default="yuv420p",
+                        help="Producer frame format; yuv420p feeds the encoder without colour conversion")
+    parser.add_argument("--broadcast", action="store_true",
+                        help="Render one shared scene for all viewers instead of a producer per peer")
+    parser.add_argument("--encode-once", action="store_true",
+                        help="Broadcast, and H.264-encode the scene once per bitrate tier for all peers")
+    parser.add_argument("--pool-min", type=int, default=0, help="Warm producer processes kept ready (0 disables the pool)")
+    parser.add_argument("--pool-max", type=int, default=16, help="Most producer processes the pool will run")
+    parser.add_argument("--pool-sessions", type=int, default=100, help="Sessions a pooled producer serves before it is replaced")
+    parser.add_argument("--bitrate", type=int, default=1_000_000, help="Bitrate of the encode-once tier (bps)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Step each peer's producer through resolution/fps tiers by RTCP, REMB and send cadence")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="QUIC server processes sharing the UDP port via SO_REUSEPORT (0 = one per CPU)")
+    args = parser.parse_args(argv)
+    if args.workers <= 0:
+        args.workers = os.cpu_count() or 1
+    return args
+
 
+def quic_configuration(args):
     config = QuicConfiguration(is_client=False, alpn_protocols=H3_ALPN)
     config.load_cert_chain(args.cert, args.key)
     config.support_webtransport = True
     config.max_datagram_frame_size = 65536
+    return config
 
-    with open(args.cert, "r") as f:
-        x509 = crypto.load_certificate(crypto.FILETYPE_PEM, f.read())
-        pubkey = x509.get_pubkey()
-        pub_der = crypto.dump_publickey(crypto.FILETYPE_ASN1, pubkey)
-        spki_hash = hashlib.sha256(pub_der).hexdigest()
-        print(f"[DEBUG] SPKI Fingerprint: {spki_hash}")
 
+async def serve_quic(args, app_ctx, sock=None):
+    """aioquic's serve(), or the same QuicServer on a socket that is already bound (a worker's share of the port)."""
+    create_protocol = lambda *a, **kw: WebTransportProtocol(*a, app_ctx=app_ctx, **kw)
+    if sock is None:
+        return await serve(host=args.host, port=args.port, configuration=quic_configuration(args),
+                           create_protocol=create_protocol)
+    _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: QuicServer(configuration=quic_configuration(args), create_protocol=create_protocol), sock=sock)
+    return protocol
+
+
+async def until_stopped(stop_signal, timeout):
+    """Sleep `timeout` seconds, or less if the supervisor pokes `stop_signal` (a FrameSignal)."""
+    if stop_signal is None:
+        await asyncio.sleep(timeout)
+    else:
+        await stop_signal.wait(timeout)
+
+
+async def run_server(args, sock=None, admin_path=None, stop_signal=None):
+    """One QUIC + HTTP server; a worker passes its socket, admin path and stop signal."""
     app_ctx = {
         "duration": args.duration,
-        "fps": args.fps
+        "fps": args.fps,
+        "pixel_format": args.pixel_format,
+        "broadcast": args.broadcast or args.encode_once,
+        "encode_once": args.encode_once,
+        "bitrate": args.bitrate,
+        "adaptive": args.adaptive,
+        "tracking": TrackingRegistry(),
     }
+    if args.pool_min > 0:
+        app_ctx["pool"] = ProducerPool(args.pool_min, args.pool_max, args.pool_sessions).start()
 
-    print(f"[DEBUG] Starting HTTP server on http://{args.host}:8000")
+    if admin_path is None:
+        print(f"[DEBUG] Starting HTTP server on http://{args.host}:8000")
     print(f"QUIC server running on https://{args.host}:{args.port}")
 
-    http_task = asyncio.create_task(serve_http())
+    http_task = asyncio.create_task(serve_http(app_ctx, path=admin_path))
     print("[DEBUG] Created HTTP Task", flush=True)
-    quic_task = asyncio.create_task(serve(
-        host=args.host,
-        port=args.port,
-        configuration=config,
-        create_protocol=lambda *a, **kw: WebTransportProtocol(*a, app_ctx=app_ctx, **kw)
-    ))
+    quic_task = asyncio.create_task(serve_quic(args, app_ctx, sock))
     print("[QUIC LOG] QUIC server running", flush=True)
 
     try:
-        await asyncio.sleep(args.duration + 5)
+        await until_stopped(stop_signal, args.duration + 5)
     finally:
         http_task.cancel()
         quic_task.cancel()
+        scene = app_ctx.pop("scene", None)
+        if scene is not None:
+            scene.stop()
+            REGISTRY.release(scene.metrics)
+        pool = app_ctx.pop("pool", None)
+        if pool is not None:
+            log.info("Producer pool stats", **pool.stats())
+            pool.close()
         with contextlib.suppress(asyncio.CancelledError):
             await http_task
             await quic_task
 
+
+def run_worker(index, sock, admin_path, stop_signal, args, start_method):
+    """Entry point of one server worker process."""
+    # Being spawned made spawn this process's default too, so each session's FrameProducer
+    # would re-import the whole server before its first frame; start them the way the parent does.
+    mp.set_start_method(start_method, force=True)
+    stop_with_parent(stop_signal)
+    configure(args.log_level)
+    log.info("Worker serving", worker=index, pid=os.getpid())
+    asyncio.run(run_server(args, sock=sock, admin_path=admin_path, stop_signal=stop_signal))
+
+
+async def run_workers(args):
+    """`args.workers` server processes on one UDP port, behind a single port-8000 front."""
+    sockets = reuseport_sockets(args.host, args.port, args.workers)
+    supervisor = WorkerSupervisor(run_worker, sockets, args=(args, mp.get_start_method()),
+                                  metrics=REGISTRY.local(WORKER_METRICS)).start()
+    runner = await serve_http(app=make_front_app(supervisor))
+    # Don't announce the port while workers are still importing; the first clients would wait on them.
+    for _ in range(100):
+        if all(worker["healthy"] for worker in await supervisor.health()):
+            break
+        await asyncio.sleep(0.1)
+    print(f"QUIC server running on https://{args.host}:{args.port} with {args.workers} workers", flush=True)
+    watch = asyncio.create_task(supervisor.watch())
+    try:
+        await asyncio.sleep(args.duration + 5)
+    finally:
+        watch.cancel()
+        await runner.cleanup()
+        supervisor.stop()
+
+
+async def run_app():
+    args = parse_args()
+    configure(args.log_level)
+
+    with open(args.cert, "r") as f:
+        x509 = crypto.load_certificate(crypto.FILETYPE_PEM, f.read())
+        pubkey = x509.get_pubkey()
+        pub_der = crypto.dump_publickey(crypto.FILETYPE_ASN1, pubkey)
+        spki_hash = hashlib.sha256(pub_der).hexdigest()
+        print(f"[DEBUG] SPKI Fingerprint: {spki_hash}")
+
+    if args.workers > 1:
+        await run_workers(args)
+    else:
+        await run_server(args)
+
 if __name__ == "__main__":
     asyncio.run(run_app())
@@ -0,0 +1,173 @@
+# Several QUIC server processes sharing one UDP port through SO_REUSEPORT
+
+import asyncio
+import contextlib
+import multiprocessing as mp
+import multiprocessing.connection
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import aiohttp
+from frame_signal import FrameSignal
+from pipeline_log import get_logger
+
+log = get_logger("workers")
+
+
+def reuseport_sockets(host, port, count):
+    """`count` UDP sockets bound to the same (host, port) with SO_REUSEPORT.
+
+    Linux hands each datagram to one socket of the group by hashing its
+    source and destination addresses, so all packets from one client
+    address reach the same socket for as long as the group is unchanged.
+    Port 0 binds the first socket to a free port and the rest to it.
+    """
+    family = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0][0]
+    sockets = []
+    for _ in range(count):
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.setblocking(False)
+        port = sock.getsockname()[1]
+        sockets.append(sock)
+    return sockets
+
+
+def stop_with_parent(stop_signal):
+    """Poke `stop_signal` (a FrameSignal) from a worker if the supervisor dies, so the worker never outlives it."""
+
+    def watch():
+        mp.connection.wait([mp.parent_process().sentinel])
+        stop_signal.notify()
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+class ServerWorker:
+    """One worker slot: its socket, admin path and the process currently serving them."""
+
+    def __init__(self, index, sock, admin_path):
+        self.index = index
+        self.sock = sock
+        self.admin_path = admin_path
+        self.process = None
+        self.stop_signal = None
+        self.restarts = 0
+
+
+class WorkerSupervisor:
+    """Runs `target(index, sock, admin_path, stop_signal, *args)` once per socket and restarts workers that exit.
+
+    The supervisor holds every socket for its whole life and a restarted
+    worker takes over its predecessor's, so the reuseport group never
+    changes and the kernel never moves a live QUIC connection to another
+    process (only connection migration to a new client address would).
+    Each worker serves its HTTP app on a Unix socket at `admin_path`; the
+    supervisor polls those for health, metrics and tracking state. Workers
+    are stopped by poking their FrameSignal rather than a shared mp.Event,
+    whose set() can hang on a worker that was killed while waiting on it.
+    """
+
+    def __init__(self, target, sockets, args=(), metrics=None, start_method="spawn", timeout=1.0):
+        self.target = target
+        self.args = args
+        self.metrics = metrics
+        self.timeout = timeout
+        self.ctx = mp.get_context(start_method)
+        self.stopping = False
+        self.admin_dir = tempfile.mkdtemp(prefix="ball-workers-")
+        self.workers = [ServerWorker(index, sock, os.path.join(self.admin_dir, f"worker-{index}.sock"))
+                        for index, sock in enumerate(sockets)]
+        if metrics is not None:
+            metrics["ball_workers"].set(len(self.workers))
+
+    def start(self):
+        for worker in self.workers:
+            self._spawn(worker)
+        return self
+
+    def _spawn(self, worker):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(worker.admin_path)
+        if worker.stop_signal is not None:
+            worker.stop_signal.close()
+        worker.stop_signal = FrameSignal()
+        # Not a daemon: a worker starts producer processes of its own.
+        worker.process = self.ctx.Process(target=self.target,
+                                          args=(worker.index, worker.sock, worker.admin_path, worker.stop_signal,
+                                                *self.args))
+        worker.process.start()
+        log.info("Worker started", worker=worker.index, pid=worker.process.pid)
+
+    def check(self):
+        """Restart every worker whose process has exited; returns how many were restarted."""
+        restarted = 0
+        if self.stopping:
+            return restarted
+        for worker in self.workers:
+            if worker.process is not None and not worker.process.is_alive():
+                log.warning("Worker exited, restarting", worker=worker.index, pid=worker.process.pid,
+                            exitcode=worker.process.exitcode)
+                worker.restarts += 1
+                if self.metrics is not None:
+                    self.metrics["ball_worker_restarts_total"].inc()
+                self._spawn(worker)
+                restarted += 1
+        return restarted
+
+    async def watch(self, interval=1.0):
+        while True:
+            await asyncio.sleep(interval)
+            self.check()
+
+    async def fetch(self, worker, path, text=False):
+        """GET `path` from one worker's HTTP app: JSON (or text), or None if it didn't answer."""
+        try:
+            connector = aiohttp.UnixConnector(path=worker.admin_path)
+            async with aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                async with session.get(f"http://worker{path}") as response:
+                    response.raise_for_status()
+                    return await (response.text() if text else response.json())
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError):
+            return None
+
+    async def gather(self, path, text=False):
+        """fetch() from every worker at once, in worker order."""
+        return await asyncio.gather(*(self.fetch(worker, path, text) for worker in self.workers))
+
+    async def health(self):
+        """Per-worker process state merged with what each worker reports about itself."""
+        replies = await self.gather("/health")
+        workers = []
+        for worker, reply in zip(self.workers, replies):
+            process = worker.process
+            entry = {"worker": worker.index, "pid": process.pid if process else None,
+                     "alive": bool(process and process.is_alive()), "restarts": worker.restarts,
+                     "healthy": reply is not None}
+            entry.update(reply or {})
+            workers.append(entry)
+        if self.metrics is not None:
+            self.metrics["ball_workers_up"].set(sum(entry["healthy"] for entry in workers))
+        return workers
+
+    def stop(self, timeout=5.0):
+        self.stopping = True
+        for worker in self.workers:
+            if worker.stop_signal is not None:
+                worker.stop_signal.notify()
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout=timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(timeout=1)
+        for worker in self.workers:
+            worker.sock.close()
+            if worker.stop_signal is not None:
+                worker.stop_signal.close()
+        shutil.rmtree(self.admin_dir, ignore_errors=True)
+
@@ -0,0 +1,52 @@
+# Unit test for the per-session adaptive tier controller
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from adaptive import TierPolicy, AdaptiveController, tiers_for
+from frame_ring import FrameRing
+
+
+class TestAdaptive(unittest.TestCase):
+    def test_tiers_for(self):
+        self.assertEqual(tiers_for(640, 480, 30),
+                         [(640, 480, 1), (640, 480, 2), (480, 360, 2), (320, 240, 2), (320, 240, 3)])
+        self.assertEqual(tiers_for(640, 480, 1), [(640, 480, 1), (480, 360, 1), (320, 240, 1)])
+
+    def test_policy_steps_down_fast_and_up_slowly(self):
+        policy = TierPolicy(tiers_for(640, 480, 30), fps=30, down_after=2, up_after=3)
+        self.assertEqual(policy.update({"fraction_lost": 0.2}), 0)  # one bad round is noise
+        self.assertEqual(policy.update({"fraction_lost": 0.2}), 1)
+        self.assertEqual(policy.reason, "loss")
+        self.assertEqual(policy.update({"recv_interval": 0.2}), 1)  # slower than 1.3 * 2/30 s
+        self.assertEqual(policy.update({"recv_interval": 0.2}), 2)
+        self.assertEqual(policy.reason, "slow_sender")
+        for _ in range(2):
+            self.assertEqual(policy.update({"recv_interval": 2 / 30}), 2)
+        self.assertEqual(policy.update({"recv_interval": 2 / 30}), 1)
+        # REMB with room for this tier but not for twice the pixel rate keeps the session where it is.
+        for _ in range(5):
+            self.assertEqual(policy.update({"bitrate": 150_000, "send_rate": 100_000}), 1)
+        self.assertEqual(policy.update({"bitrate": 90_000, "send_rate": 100_000}), 1)
+        self.assertEqual(policy.reason, "bandwidth")
+
+    def test_controller_requests_tier_from_producer(self):
+        ring = FrameRing(width=640, height=480, slots=2)
+        track = MagicMock(recv_interval=None, last_seq=0, frames_skipped=0, frame_duration=1 / 30)
+        try:
+            controller = AdaptiveController(ring, track, None, fps=30,
+                                            policy=TierPolicy(tiers_for(640, 480, 30), fps=30, down_after=1))
+            track.recv_interval = 0.5  # the sender can't keep up with any tier
+            asyncio.run(controller.step())
+            self.assertEqual(ring.requested, (640, 480, 2))
+            self.assertAlmostEqual(track.frame_duration, 2 / 30)
+            for _ in range(3):
+                asyncio.run(controller.step())
+            self.assertEqual(ring.requested, (320, 240, 3))
+            self.assertEqual(controller.changes, 4)
+        finally:
+            ring.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
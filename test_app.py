@@ -5,9 +5,14 @@ import asyncio
 import json
 import multiprocessing
 from unittest.mock import MagicMock, AsyncMock, patch
-from server.app import WebTransportProtocol
-from aiortc import RTCSessionDescription
-from aioquic.h3.events import HeadersReceived
+from types import SimpleNamespace
+import server.app as app_module
+from server.app import WebTransportProtocol, make_http_app, make_front_app
+from aiohttp.test_utils import TestClient, TestServer
+from frame_timeline import FrameTimeline
+from aiortc import RTCPeerConnection, RTCSessionDescription
+from aioquic.h3.events import HeadersReceived, DatagramReceived
+import coords_protocol
 
 def init_protocol(app_ctx):
     """Helper to create and initialize WebTransportProtocol with _http mocked."""
@@ -17,8 +22,9 @@ def init_protocol(app_ctx):
 
     protocol = WebTransportProtocol(quic=dummy_quic, stream_handler=None, app_ctx=app_ctx)
     protocol.connection_made(MagicMock())  # triggers _http = H3Connection(...)
-    protocol._http.send_data = AsyncMock()
-    protocol._http.send_headers = AsyncMock()
+    protocol._http.send_data = MagicMock()
+    protocol._http.send_headers = MagicMock()
+    protocol.transmit = MagicMock()
     return protocol
 
 @pytest.mark.asyncio
@@ -29,11 +35,137 @@ async def test_handle_coords():
 
     await protocol.handle_stream_data(stream_id, coords_msg)
 
-    protocol._http.send_data.assert_awaited_once()
+    protocol._http.send_data.assert_called_once()
     args = protocol._http.send_data.call_args.args
     assert args[0] == stream_id
     assert json.loads(args[1].decode()) == {"type": "error", "error_x": 10, "error_y": 10}
 
+@pytest.mark.asyncio
+async def test_handle_coalesced_and_split_messages():
+    protocol = init_protocol({"ground_truth": (320, 240)})
+    coords = json.dumps({"type": "coords", "x": 310, "y": 230}).encode() + b"\n"
+
+    await protocol.handle_stream_data(2, coords + coords + coords[:10])
+    assert protocol._http.send_data.call_count == 2
+    await protocol.handle_stream_data(2, coords[10:], end_stream=True)
+    assert protocol._http.send_data.call_count == 3
+    assert protocol._decoders == {}
+    for call in protocol._http.send_data.call_args_list:
+        assert call.args[1].endswith(b"\n")
+        assert json.loads(call.args[1]) == {"type": "error", "error_x": 10, "error_y": 10}
+
+@pytest.mark.asyncio
+async def test_handle_coords_uses_frame_timeline():
+    timeline = FrameTimeline(fps=10, capacity=16)
+    try:
+        timeline.record(3, 100.0, 50.0)
+        timeline.record(4, 120.0, 60.0)
+        protocol = init_protocol({"ground_truth": (320, 240)})
+        protocol.tracking[2] = (timeline, MagicMock())
+
+        await protocol.handle_stream_data(2, json.dumps({"type": "coords", "x": 90, "y": 45, "frame": 3}).encode())
+        await protocol.handle_stream_data(2, json.dumps({"type": "coords", "x": 110, "y": 50}).encode())
+
+        errors = [json.loads(call.args[1].decode()) for call in protocol._http.send_data.call_args_list]
+        assert errors[0] == {"type": "error", "error_x": 10, "error_y": 5}
+        assert errors[1] == {"type": "error", "error_x": 10, "error_y": 10}  # newest frame
+    finally:
+        timeline.close()
+
+@pytest.mark.asyncio
+async def test_handle_coords_datagram_batch():
+    timeline = FrameTimeline(fps=10, capacity=16)
+    try:
+        timeline.record(3, 100.0, 50.0)
+        protocol = init_protocol({})
+        protocol.tracking[2] = (timeline, MagicMock())
+        protocol._http.send_datagram = MagicMock()
+        protocol.transmit = MagicMock()
+
+        data = coords_protocol.encode_coords([(7, 3, float("nan"), 90.0, 45.0), (8, -1, float("nan"), 101.0, 52.0)])
+        await protocol.handle_event(DatagramReceived(data=data, stream_id=2))
+
+        stream_id, reply = protocol._http.send_datagram.call_args.args
+        assert stream_id == 2
+        kind, errors = coords_protocol.decode(reply)
+        assert kind == coords_protocol.ERRORS
+        assert errors["seq"].tolist() == [7, 8]
+        assert errors["error_x"].tolist() == [10.0, -1.0]
+        assert errors["error_y"].tolist() == [5.0, -2.0]
+    finally:
+        timeline.close()
+
+@pytest.mark.asyncio
+async def test_stats_endpoint_reports_tracking_accuracy():
+    app_ctx = {"ground_truth": (320, 240)}
+    protocol = init_protocol(app_ctx)
+    for x in (310, 320):
+        await protocol.handle_stream_data(2, json.dumps({"type": "coords", "x": x, "y": 240}).encode())
+
+    async with TestClient(TestServer(make_http_app(app_ctx))) as client:
+        response = await client.get("/stats")
+        body = await response.json()
+    assert body["active_sessions"] == 1
+    assert body["aggregate"]["count"] == 2
+    assert body["aggregate"]["max"] == 10
+    assert len(body["sessions"]) == 1
+
+@pytest.mark.asyncio
+async def test_connection_lost_finishes_tracking_stats():
+    app_ctx = {"ground_truth": (320, 240)}
+    protocol, other = init_protocol(app_ctx), init_protocol(app_ctx)
+    for p in (protocol, other):
+        await p.handle_stream_data(2, json.dumps({"type": "coords", "x": 310, "y": 240}).encode())
+
+    protocol.connection_lost(None)
+    summary = app_ctx["tracking"].summary()
+    assert (summary["active_sessions"], summary["finished_sessions"]) == (1, 1)
+    assert summary["aggregate"]["count"] == 2
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_prometheus_text():
+    protocol = init_protocol({})
+    protocol.quic_event_received(MagicMock())
+
+    async with TestClient(TestServer(make_http_app({}))) as client:
+        response = await client.get("/metrics")
+        body = await response.text()
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE ball_quic_events_total counter" in body
+    assert "ball_quic_events_per_second" in body
+    assert "ball_track_wait_seconds_bucket" in body
+
+@pytest.mark.asyncio
+async def test_front_aggregates_worker_stats_metrics_and_health():
+    states, pages = [], []
+    for x in (310, 300):
+        app_ctx = {"ground_truth": (320, 240)}
+        protocol = init_protocol(app_ctx)
+        await protocol.handle_stream_data(2, json.dumps({"type": "coords", "x": x, "y": 240}).encode())
+        async with TestClient(TestServer(make_http_app(app_ctx))) as client:
+            states.append(await (await client.get("/stats?state=1")).json())
+            assert (await client.get("/health")).status == 200
+        pages.append("# TYPE ball_sessions_active gauge\nball_sessions_active 2\n")
+
+    async def gather(path, text=False):
+        return pages if path == "/metrics" else states
+
+    supervisor = SimpleNamespace(workers=[SimpleNamespace(index=0), SimpleNamespace(index=1)], gather=gather,
+                                 health=AsyncMock(return_value=[{"worker": 0, "healthy": True},
+                                                                {"worker": 1, "healthy": False}]))
+    async with TestClient(TestServer(make_front_app(supervisor))) as client:
+        stats = await (await client.get("/stats")).json()
+        metrics = await (await client.get("/metrics")).text()
+        health = await client.get("/health")
+        health_body = await health.json()
+    assert stats["active_sessions"] == 2
+    assert stats["aggregate"]["count"] == 2
+    assert stats["aggregate"]["max"] == 20
+    assert all(key.startswith(("0/", "1/")) for key in stats["sessions"])
+    assert "ball_sessions_active 4" in metrics.splitlines()
+    assert health.status == 503
+    assert (health_body["healthy"], health_body["total"]) == (1, 2)
+
 @pytest.mark.asyncio
 async def test_process_offer():
     protocol = init_protocol({"fps": 5, "duration": 1})
@@ -49,6 +181,8 @@ async def test_process_offer():
         mock_pc.getSenders.return_value = []
         mock_pc.localDescription = RTCSessionDescription(sdp="dummy_sdp", type="answer")
         mock_pc.sctp.transport.iceGatherer.getLocalCandidates.return_value = []
+        handlers = {}
+        mock_pc.on.side_effect = lambda event: lambda handler: handlers.setdefault(event, handler)
 
         # Mock worker process with shutdown logging
         mock_worker = MagicMock()
@@ -62,15 +196,55 @@ async def test_process_offer():
         offer_msg = {"type": "offer", "sdp": "v=0..."}
         await protocol.process_offer(stream_id=3, message=offer_msg)
 
-        protocol._http.send_data.assert_awaited_once()
+        protocol._http.send_data.assert_called_once()
         sent = json.loads(protocol._http.send_data.call_args.args[1].decode())
         assert sent["type"] == "answer"
         assert "sdp" in sent
+        # The producer was started before the answer, and a primer frame is already waiting.
+        MockProducer.return_value.start.assert_called_once()
+        assert set(protocol.timers[3].elapsed) == {"offer", "answer"}
+        _, track = protocol.tracking[3]
+        assert track.poll_frame() is not None
+
+        # Closing the pc releases the ring, timeline, signal and metrics the offer created.
+        mock_pc.connectionState = "closed"
+        handlers["connectionstatechange"]()
+        assert 3 not in protocol.tracking
+        assert mock_pc not in app_module.pcs
+        assert track.ring.header is None
 
         # This works now because we're accessing the mock we injected
         mock_worker.terminate()
         mock_worker.join()
 
+@pytest.mark.asyncio
+async def test_encode_once_negotiates_h264_end_to_end():
+    app_ctx = {"fps": 10, "broadcast": True, "encode_once": True, "bitrate": 300_000}
+    protocol = init_protocol(app_ctx)
+    client = RTCPeerConnection()
+    client.addTransceiver("video", direction="recvonly")
+    received = asyncio.get_running_loop().create_future()
+    client.on("track", received.set_result)
+    try:
+        await client.setLocalDescription(await client.createOffer())
+        await protocol.process_offer(2, {"sdp": client.localDescription.sdp, "type": "offer"})
+        answer = json.loads(protocol._http.send_data.call_args.args[1])
+        video = answer["sdp"].split("m=video", 1)[1]
+        assert "H264/90000" in video and "VP8" not in video
+        await client.setRemoteDescription(RTCSessionDescription(**answer))
+
+        # The receiver only hands frames on once its H.264 decoder managed to decode them.
+        track = await asyncio.wait_for(received, 5)
+        frame = await asyncio.wait_for(track.recv(), 20)
+        assert (frame.width, frame.height) == (640, 480)
+    finally:
+        await client.close()
+        for pc in list(app_module.pcs):
+            await pc.close()
+        scene = app_ctx.get("scene")
+        if scene is not None:
+            await scene.aclose()
+
 @pytest.mark.asyncio
 async def test_handle_event_connect():
     protocol = init_protocol({})
@@ -90,6 +264,6 @@ async def test_handle_event_connect():
     await protocol.handle_event(connect_event)
 
     assert 7 in protocol._sessions
-    protocol._http.send_headers.assert_awaited_once()
+    protocol._http.send_headers.assert_called_once()
     headers = dict(protocol._http.send_headers.call_args.args[1])
     assert headers[b":status"] == b"200"
@@ -0,0 +1,53 @@
+# Unit test for the vectorized reference ball detector
+
+import unittest
+from bouncing_ball import BouncingBall
+from renderer import FrameRenderer, blank_frame
+from ball_detector import BallDetector
+
+
+def render(position, pixel_format, radius=20):
+    ball = BouncingBall(640, 480, radius=radius)
+    ball.position = position
+    return FrameRenderer(640, 480, pixel_format=pixel_format).render(ball.field)
+
+
+class TestBallDetector(unittest.TestCase):
+    def test_centroid_in_both_formats(self):
+        for pixel_format in ("bgr24", "yuv420p"):
+            detector = BallDetector(640, 480, pixel_format)
+            for position in ((320, 240), (25.5, 460.2), (611, 33)):
+                x, y = detector.detect(render(position, pixel_format))
+                self.assertAlmostEqual(x, position[0], delta=1.5, msg=pixel_format)
+                self.assertAlmostEqual(y, position[1], delta=1.5, msg=pixel_format)
+            self.assertIsNone(detector.detect(blank_frame(640, 480, pixel_format)))
+
+    def test_roi_matches_full_search_and_falls_back(self):
+        for pixel_format in ("bgr24", "yuv420p"):
+            full = BallDetector(640, 480, pixel_format)
+            tracked = BallDetector(640, 480, pixel_format, roi=48)
+            frame = render((200, 150), pixel_format)
+            expected = full.detect(frame)
+            self.assertEqual(tracked.detect(frame, predicted=(210, 140)), expected)
+            self.assertLess(tracked.searched, full.searched / 10)
+            # A bad prediction misses the ball and the full frame is searched instead.
+            self.assertEqual(tracked.detect(frame, predicted=(500, 400)), expected)
+            self.assertEqual(tracked.searched, full.searched)
+
+    def test_roi_never_returns_a_clipped_ball(self):
+        for pixel_format in ("bgr24", "yuv420p"):
+            full = BallDetector(640, 480, pixel_format, stride=4)
+            tracked = BallDetector(640, 480, pixel_format, stride=4, roi=48)
+            # The load test's ball (radius 40) 50 px on from the last detection.
+            frame = render((340, 270), pixel_format, radius=40)
+            expected = full.detect(frame)
+            self.assertEqual(tracked.detect(frame, predicted=(290, 220)), expected, msg=pixel_format)
+            # A small miss is fixed by recentring, without a full search.
+            frame = render((330, 250), pixel_format)
+            expected = full.detect(frame)
+            self.assertEqual(tracked.detect(frame, predicted=(300, 230)), expected, msg=pixel_format)
+            self.assertLess(tracked.searched, full.searched / 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
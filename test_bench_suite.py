@@ -0,0 +1,32 @@
+# Unit test for the benchmark suite's baselines and regression check
+
+import json
+import unittest
+from bench_suite import run_suite, compare, LOWER, HIGHER
+
+
+def results(**values):
+    return {"results": {name: {"value": value, "unit": "ms", "better": HIGHER if name.endswith("fps") else LOWER}
+                        for name, value in values.items()}}
+
+
+class TestBenchSuite(unittest.TestCase):
+    def test_compare_flags_only_regressions_past_threshold(self):
+        baseline = results(step_ms=1.0, render_ms=2.0, producer_fps=100.0, gone_ms=1.0)
+        current = results(step_ms=1.1, render_ms=3.0, producer_fps=70.0, new_ms=5.0)
+        regressions = {name: round(change, 3) for name, _, _, change in compare(baseline, current, threshold=0.15)}
+        self.assertEqual(regressions, {"render_ms": 0.5, "producer_fps": 0.3})
+        # Faster is never a regression.
+        self.assertEqual(compare(baseline, results(step_ms=0.1, producer_fps=1000.0)), [])
+
+    def test_run_suite_writes_json_baseline(self):
+        report = json.loads(json.dumps(run_suite(["ball_step_ms", "ring_480p_ms"], repeat=1)))
+        self.assertEqual(set(report["results"]), {"ball_step_ms", "ring_480p_ms"})
+        self.assertGreater(report["results"]["ball_step_ms"]["value"], 0)
+        self.assertEqual(report["results"]["ball_step_ms"]["better"], LOWER)
+        self.assertIn("python", report["meta"])
+        self.assertEqual(compare(report, report), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 # Unit test for bouncing ball physics
 
 import unittest
-from bouncing_ball import BouncingBall
+import numpy as np
+from bouncing_ball import BouncingBall, BallField
+from renderer import FrameRenderer
 
 class TestBouncingBall(unittest.TestCase):
     def test_initial_position(self):
@@ -33,5 +35,65 @@ class TestBouncingBall(unittest.TestCase):
         self.assertEqual(frame.shape, (100, 100, 3))
         self.assertEqual(frame.dtype, 'uint8')
 
+    def test_yuv_render_reuses_its_renderer(self):
+        ball = BouncingBall(100, 100, speed=(200, 0))
+        first = ball.render(pixel_format="yuv420p")
+        kept = first.copy()
+        renderer = ball._renderers["yuv420p"]
+        ball.step(0.1)
+        second = ball.render(pixel_format="yuv420p")
+        self.assertIs(ball._renderers["yuv420p"], renderer)
+        np.testing.assert_array_equal(first, kept)  # earlier frames are not overwritten
+        np.testing.assert_array_equal(second, FrameRenderer(100, 100, pixel_format="yuv420p").render(ball.field))
+
+    def test_position_at_matches_fine_stepping(self):
+        ball = BouncingBall(200, 100, radius=10, speed=(370, -290))
+        reference = BouncingBall(200, 100, radius=10, speed=(370, -290))
+        times = np.arange(1, 301) / 100.0
+        positions = ball.position_at(times)
+        velocities = ball.velocity_at(times)
+        self.assertEqual(positions.shape, (300, 2))
+        for t, position, velocity in zip(times, positions, velocities):
+            for _ in range(100):
+                reference.step(1e-4)  # small enough that clamping at the walls barely matters
+            np.testing.assert_allclose(position, reference.position, atol=0.5)
+            np.testing.assert_array_equal(np.sign(velocity), np.sign(reference.velocity))
+        # Evaluating never moves the ball.
+        np.testing.assert_array_equal(ball.position, [100, 50])
+
+    def test_position_at_is_periodic(self):
+        ball = BouncingBall(640, 480, radius=40, speed=(400, 300))
+        # x bounces between 40 and 600 (period 2 * 560 / 400 = 2.8 s), y between 40 and 440 (2 * 400 / 300 s).
+        np.testing.assert_allclose(ball.position_at(2.8)[0], ball.position[0])
+        np.testing.assert_allclose(ball.position_at(8 / 3)[1], ball.position[1])
+        np.testing.assert_allclose(ball.position_at(0.7), [600, 430])  # y bounced at 2/3 s
+        np.testing.assert_allclose(ball.velocity_at(0.75), [-400, -300])
+
+class TestBallField(unittest.TestCase):
+    def test_batched_wall_reflection(self):
+        field = BallField(100, 100,
+                          positions=[[50, 50], [90, 50], [50, 10]],
+                          velocities=[[10, 0], [500, 0], [0, -500]],
+                          radii=[5, 5, 5])
+        field.step(0.1)
+        np.testing.assert_allclose(field.positions, [[51, 50], [95, 50], [50, 5]])
+        np.testing.assert_allclose(field.velocities, [[10, 0], [-500, 0], [0, 500]])
+
+    def test_random_field_stays_in_bounds(self):
+        field = BallField.random(1000, 320, 240, seed=0)
+        for _ in range(50):
+            field.step(1 / 30)
+        r = field.radii[:, None]
+        self.assertTrue(np.all(field.positions >= r))
+        self.assertTrue(np.all(field.positions <= field.bounds - r))
+
+    def test_ball_is_view_over_field(self):
+        field = BallField(200, 100, [[20, 20], [100, 50]], [[0, 0], [50, 0]], [10, 10])
+        ball = BouncingBall(200, 100, field=field, index=1)
+        ball.step(1.0)
+        self.assertEqual(ball.get_position(), (150, 50))
+        self.assertEqual(ball.radius, 10)
+
+
 if __name__ == '__main__':
     unittest.main()
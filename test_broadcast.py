@@ -0,0 +1,50 @@
+# Unit test for the shared broadcast producer and its subscribers
+
+import asyncio
+import time
+import unittest
+import numpy as np
+from broadcast import FrameBroadcast
+
+
+class TestFrameBroadcast(unittest.IsolatedAsyncioTestCase):
+    async def test_one_frame_wakes_every_subscriber(self):
+        broadcast = FrameBroadcast(width=64, height=48, fps=50, producer=False)
+        try:
+            first, second = broadcast.track(), broadcast.track()
+            self.assertEqual(len(broadcast.subscribers), 2)
+            broadcast.ring.publish(np.full((48, 64, 3), 9, dtype=np.uint8))
+            broadcast.signal.notify()
+
+            frames = await asyncio.gather(first.recv(), second.recv())
+            for frame in frames:
+                self.assertEqual(int(frame.to_ndarray(format="bgr24")[0, 0, 0]), 9)
+            self.assertEqual((first.last_seq, second.last_seq), (0, 0))
+
+            first.stop()
+            self.assertEqual(len(broadcast.subscribers), 1)
+            second.stop()
+            self.assertTrue(broadcast.idle)
+        finally:
+            broadcast.stop()
+
+    async def test_slow_subscriber_does_not_hold_back_others(self):
+        broadcast = FrameBroadcast(width=64, height=48, fps=50, slots=3).start()
+        try:
+            fast, slow = broadcast.track(), broadcast.track()
+            start = time.monotonic()
+            for _ in range(10):
+                await fast.recv()
+            self.assertLess(time.monotonic() - start, 5.0)
+            self.assertGreaterEqual(fast.last_seq, 5)
+
+            await slow.recv()  # jumps straight to the newest frame
+            self.assertGreaterEqual(slow.last_seq, fast.last_seq)
+            self.assertEqual(slow.frame_count, 1)
+        finally:
+            await broadcast.aclose()  # joins off the loop
+        self.assertFalse(broadcast.producer.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
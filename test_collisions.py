@@ -0,0 +1,58 @@
+# Unit test for the spatial-hash collision pass
+
+import unittest
+import numpy as np
+from bouncing_ball import BallField
+from collisions import SpatialHash
+
+
+def brute_force_contacts(positions, radii):
+    pairs = set()
+    for i in range(len(positions)):
+        for j in range(i + 1, len(positions)):
+            if np.sum((positions[i] - positions[j]) ** 2) < (radii[i] + radii[j]) ** 2:
+                pairs.add((i, j))
+    return pairs
+
+
+class TestSpatialHash(unittest.TestCase):
+    def test_candidates_cover_every_contact(self):
+        field = BallField.random(400, 200, 150, radius=(3, 8), seed=3)
+        grid = SpatialHash(200, 150, 2 * field.radii.max())
+        grid.rebuild(field.positions)
+        pairs_i, pairs_j = grid.candidate_pairs()
+        candidates = {tuple(sorted(p)) for p in zip(pairs_i.tolist(), pairs_j.tolist())}
+
+        self.assertTrue(brute_force_contacts(field.positions, field.radii) <= candidates)
+        self.assertEqual(len(candidates), len(pairs_i))  # no pair reported twice
+
+    def test_incremental_rebuild_matches_fresh_sort(self):
+        field = BallField.random(500, 300, 200, seed=4)
+        grid = SpatialHash(300, 200, 24)
+        grid.rebuild(field.positions)
+        field.step(1 / 30)
+        grid.rebuild(field.positions)
+        self.assertTrue(np.all(np.diff(grid.keys[grid.order]) >= 0))
+        np.testing.assert_array_equal(np.sort(grid.order), np.arange(len(grid.keys)))  # a permutation
+        # Ties may keep the previous frame's order, so compare the cells the orders visit.
+        np.testing.assert_array_equal(grid.keys[grid.order], grid.keys[np.argsort(grid.keys, kind="stable")])
+
+
+class TestElasticCollision(unittest.TestCase):
+    def test_equal_masses_swap_velocities(self):
+        field = BallField(200, 100, [[90, 50], [109, 50]], [[100, 0], [-100, 0]], [10, 10], collisions=True)
+        field.step(0.01)
+        np.testing.assert_allclose(field.velocities, [[-100, 0], [100, 0]], atol=1e-4)
+        self.assertEqual(field.contacts, 1)
+
+    def test_momentum_is_conserved(self):
+        field = BallField.random(300, 120, 120, radius=(4, 8), seed=5, collisions=True)
+        mass = field.radii[:, None] ** 2
+        before = (mass * field.velocities).sum(axis=0)
+        field.collide()
+        after = (mass * field.velocities).sum(axis=0)
+        np.testing.assert_allclose(before, after, rtol=1e-3, atol=1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
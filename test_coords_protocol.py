@@ -0,0 +1,37 @@
+# Unit test for the binary coords/error datagram layout
+
+import math
+import unittest
+import numpy as np
+import coords_protocol
+from coords_protocol import COORDS, ERRORS
+
+
+class TestCoordsProtocol(unittest.TestCase):
+    def test_coords_round_trip(self):
+        data = coords_protocol.encode_coords([(0, 12, math.nan, 10.5, 20.0), (1, -1, 0.25, 11.0, 21.0)])
+        self.assertEqual(len(data), 4 + 2 * 20)
+        kind, samples = coords_protocol.decode(data)
+        self.assertEqual(kind, COORDS)
+        self.assertEqual(samples["frame"].tolist(), [12, -1])
+        self.assertTrue(math.isnan(samples["media_time"][0]))
+        self.assertEqual(samples["x"].tolist(), [10.5, 11.0])
+
+    def test_error_batch(self):
+        kind, samples = coords_protocol.decode(coords_protocol.encode_errors([5, 6], [1.0, -2.0], [0.5, 0.0]))
+        self.assertEqual(kind, ERRORS)
+        self.assertEqual(samples["seq"].tolist(), [5, 6])
+        np.testing.assert_array_equal(samples["error_x"], [1.0, -2.0])
+
+    def test_rejects_json_and_truncated_data(self):
+        with self.assertRaises(ValueError):
+            coords_protocol.decode(b'{"type": "coords"}')
+        data = coords_protocol.encode_coords([(0, 1, 0.0, 1.0, 1.0)])
+        with self.assertRaises(ValueError):
+            coords_protocol.decode(data[:-1])
+        with self.assertRaises(ValueError):
+            coords_protocol.decode(b"\x09\x01\x00\x00")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# Unit test for encode-once packet fan-out
+
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import numpy as np
+from av import VideoFrame
+from aiortc.codecs.h264 import H264Encoder
+from broadcast import FrameBroadcast
+from encoded_track import tier_encoder
+
+
+class TestEncodedTrack(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.broadcast = FrameBroadcast(width=64, height=48, fps=10, producer=False)
+        self.encoder = tier_encoder(self.broadcast, 200_000)
+
+    async def asyncTearDown(self):
+        self.broadcast.stop()
+
+    async def publish(self, value):
+        self.broadcast.ring.publish(np.full((48, 64, 3), value, dtype=np.uint8))
+        self.broadcast.signal.notify()
+
+    async def test_peers_share_one_encode(self):
+        first, second = self.encoder.track(), self.encoder.track()
+        self.assertIs(tier_encoder(self.broadcast, 200_000), self.encoder)
+        packets = []
+        for value in range(3):
+            await self.publish(value * 40)
+            packets.append(await asyncio.wait_for(asyncio.gather(first.recv(), second.recv()), 5))
+
+        self.assertEqual(self.encoder.frames_encoded, 3)
+        for a, b in packets:
+            self.assertIs(a, b)
+        self.assertTrue(packets[0][0].is_keyframe)
+        payloads, _ = H264Encoder().pack(packets[0][0])  # what RTCRtpSender does with a packet
+        self.assertTrue(payloads)
+
+    async def test_late_joiner_starts_at_cached_keyframe(self):
+        early = self.encoder.track()
+        for value in range(3):
+            await self.publish(value * 40)
+            await asyncio.wait_for(early.recv(), 5)
+
+        late = self.encoder.track()
+        primer = [await late.recv() for _ in range(3)]
+        self.assertTrue(primer[0].is_keyframe)
+        self.assertEqual([p.pts for p in primer], [0, 1, 2])
+
+    async def test_slow_peer_resyncs_at_keyframe(self):
+        track = self.encoder.track()
+        track.max_pending = 3
+        delta = SimpleNamespace(is_keyframe=False)
+        key = SimpleNamespace(is_keyframe=True)
+        for packet in (key, delta, delta, delta, delta, key, delta):
+            track.push(packet)
+        self.assertEqual(list(track.pending), [key, delta])
+        self.assertEqual(track.dropped, 3)
+
+    async def test_last_peer_leaving_stops_the_encoder(self):
+        track = self.encoder.track()
+        self.assertEqual(len(self.broadcast.subscribers), 1)
+        track.stop()
+        self.assertTrue(self.broadcast.idle)
+        self.assertIsNone(self.encoder._task)
+
+    async def test_close_waits_for_a_running_encode(self):
+        self.encoder.track()
+        started, release = threading.Event(), threading.Event()
+        context = MagicMock()
+        context.encode.side_effect = lambda frame: (started.set(), release.wait(5), [])[2]
+        self.encoder._open = lambda width, height: context
+        frame = VideoFrame.from_ndarray(np.zeros((48, 64, 3), dtype=np.uint8), format="bgr24")
+        generation = self.encoder._generation
+        running = asyncio.get_running_loop().run_in_executor(None, self.encoder.encode, frame, generation)
+        self.assertTrue(started.wait(5))
+
+        closer = threading.Thread(target=self.encoder.close)
+        closer.start()
+        closer.join(0.2)
+        self.assertTrue(closer.is_alive())  # held off until the encode returns
+        self.assertIs(self.encoder.context, context)
+        release.set()
+        closer.join(5)
+        await running
+        self.assertIsNone(self.encoder.context)
+        # An encode queued before close() must not reopen the torn-down state.
+        self.assertEqual(self.encoder.encode(frame, generation), [])
+        self.assertEqual((self.encoder.context, self.encoder.frames_encoded), (None, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# Unit test for deadline-based frame pacing
+
+import unittest
+from frame_clock import FrameClock
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 100.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestFrameClock(unittest.TestCase):
+    def setUp(self):
+        self.time = FakeTime()
+        self.clock = FrameClock(10, clock=self.time.clock, sleep=self.time.sleep)
+        self.clock.start()
+
+    def test_work_does_not_drift_deadlines(self):
+        for _ in range(10):
+            self.time.now += 0.03  # per-frame work
+            self.clock.wait()
+        self.assertAlmostEqual(self.time.now, 101.0)
+        self.assertEqual(self.clock.missed, 0)
+
+    def test_late_frames_are_skipped_and_counted(self):
+        self.time.now += 0.35  # stall through three and a half frames
+        skipped = self.clock.wait()
+        self.assertEqual(skipped, 2)
+        self.assertEqual(self.clock.missed, 2)
+        self.assertEqual(self.clock.late, 1)
+        self.assertEqual(self.clock.frame_index, 3)
+        self.clock.wait()
+        self.assertAlmostEqual(self.time.now, 100.4)
+
+    def test_physics_advances_in_fixed_steps(self):
+        clock = FrameClock(10, physics_hz=40, clock=self.time.clock, sleep=self.time.sleep)
+        clock.start()
+        self.assertEqual(clock.physics_steps(), 0)
+        clock.wait()
+        self.assertEqual(clock.physics_steps(), 4)
+        self.time.now += 0.25
+        clock.wait()  # skips a deadline, but simulated time still catches up
+        self.assertEqual(clock.physics_steps(), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# Unit test for the shared-memory frame ring
+
+import pickle
+import unittest
+import numpy as np
+from frame_ring import FrameRing
+
+
+class TestFrameRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = FrameRing(width=32, height=24, slots=3)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_latest_frame_cursor(self):
+        self.assertEqual(self.ring.latest(), (None, None))
+        seq, slot, view = self.ring.begin_write()
+        view[...] = 7
+        self.assertEqual(self.ring.latest(), (None, None))  # not committed yet
+        self.ring.commit(seq)
+
+        got, frame = self.ring.latest()
+        self.assertEqual(got, 0)
+        self.assertEqual(frame.shape, (24, 32, 3))
+        self.assertTrue(np.all(frame == 7))
+        self.assertEqual(self.ring.latest(after=0), (None, None))
+
+    def test_views_are_zero_copy_and_detect_laps(self):
+        self.ring.publish(np.full((24, 32, 3), 1, dtype=np.uint8))
+        seq, frame = self.ring.latest()
+        for value in range(2, 5):
+            self.ring.publish(np.full((24, 32, 3), value, dtype=np.uint8))
+        self.assertFalse(self.ring.still_valid(seq))
+        self.assertTrue(np.all(frame == 4))  # the slot was reused underneath the view
+
+    def test_requested_size_travels_with_each_slot(self):
+        self.assertEqual(self.ring.requested, (32, 24, 1))
+        reader = pickle.loads(pickle.dumps(self.ring))
+        try:
+            reader.request(16, 12, stride=2)
+            self.assertEqual(self.ring.requested, (16, 12, 2))
+            seq, _, view = self.ring.begin_write(16, 12)
+            view[...] = 5
+            self.ring.commit(seq)
+            got, frame = reader.latest()
+            self.assertEqual(frame.shape, (12, 16, 3))
+            self.assertTrue(np.all(frame == 5))
+            with self.assertRaises(ValueError):
+                reader.request(64, 48)
+        finally:
+            del frame
+            reader.close()
+
+    def test_attach_by_pickling(self):
+        reader = pickle.loads(pickle.dumps(self.ring))
+        try:
+            self.ring.publish(np.full((24, 32, 3), 9, dtype=np.uint8))
+            seq, frame = reader.latest()
+            self.assertEqual(seq, 0)
+            self.assertTrue(np.all(frame == 9))
+        finally:
+            del frame
+            reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+# Unit test for the producer-to-loop frame wakeup
+
+import asyncio
+import threading
+import time
+import unittest
+from frame_signal import FrameSignal
+
+
+class TestFrameSignal(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.signal = FrameSignal()
+
+    async def asyncTearDown(self):
+        self.signal.close()
+
+    async def test_wait_times_out_without_poke(self):
+        self.assertFalse(await self.signal.wait(0.01))
+
+    async def test_poke_from_another_thread_wakes_waiter(self):
+        threading.Timer(0.02, self.signal.notify).start()
+        start = time.monotonic()
+        self.assertTrue(await self.signal.wait(1.0))
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    async def test_coalesces_pokes(self):
+        for _ in range(100000):  # more than a pipe buffer; must never block
+            self.signal.notify()
+        self.assertTrue(await self.signal.wait(0.1))
+        self.assertFalse(await self.signal.wait(0.01))
+
+
+if __name__ == '__main__':
+    unittest.main()
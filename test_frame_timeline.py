@@ -0,0 +1,41 @@
+# Unit test for the shared-memory ground-truth timeline
+
+import pickle
+import unittest
+from frame_timeline import FrameTimeline, PTS_RATE
+
+
+class TestFrameTimeline(unittest.TestCase):
+    def setUp(self):
+        self.timeline = FrameTimeline(fps=30, capacity=8)
+
+    def tearDown(self):
+        self.timeline.close()
+
+    def test_lookup_by_frame_and_pts(self):
+        for frame in (0, 1, 3):  # deadline 2 was skipped
+            self.assertEqual(self.timeline.record(frame, 10.0 * frame, 5.0), frame * PTS_RATE // 30)
+        self.assertEqual(self.timeline.by_frame(3), (30.0, 5.0))
+        self.assertIsNone(self.timeline.by_frame(2))
+        self.assertEqual(self.timeline.by_pts(3000), (10.0, 5.0))  # nearest frame is 1
+        self.assertIn(self.timeline.by_pts(2 * 3000), [(10.0, 5.0), (30.0, 5.0)])
+        self.assertEqual(self.timeline.latest(), (30.0, 5.0))
+
+    def test_overwritten_frames_are_gone(self):
+        for frame in range(10):
+            self.timeline.record(frame, frame, frame)
+        self.assertIsNone(self.timeline.by_frame(1))  # slot now holds frame 9
+        self.assertEqual(self.timeline.by_frame(9), (9.0, 9.0))
+
+    def test_attach_by_pickling(self):
+        other = pickle.loads(pickle.dumps(self.timeline))
+        try:
+            self.timeline.record(4, 1.5, 2.5)
+            self.assertFalse(other.owner)
+            self.assertEqual(other.by_frame(4), (1.5, 2.5))
+        finally:
+            other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,26 +1,31 @@
 # Unit test for multiprocessing frame producer
 
+import logging
 import unittest
 import multiprocessing as mp
 import time
 import numpy as np
-from frame_worker import FrameProducer
+from frame_worker import FrameProducer, render_primer
+from frame_ring import FrameRing
+from frame_timeline import FrameTimeline
+from metrics import SharedMetrics, PRODUCER_METRICS
 
 class TestFrameProducer(unittest.TestCase):
     def setUp(self):
+        # Before any mp object is made: a Queue from the fork context can't be handed to a spawned process.
+        mp.set_start_method('spawn', force=True)
         self.queue = mp.Queue(maxsize=2)
         self.fps = 10
         self.stop_event = mp.Event()
         self.producer = FrameProducer(self.queue, width=320, height=240, fps=self.fps, stop_event=self.stop_event)
-        mp.set_start_method('spawn', force=True)
 
     def test_frame_generation(self):
         self.producer.start()
-        time.sleep(1.0)  # Allow it to produce some frames
         frames_collected = 0
 
-        while not self.queue.empty():
-            frame = self.queue.get()
+        # Block on the queue rather than sleeping a fixed time and hoping frames arrived.
+        for _ in range(3):
+            frame = self.queue.get(timeout=10)
             frames_collected += 1
             self.assertIsInstance(frame, np.ndarray)
             self.assertEqual(frame.shape, (480, 640, 3))
@@ -34,6 +39,111 @@ class TestFrameProducer(unittest.TestCase):
             self.producer.terminate()
             self.producer.join()
 
+    def test_renders_into_frame_ring(self):
+        ring = FrameRing(width=320, height=240, slots=3)
+        stop_event = mp.Event()
+        producer = FrameProducer(ring, fps=self.fps, stop_event=stop_event)
+        producer.start()
+        try:
+            deadline = time.time() + 10
+            while ring.latest_seq < 0 and time.time() < deadline:
+                time.sleep(0.05)
+            seq, frame = ring.latest()
+            self.assertIsNotNone(seq, "No frames were published.")
+            self.assertEqual(frame.shape, (240, 320, 3))
+            self.assertGreater(int(frame[:, :, 1].max()), 0)
+            del frame
+        finally:
+            stop_event.set()
+            producer.join(timeout=5)
+            if producer.is_alive():
+                producer.terminate()
+                producer.join()
+            ring.close()
+
+    def test_paced_run_keeps_frame_rate(self):
+        ring = FrameRing(width=320, height=240, slots=3)
+        try:
+            producer = FrameProducer(ring, fps=50, duration=0.3)
+            producer.run()  # in-process: paced by deadlines, not by sleeps after the work
+            self.assertGreaterEqual(producer.clock_stats["frames"] + producer.clock_stats["missed"], 14)
+            self.assertEqual(ring.latest_seq + 1, producer.clock_stats["frames"])
+        finally:
+            ring.close()
+
+    def test_publishes_ground_truth_timeline(self):
+        ring = FrameRing(width=320, height=240, slots=3)
+        timeline = FrameTimeline(fps=50)
+        try:
+            producer = FrameProducer(ring, fps=50, duration=0.1, timeline=timeline)
+            producer.run()
+            frame = timeline.latest_frame
+            self.assertGreaterEqual(frame, 0)
+            self.assertEqual(ring.pts(ring.latest_seq), timeline.pts(frame))
+            x, y = timeline.by_frame(frame)
+            self.assertTrue(0 <= x <= 320 and 0 <= y <= 240)
+        finally:
+            ring.close()
+            timeline.close()
+
+    def test_renders_requested_tier(self):
+        ring = FrameRing(width=320, height=240, slots=3)
+        try:
+            ring.request(160, 120, stride=2)
+            producer = FrameProducer(ring, fps=50, duration=0.3)
+            producer.run()
+            seq, frame = ring.latest()
+            self.assertEqual(frame.shape, (120, 160, 3))
+            self.assertGreater(int(frame[:, :, 1].max()), 0)
+            # Every other tick is rendered; the rest only advance the physics.
+            ticks = producer.clock_stats["frames"]
+            self.assertAlmostEqual(seq + 1, ticks / 2, delta=1)
+            del frame
+        finally:
+            ring.close()
+
+    def test_primer_frame_precedes_producer_frames(self):
+        ring = FrameRing(width=320, height=240, slots=3, pixel_format="yuv420p")
+        try:
+            self.assertEqual(render_primer(ring), 0)
+            seq, frame = ring.latest()
+            self.assertEqual(seq, 0)
+            self.assertIsNone(ring.pts(seq))  # a placeholder, not in the timeline
+            self.assertGreater(int(frame[120, 160]), 100)  # the ball starts in the middle
+            del frame
+            FrameProducer(ring, fps=50, duration=0.1).run()
+            seq, frame = ring.latest(0)
+            self.assertGreater(seq, 0)
+            self.assertIsNotNone(ring.pts(seq))
+            del frame
+        finally:
+            ring.close()
+
+    def test_in_process_run_leaves_host_logging_alone(self):
+        logger = logging.getLogger("ball")
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        ring = FrameRing(width=64, height=48, slots=3)
+        try:
+            FrameProducer(ring, fps=50, duration=0.05, debug=True).run()
+            self.assertEqual(logger.level, logging.WARNING)
+        finally:
+            logger.setLevel(level)
+            ring.close()
+
+    def test_reports_metrics(self):
+        ring = FrameRing(width=320, height=240, slots=3)
+        metrics = SharedMetrics(PRODUCER_METRICS)
+        try:
+            FrameProducer(ring, fps=50, duration=0.1, metrics=metrics).run()
+            produced = metrics["ball_frames_produced_total"].value
+            self.assertGreater(produced, 0)
+            self.assertEqual(metrics["ball_render_seconds"].count, produced)
+            self.assertEqual(metrics["ball_producer_fps"].value, 0)  # reset once stopped
+        finally:
+            ring.close()
+            metrics.close()
+
     def tearDown(self):
         if self.producer.is_alive():
             self.producer.terminate()
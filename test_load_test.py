@@ -0,0 +1,69 @@
+# Unit test for the load generator's measurements and report
+
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+from load_test import SessionResult, ProcessTreeCPU, summarize
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def session(handshake, first_frame, frames, window, errors=()):
+    result = SessionResult()
+    result.handshake, result.answer, result.first_frame = handshake, handshake * 2, first_frame
+    result.frames, result.window = frames, window
+    result.errors = np.asarray(errors, dtype=float)
+    return result
+
+
+def load_level(*server_args):
+    """One short load_test.py level against a fresh server started with `server_args`."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "load.json")
+        subprocess.run([sys.executable, os.path.join(ROOT, "load_test.py"), "--sessions", "4", "--duration", "4",
+                        "--ramp", "0.5", "--cooldown", "0", "--coords-rate", "0", "--output", output,
+                        "--", *server_args], check=True, timeout=120, capture_output=True)
+        with open(output) as f:
+            return json.load(f)["levels"][0]
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_summarize_level(self):
+        failed = SessionResult()
+        failed.failure = "TimeoutError: "
+        no_video = session(0.01, None, 0, 0.0)
+        row = summarize(4, [session(0.01, 0.2, 90, 9.0, [1, 3]), session(0.03, 0.4, 45, 9.0, [5]), failed, no_video],
+                        cpu=55.0)
+        self.assertEqual((row["failed"], row["no_video"]), (1, 1))
+        self.assertAlmostEqual(row["handshake_ms"][0], 10.0)  # the session without video still connected
+        self.assertAlmostEqual(row["first_frame_ms"][0], 300.0)
+        self.assertEqual((row["fps_mean"], row["fps_min"]), (7.5, 5.0))
+        self.assertEqual((row["errors_received"], row["error_p50"]), (3, 3.0))
+        self.assertEqual(row["failures"], ["TimeoutError: "])
+
+        empty = summarize(1, [failed], cpu=None)
+        self.assertTrue(math.isnan(empty["handshake_ms"][0]))
+
+    @unittest.skipUnless(os.path.isdir("/proc"), "needs /proc")
+    def test_process_tree_cpu(self):
+        cpu = ProcessTreeCPU(os.getpid())
+        self.assertIsNone(cpu.percent())
+        sum(i * i for i in range(300000))
+        self.assertGreater(cpu.percent(), 0)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "the workers share a port through SO_REUSEPORT")
+    def test_workers_keep_up_with_one_process(self):
+        single = load_level()
+        workers = load_level("--workers", "2")
+        self.assertEqual((single["failed"], workers["failed"]), (0, 0))
+        self.assertGreaterEqual(workers["fps_mean"], 0.95 * single["fps_mean"])
+        self.assertLess(workers["first_frame_ms"][0], 2 * single["first_frame_ms"][0] + 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
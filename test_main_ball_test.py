@@ -0,0 +1,37 @@
+# Unit test for the parallel offline renderer in main_ball_test
+
+import tempfile
+import unittest
+import av
+import numpy as np
+from bouncing_ball import BouncingBall
+from main_ball_test import run_offline, chunk_states, RADIUS, SPEED
+
+
+class TestOfflineRender(unittest.TestCase):
+    def test_chunk_states_match_sequential_stepping(self):
+        ball = BouncingBall(320, 240, radius=RADIUS, speed=SPEED)
+        chunks = chunk_states(320, 240, 20, 50, 15)
+        self.assertEqual([(start, count) for start, count, _, _ in chunks], [(0, 15), (15, 15), (30, 15), (45, 5)])
+        for frame in range(45):
+            ball.step(1 / 20)
+        np.testing.assert_array_equal(chunks[3][2], ball.position)
+        np.testing.assert_array_equal(chunks[3][3], ball.velocity)
+
+    def test_parallel_chunks_concatenate_in_order(self):
+        fps, width, height = 20, 320, 240
+        ball = BouncingBall(width, height, radius=RADIUS, speed=SPEED)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = run_offline(width, height, fps=fps, duration=2, output_dir=tmp, workers=2, chunk_seconds=0.5)
+            with av.open(path) as container:
+                frames = [frame.to_ndarray(format="bgr24") for frame in container.decode(video=0)]
+        self.assertEqual(len(frames), 2 * fps)
+        for frame in frames:
+            ball.step(1 / fps)
+            ys, xs = np.nonzero(frame[:, :, 1] > 128)
+            self.assertLess(abs(xs.mean() - ball.position[0]), 2)
+            self.assertLess(abs(ys.mean() - ball.position[1]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
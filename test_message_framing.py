@@ -0,0 +1,52 @@
+# Unit test for the newline-delimited control stream decoder
+
+import json
+import unittest
+from unittest import mock
+from message_framing import MessageDecoder, encode_message
+
+
+class TestMessageDecoder(unittest.TestCase):
+    def test_split_and_coalesced_messages(self):
+        decoder = MessageDecoder()
+        offer = encode_message({"type": "offer", "sdp": "v=0\r\n" * 500})
+        coords = encode_message({"type": "coords", "x": 1, "y": 2})
+        stream = offer + coords + coords
+
+        messages = []
+        for start in range(0, len(stream), 700):  # arbitrary chunking
+            messages += decoder.feed(stream[start:start + 700])
+        self.assertEqual([json.loads(m)["type"] for m in messages], ["offer", "coords", "coords"])
+        self.assertEqual(decoder.pending, 0)
+
+    def test_partial_message_carries_over(self):
+        decoder = MessageDecoder()
+        self.assertEqual(decoder.feed(b'{"a": 1}\n{"b"'), [b'{"a": 1}'])
+        self.assertEqual(decoder.feed(b': 2}\n'), [b'{"b": 2}'])
+
+    def test_legacy_unterminated_documents(self):
+        decoder = MessageDecoder()
+        self.assertEqual(decoder.feed(b'{"type": "coords", "x": 3}'), [b'{"type": "coords", "x": 3}'])
+        self.assertEqual(decoder.feed(b'{"sdp": "}'), [])  # incomplete, keep buffering
+        self.assertEqual(decoder.feed(b'"}'), [b'{"sdp": "}"}'])
+        self.assertEqual(MessageDecoder(legacy_json=False).feed(b'{"a": 1}'), [])
+
+    def test_legacy_document_is_parsed_once(self):
+        document = json.dumps({"type": "offer", "sdp": "a={}\\\" }" * 2000}).encode()
+        decoder = MessageDecoder()
+        with mock.patch("message_framing.json.loads", wraps=json.loads) as loads:
+            messages = []
+            for i in range(0, len(document), 7):
+                messages += decoder.feed(document[i:i + 7])
+        self.assertEqual(messages, [document])
+        self.assertEqual(loads.call_count, 1)
+
+    def test_oversized_message_is_rejected(self):
+        decoder = MessageDecoder(max_message=16)
+        with self.assertRaises(ValueError):
+            decoder.feed(b"x" * 32)
+        self.assertEqual(decoder.feed(b'{"ok": 1}\n'), [b'{"ok": 1}'])
+
+
+if __name__ == '__main__':
+    unittest.main()
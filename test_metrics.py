@@ -0,0 +1,94 @@
+# Unit test for the shared-memory pipeline metrics and their Prometheus rendering
+
+import pickle
+import unittest
+from metrics import (MetricsRegistry, MetricSet, SharedMetrics, RateGauge, PhaseTimer, merge_pages, COUNTER, GAUGE, HISTOGRAM,
+                     PRODUCER_METRICS)
+
+SPECS = (
+    ("test_frames_total", COUNTER, "Frames"),
+    ("test_depth", GAUGE, "Depth"),
+    ("test_seconds", HISTOGRAM, "Latency", (0.01, 0.1)),
+)
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        metrics = registry.local(SPECS)
+        metrics["test_frames_total"].inc(3)
+        metrics["test_depth"].set(2)
+        for value in (0.005, 0.05, 0.05, 5.0):
+            metrics["test_seconds"].observe(value)
+
+        lines = registry.render().splitlines()
+        self.assertIn("# TYPE test_frames_total counter", lines)
+        self.assertIn("test_frames_total 3", lines)
+        self.assertIn("test_depth 2", lines)
+        # Buckets are rendered cumulatively.
+        self.assertIn('test_seconds_bucket{le="0.01"} 1', lines)
+        self.assertIn('test_seconds_bucket{le="0.1"} 3', lines)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("test_seconds_sum 5.105", lines)
+        self.assertIn("test_seconds_count 4", lines)
+
+    def test_shared_sets_aggregate_and_release_keeps_counters(self):
+        registry = MetricsRegistry()
+        first, second = registry.shared(PRODUCER_METRICS), registry.shared(PRODUCER_METRICS)
+        writer = pickle.loads(pickle.dumps(first))  # what a producer process sees
+        try:
+            writer["ball_frames_produced_total"].inc(10)
+            writer["ball_producer_fps"].set(30)
+            second["ball_frames_produced_total"].inc(5)
+            second["ball_producer_fps"].set(25)
+            self.assertIn("ball_frames_produced_total 15", registry.render().splitlines())
+            self.assertIn("ball_producer_fps 55", registry.render().splitlines())
+        finally:
+            writer.close()
+
+        registry.release(first)
+        lines = registry.render().splitlines()
+        self.assertIn("ball_frames_produced_total 15", lines)
+        self.assertIn("ball_producer_fps 25", lines)
+        registry.release(second)
+        self.assertIn("ball_frames_produced_total 15", registry.render().splitlines())
+
+    def test_rate_gauge(self):
+        now = [0.0]
+        metrics = MetricSet(SPECS)
+        rate = RateGauge(metrics["test_frames_total"], metrics["test_depth"], clock=lambda: now[0])
+        metrics["test_frames_total"].inc(20)
+        now[0] = 2.0
+        rate()
+        self.assertEqual(metrics["test_depth"].value, 10)
+
+    def test_phase_timer_records_each_phase_once(self):
+        now = [10.0]
+        metrics = MetricSet(SPECS)
+        timer = PhaseTimer(metrics, {"first": "test_seconds"}, clock=lambda: now[0])
+        now[0] = 10.05
+        self.assertAlmostEqual(timer.mark("first"), 0.05)
+        now[0] = 12.0
+        self.assertIsNone(timer.mark("first"))
+        self.assertAlmostEqual(timer.elapsed["first"], 0.05)
+        self.assertEqual(metrics["test_seconds"].count, 1)
+
+    def test_merge_pages_sums_each_series(self):
+        pages = []
+        for frames in (3, 4):
+            registry = MetricsRegistry()
+            metrics = registry.local(SPECS)
+            metrics["test_frames_total"].inc(frames)
+            metrics["test_seconds"].observe(0.05)
+            pages.append(registry.render())
+
+        lines = merge_pages(pages).splitlines()
+        self.assertEqual(lines.count("# TYPE test_frames_total counter"), 1)
+        self.assertIn("test_frames_total 7", lines)
+        self.assertIn('test_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn("test_seconds_count 2", lines)
+        self.assertEqual(lines.index("# HELP test_frames_total Frames") + 2, lines.index("test_frames_total 7"))
+
+
+if __name__ == "__main__":
+    unittest.main()
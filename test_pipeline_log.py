@@ -0,0 +1,50 @@
+# Unit test for the pipeline logging and snapshot helpers
+
+import logging
+import os
+import tempfile
+import unittest
+import numpy as np
+from pipeline_log import get_logger, configure, FrameSnapshotter
+
+
+class TestPipelineLogger(unittest.TestCase):
+    def tearDown(self):
+        configure("INFO")
+
+    def test_level_flags_follow_configure(self):
+        log = get_logger("test")
+        configure("INFO")
+        self.assertFalse(log.debug_on)
+        configure("DEBUG")
+        self.assertTrue(log.debug_on)
+
+    def test_rate_limited_debug_reports_suppressed(self):
+        configure("DEBUG")
+        log = get_logger("test-rate")
+        with self.assertLogs("ball.test-rate", level=logging.DEBUG) as captured:
+            for i in range(5):
+                log.debug_every("tick", 60.0, "tick", i=i)
+        self.assertEqual(len(captured.records), 1)
+        self.assertEqual(log._suppressed["tick"], 4)
+
+
+class TestFrameSnapshotter(unittest.TestCase):
+    def test_samples_every_nth_frame_off_thread(self):
+        path = os.path.join(tempfile.mkdtemp(), "snap.png")
+        snapshots = FrameSnapshotter(every=3, path=path)
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        for index in range(1, 4):
+            snapshots.maybe(frame, index)
+        snapshots.close()
+        self.assertEqual(snapshots.written, 1)
+        self.assertTrue(os.path.exists(path))
+
+    def test_disabled_by_default(self):
+        snapshots = FrameSnapshotter(every=0)
+        snapshots.maybe(np.zeros((8, 8, 3), dtype=np.uint8), 0)
+        self.assertIsNone(snapshots._thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
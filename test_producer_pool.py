@@ -0,0 +1,112 @@
+# Unit test for the pre-spawned producer pool
+
+import multiprocessing as mp
+import os
+import signal
+import time
+import unittest
+from frame_ring import FrameRing
+from producer_pool import ProducerPool
+
+
+def wait_for(predicate, timeout=20):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+def running(pid):
+    """True while `pid` exists and isn't a zombie waiting to be reaped."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def own_pool(conn):
+    """Stand-in server: a pool with one busy and one idle worker, until it is killed."""
+    pool = ProducerPool(min_workers=2, max_workers=2).start()
+    wait_for(lambda: pool.stats()["ready"] == 2)
+    ring = FrameRing(width=64, height=48, slots=3)
+    pool.start_session(ring, fps=30)
+    wait_for(lambda: ring.latest_seq >= 0)
+    conn.send([worker.process.pid for worker in pool.workers])
+    time.sleep(60)
+
+
+class TestProducerPool(unittest.TestCase):
+    def setUp(self):
+        self.rings = []
+
+    def tearDown(self):
+        self.pool.close()
+        for ring in self.rings:
+            ring.close()
+
+    def ring(self):
+        ring = FrameRing(width=64, height=48, slots=3)
+        self.rings.append(ring)
+        return ring
+
+    def test_warm_worker_takes_session_and_is_reused(self):
+        self.pool = ProducerPool(min_workers=1, max_workers=1).start()
+        self.assertTrue(wait_for(lambda: self.pool.stats()["ready"] == 1))
+
+        ring = self.ring()
+        session = self.pool.start_session(ring, fps=30)
+        self.assertTrue(wait_for(lambda: ring.latest_seq >= 0), "No frames were published.")
+        session.stop()
+        self.assertTrue(wait_for(lambda: self.pool.stats()["finished"] == 1))
+
+        ring = self.ring()
+        self.pool.start_session(ring, fps=30)
+        self.assertTrue(wait_for(lambda: ring.latest_seq >= 0))
+        stats = self.pool.stats()
+        self.assertEqual((stats["spawned"], stats["warm"], stats["cold"]), (1, 2, 0))
+
+    def test_stale_stop_leaves_the_next_session_running(self):
+        self.pool = ProducerPool(min_workers=1, max_workers=1).start()
+        first = self.pool.start_session(self.ring(), fps=30, duration=0.2)
+        self.assertTrue(wait_for(lambda: self.pool.stats()["finished"] == 1))
+
+        ring = self.ring()
+        second = self.pool.start_session(ring, fps=30)
+        self.assertIs(second.worker, first.worker)
+        self.assertTrue(wait_for(lambda: ring.latest_seq >= 0))
+        first.stop()  # e.g. the first peer's connection closing late
+        seq = ring.latest_seq
+        self.assertTrue(wait_for(lambda: ring.latest_seq > seq + 5, timeout=5), "The second session was stopped.")
+
+    def test_limits_and_recycling(self):
+        self.pool = ProducerPool(min_workers=1, max_workers=1, max_sessions=1).start()
+        session = self.pool.start_session(self.ring(), fps=30)
+        self.assertIsNone(self.pool.start_session(self.ring(), fps=30))
+        self.assertEqual(self.pool.stats()["rejected"], 1)
+
+        session.stop()
+        self.assertTrue(wait_for(lambda: self.pool.stats()["retired"] == 1))
+        stats = self.pool.stats()
+        self.assertEqual((stats["workers"], stats["spawned"]), (1, 2))
+
+    def test_workers_exit_with_their_owner(self):
+        self.pool = ProducerPool(min_workers=0)
+        conn, child = mp.get_context("spawn").Pipe()
+        owner = mp.get_context("spawn").Process(target=own_pool, args=(child,))
+        owner.start()
+        try:
+            self.assertTrue(conn.poll(30), "The pool never started.")
+            pids = conn.recv()
+            self.assertEqual(len(pids), 2)
+            os.kill(owner.pid, signal.SIGKILL)
+            owner.join()
+            self.assertTrue(wait_for(lambda: not any(running(pid) for pid in pids), timeout=10),
+                            "Pool workers outlived their owner.")
+        finally:
+            owner.kill()
+            owner.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
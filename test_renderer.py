@@ -0,0 +1,67 @@
+# Unit test for the incremental frame renderer
+
+import unittest
+import cv2
+import numpy as np
+from bouncing_ball import BouncingBall, BallField
+from renderer import FrameRenderer, blank_frame
+
+
+class TestFrameRenderer(unittest.TestCase):
+    def test_incremental_matches_full_redraw(self):
+        ball = BouncingBall(160, 120, radius=10, speed=(300, 200))
+        renderer = FrameRenderer(160, 120)
+        for _ in range(20):
+            ball.step(1 / 30)
+            np.testing.assert_array_equal(ball.render(renderer), ball.render())
+
+    def test_frame_buffer_is_reused(self):
+        ball = BouncingBall(160, 120)
+        renderer = FrameRenderer(160, 120)
+        first = ball.render(renderer)
+        ball.step(0.1)
+        self.assertIs(ball.render(renderer), first)
+
+    def test_double_buffers_alternate_and_stay_clean(self):
+        field = BallField.random(30, 200, 150, seed=1)
+        renderer = FrameRenderer(200, 150, buffers=2)
+        reference = FrameRenderer(200, 150, incremental=False)
+        seen = []
+        for _ in range(6):
+            field.step(1 / 30)
+            frame = renderer.render(field)
+            seen.append(id(frame))
+            np.testing.assert_array_equal(frame, reference.render(field))
+        self.assertEqual(len(set(seen)), 2)
+
+    def test_i420_render_matches_converted_bgr(self):
+        field = BallField.random(12, 160, 120, radius=(8, 14), seed=2)
+        renderer = FrameRenderer(160, 120, buffers=2, pixel_format="yuv420p")
+        for _ in range(3):
+            field.step(1 / 30)
+            bgr = FrameRenderer(160, 120, incremental=False).render(field)
+            i420 = renderer.render(field)
+        self.assertEqual(i420.shape, (180, 160))
+        converted = cv2.cvtColor(i420, cv2.COLOR_YUV2BGR_I420).astype(int)
+        # Chroma is drawn at half resolution, so only ball edges may differ.
+        self.assertLess(np.mean(np.abs(converted - bgr) > 40), 0.05)
+
+    def test_scaled_render_draws_full_field_smaller(self):
+        ball = BouncingBall(160, 120, radius=10)
+        ball.position = (100, 40)
+        for pixel_format in ("bgr24", "yuv420p"):
+            full = FrameRenderer(160, 120, pixel_format=pixel_format).render(ball.field)
+            half = FrameRenderer(80, 60, pixel_format=pixel_format, scale=2).render(ball.field)
+            self.assertEqual(half.shape, (full.shape[0] // 2, full.shape[1] // 2) + full.shape[2:])
+            luma = half[:60, :, 1] if pixel_format == "bgr24" else half[:60]
+            ys, xs = np.nonzero(luma > 100)
+            self.assertAlmostEqual(xs.mean(), 50, delta=1)
+            self.assertAlmostEqual(ys.mean(), 20, delta=1)
+
+    def test_blank_i420_is_black(self):
+        frame = blank_frame(64, 48, "yuv420p")
+        self.assertTrue(np.all(cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420) <= 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# Unit test for the SO_REUSEPORT server workers and their supervisor
+
+import asyncio
+import os
+import select
+import socket
+import time
+import unittest
+from aiohttp import web
+from metrics import MetricSet, WORKER_METRICS
+from server_workers import reuseport_sockets, WorkerSupervisor
+
+
+def serve_health(index, sock, admin_path, stop_signal, greeting):
+    """A stand-in worker: answers /health on its admin socket until told to stop."""
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/health", lambda request: web.json_response(
+            {"greeting": greeting, "port": sock.getsockname()[1]}))
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.UnixSite(runner, admin_path).start()
+        await stop_signal.wait(30)
+        await runner.cleanup()
+
+    asyncio.run(main())
+
+
+class TestServerWorkers(unittest.TestCase):
+    def test_reuseport_clients_stay_on_one_socket(self):
+        servers = reuseport_sockets("127.0.0.1", 0, 3)
+        clients = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(8)]
+        try:
+            port = servers[0].getsockname()[1]
+            self.assertEqual({server.getsockname()[1] for server in servers}, {port})
+            for client in clients:
+                for _ in range(5):
+                    client.sendto(b"x", ("127.0.0.1", port))
+
+            seen = {}  # client address -> indices of the server sockets that got its datagrams
+            deadline = time.monotonic() + 2
+            while sum(len(v) for v in seen.values()) < 40 and time.monotonic() < deadline:
+                readable, _, _ = select.select(servers, [], [], 0.1)
+                for server in readable:
+                    _, address = server.recvfrom(16)
+                    seen.setdefault(address, []).append(servers.index(server))
+            self.assertEqual(len(seen), 8)
+            for indices in seen.values():
+                self.assertEqual(len(indices), 5)
+                self.assertEqual(len(set(indices)), 1)
+        finally:
+            for sock in servers + clients:
+                sock.close()
+
+    def test_supervisor_restarts_a_worker_on_its_own_socket(self):
+        sockets = reuseport_sockets("127.0.0.1", 0, 2)
+        port = sockets[0].getsockname()[1]
+        metrics = MetricSet(WORKER_METRICS)
+        supervisor = WorkerSupervisor(serve_health, sockets, args=("hi",), metrics=metrics).start()
+
+        async def healthy(expected):
+            for _ in range(100):
+                workers = await supervisor.health()
+                if sum(worker["healthy"] for worker in workers) == expected:
+                    return workers
+                await asyncio.sleep(0.1)
+            self.fail(f"workers never became healthy: {workers}")
+
+        try:
+            workers = asyncio.run(healthy(2))
+            self.assertEqual([worker["port"] for worker in workers], [port, port])
+            self.assertEqual(workers[0]["greeting"], "hi")
+            self.assertEqual(metrics["ball_workers_up"].value, 2)
+
+            first = supervisor.workers[0].process
+            first.terminate()
+            first.join(timeout=5)
+            self.assertEqual(supervisor.check(), 1)
+            workers = asyncio.run(healthy(2))
+            self.assertNotEqual(workers[0]["pid"], first.pid)
+            self.assertEqual((workers[0]["restarts"], workers[0]["port"]), (1, port))
+            self.assertEqual(metrics["ball_worker_restarts_total"].value, 1)
+        finally:
+            supervisor.stop()
+        self.assertFalse(any(worker.process.is_alive() for worker in supervisor.workers))
+        self.assertFalse(os.path.exists(supervisor.admin_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
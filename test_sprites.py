@@ -0,0 +1,46 @@
+# Unit test for the ball sprite cache
+
+import unittest
+import numpy as np
+import cv2
+from sprites import SpriteCache, blit
+
+
+class TestSpriteCache(unittest.TestCase):
+    def test_stamp_matches_cv2_circle(self):
+        frame = np.zeros((60, 80, 3), dtype=np.uint8)
+        sprite = SpriteCache().get(12, (0, 255, 0))
+        blit(frame, sprite, np.array([30, 2]), np.array([25, 58]))  # second one is clipped
+
+        expected = np.zeros_like(frame)
+        cv2.circle(expected, (30, 25), 12, (0, 255, 0), -1)
+        cv2.circle(expected, (2, 58), 12, (0, 255, 0), -1)
+        np.testing.assert_array_equal(frame, expected)
+
+    def test_lru_eviction_respects_memory_cap(self):
+        cache = SpriteCache(max_bytes=4000)
+        for radius in range(4, 12):
+            cache.get(radius, (0, 255, 0))
+        self.assertLessEqual(cache.bytes, 4000)
+        self.assertGreater(cache.evictions, 0)
+
+        cache.get(11, (0, 255, 0))
+        self.assertEqual(cache.hits, 1)
+
+    def test_subpixel_phases_shift_the_stamp(self):
+        cache = SpriteCache(subpixel=4, antialias=True)
+        left = np.zeros((40, 40, 3), dtype=np.uint8)
+        right = np.zeros((40, 40, 3), dtype=np.uint8)
+        blit(left, cache.get(8, (0, 255, 0), 0, 0), np.array([20]), np.array([20]))
+        blit(right, cache.get(8, (0, 255, 0), 2, 0), np.array([20]), np.array([20]))
+
+        def centroid_x(frame):
+            weight = frame[:, :, 1].astype(float)
+            return (weight.sum(axis=0) * np.arange(40)).sum() / weight.sum()
+
+        self.assertAlmostEqual(centroid_x(right) - centroid_x(left), 0.5, delta=0.1)
+        self.assertTrue(np.any((left[:, :, 1] > 0) & (left[:, :, 1] < 255)))  # soft edge
+
+
+if __name__ == '__main__':
+    unittest.main()
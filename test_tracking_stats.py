@@ -0,0 +1,82 @@
+# Unit test for the constant-memory tracking-error statistics
+
+import json
+import math
+import unittest
+import numpy as np
+from tracking_stats import RunningStats, TDigest, TrackingStats, TrackingRegistry
+
+
+class TestTrackingStats(unittest.TestCase):
+    def test_running_stats_match_numpy(self):
+        values = np.random.default_rng(1).normal(3.0, 2.0, 1000)
+        stats, merged = RunningStats(), RunningStats()
+        for value in values[:400]:
+            stats.add(value)
+        stats.add_many(values[400:700])
+        merged.add_many(values[700:])
+        stats.merge(merged)
+        self.assertEqual(stats.count, 1000)
+        self.assertAlmostEqual(stats.mean, values.mean(), places=9)
+        self.assertAlmostEqual(stats.variance, values.var(), places=9)
+        self.assertEqual((stats.min, stats.max), (values.min(), values.max()))
+
+    def test_tdigest_quantiles_stay_accurate_and_small(self):
+        values = np.random.default_rng(2).exponential(5.0, 50000)
+        digest, other = TDigest(), TDigest()
+        digest.add_many(values[:30000])
+        for value in values[30000:31000]:
+            other.add(value)
+        other.add_many(values[31000:])
+        digest.merge(other)
+        self.assertEqual(digest.count, 50000)
+        self.assertLess(len(digest.means), 200)
+        for q in (0.5, 0.95, 0.99):
+            self.assertAlmostEqual(digest.quantile(q), np.quantile(values, q), delta=0.02 * np.quantile(values, q))
+
+    def test_summary_and_registry_aggregate(self):
+        registry = TrackingRegistry()
+        registry.session("a").add(3.0, 4.0)
+        registry.session("b").add_many(np.array([0.0, 6.0]), np.array([0.0, 8.0]))
+        registry.close("a")
+        summary = registry.summary()
+        self.assertEqual((summary["active_sessions"], summary["finished_sessions"]), (1, 1))
+        aggregate = summary["aggregate"]
+        self.assertEqual(aggregate["count"], 3)
+        self.assertEqual(aggregate["max"], 10.0)
+        self.assertAlmostEqual(aggregate["rmse"], math.sqrt((25 + 0 + 100) / 3))
+        self.assertEqual(TrackingStats().summary(), {"count": 0})
+
+    def test_registry_state_merges_across_processes(self):
+        rng = np.random.default_rng(3)
+        errors = rng.normal(0.0, 4.0, (2, 3000))
+        whole, first, second = TrackingRegistry(), TrackingRegistry(), TrackingRegistry()
+        whole.session("a").add_many(errors[0], errors[1])
+        first.session("a").add_many(errors[0, :1000], errors[1, :1000])
+        second.session("a").add_many(errors[0, 1000:2000], errors[1, 1000:2000])
+        second.close("a")
+        second.session("b").add_many(errors[0, 2000:], errors[1, 2000:])
+
+        merged = TrackingRegistry()
+        for index, registry in enumerate((first, second, TrackingRegistry())):
+            merged.merge_state(json.loads(json.dumps(registry.state())), prefix=f"{index}/")
+        summary, expected = merged.summary(), whole.summary()["aggregate"]
+        self.assertEqual(sorted(summary["sessions"]), ["0/a", "1/b"])
+        self.assertEqual((summary["active_sessions"], summary["finished_sessions"]), (2, 1))
+        for key in ("count", "mean_x", "std_y", "rmse", "max"):
+            self.assertAlmostEqual(summary["aggregate"][key], expected[key], places=9)
+        self.assertAlmostEqual(summary["aggregate"]["p95"], expected["p95"], delta=0.02 * expected["p95"])
+
+    def test_empty_state_is_strict_json(self):
+        state = json.loads(json.dumps(TrackingRegistry().state(), allow_nan=False))
+        self.assertIsNone(state["finished"]["x"]["min"])
+        self.assertIsNone(state["finished"]["digest"]["max"])
+        merged = TrackingRegistry().merge_state(state)
+        merged.session("a").add(3.0, 4.0)
+        summary = merged.summary()["aggregate"]
+        self.assertEqual((summary["count"], summary["max"]), (1, 5.0))
+        self.assertEqual(merged.finished.x.min, math.inf)
+
+
+if __name__ == '__main__':
+    unittest.main()
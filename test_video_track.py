@@ -2,10 +2,15 @@
 
 import unittest
 import numpy as np
-from video_track import BouncingBallTrack
+from video_track import BouncingBallTrack, VideoFramePool
 from av.video.frame import VideoFrame
 import asyncio
 import multiprocessing as mp
+from frame_ring import FrameRing
+from frame_signal import FrameSignal
+from renderer import blank_frame
+import threading
+import time
 
 class TestBouncingBallTrack(unittest.IsolatedAsyncioTestCase):
     async def test_recv_returns_valid_frame(self):
@@ -32,5 +37,85 @@ class TestBouncingBallTrack(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(frame.width, 640)
         self.assertEqual(frame.height, 480)
 
+    async def test_recv_reads_latest_ring_frame(self):
+        ring = FrameRing(width=640, height=480, slots=3)
+        try:
+            for value in (10, 20):
+                ring.publish(np.full((480, 640, 3), value, dtype=np.uint8))
+
+            track = BouncingBallTrack(ring, fps=10)
+            frame = await track.recv()
+
+            self.assertEqual((frame.width, frame.height), (640, 480))
+            self.assertEqual(track.last_seq, 1)
+            self.assertEqual(int(frame.to_ndarray(format="bgr24")[0, 0, 0]), 20)
+        finally:
+            ring.close()
+
+    async def test_signal_wakes_recv_when_frame_lands(self):
+        ring = FrameRing(width=640, height=480, slots=3)
+        signal = FrameSignal()
+        try:
+            def publish():
+                ring.publish(np.full((480, 640, 3), 50, dtype=np.uint8))
+                signal.notify()
+
+            track = BouncingBallTrack(ring, fps=10, signal=signal)
+            threading.Timer(0.05, publish).start()
+            start = time.monotonic()
+            frame = await track.recv()
+
+            self.assertLess(time.monotonic() - start, 0.5)
+            self.assertEqual(int(frame.to_ndarray(format="bgr24")[0, 0, 0]), 50)
+        finally:
+            track.stop()
+            signal.close()
+            ring.close()
+
+    async def test_repeats_last_frame_instead_of_black(self):
+        queue = mp.Queue()
+        queue.put(np.full((480, 640, 3), 99, dtype=np.uint8))
+        track = BouncingBallTrack(queue, fps=50)
+        await track.recv()
+        frame = await track.recv()  # nothing new in the queue
+        self.assertEqual(int(frame.to_ndarray(format="bgr24")[0, 0, 0]), 99)
+
+    async def test_i420_ring_frames_skip_conversion(self):
+        ring = FrameRing(width=64, height=48, slots=2, pixel_format="yuv420p")
+        try:
+            frame = blank_frame(64, 48, "yuv420p")
+            frame[:48] = 200
+            ring.publish(frame)
+            track = BouncingBallTrack(ring, fps=10)
+            video_frame = await track.recv()
+
+            self.assertEqual(video_frame.format.name, "yuv420p")
+            self.assertEqual((video_frame.width, video_frame.height), (64, 48))
+            np.testing.assert_array_equal(video_frame.to_ndarray(), frame)
+        finally:
+            ring.close()
+
+    async def test_sends_producer_pts_from_ring(self):
+        ring = FrameRing(width=64, height=48, slots=3)
+        try:
+            track = BouncingBallTrack(ring, fps=10)
+            seq, _, view = ring.begin_write()
+            view[...] = 1
+            ring.commit(seq, 27000)
+            first = await track.recv()
+            second = await track.recv()  # repeat of the same frame
+            self.assertEqual(first.pts, 27000)
+            self.assertGreater(second.pts, first.pts)
+            self.assertEqual(track.producer_pts(0.5), 27000 + 45000)
+        finally:
+            ring.close()
+
+    def test_frame_pool_recycles_video_frames(self):
+        pool = VideoFramePool(64, 48, "bgr24", size=2)
+        frames = [pool.fill(np.full((48, 64, 3), value, dtype=np.uint8)) for value in (1, 2, 3)]
+        self.assertIs(frames[0], frames[2])
+        self.assertIsNot(frames[0], frames[1])
+        self.assertTrue(np.all(frames[2].to_ndarray(format="bgr24") == 3))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,276 @@
+# Constant-memory tracking-error statistics per session and across sessions
+
+import math
+import numpy as np
+
+
+class RunningStats:
+    """Count, mean, variance, min and max in O(1) memory (Welford / Chan)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _combine(self, count, mean, m2, low, high):
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size:
+            mean = float(values.mean())
+            self._combine(values.size, mean, float(((values - mean) ** 2).sum()), float(values.min()),
+                          float(values.max()))
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    def state(self):
+        # An empty accumulator's infinite bounds would serialize as non-standard JSON.
+        empty = not self.count
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": None if empty else self.min, "max": None if empty else self.max}
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        stats._combine(state["count"], state["mean"], state["m2"], state["min"], state["max"])
+        return stats
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def mean_square(self):
+        return self.variance + self.mean * self.mean
+
+
+class TDigest:
+    """Merging t-digest: mergeable quantile sketch with ~`compression` centroids.
+
+    Values are buffered and folded into the centroids in batches, so an
+    add is an append; centroid sizes follow the k1 scale function, which
+    keeps the tails (p99) much finer than the middle.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+        self._buffer_size = 5 * compression
+
+    def add(self, value):
+        self._buffer.append(value)
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def add_many(self, values):
+        self._buffer.extend(np.asarray(values, dtype=np.float64).ravel().tolist())
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def merge(self, other):
+        other._compress()
+        if not other.count:
+            return
+        self._compress()
+        self._fold(other.means, other.weights)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def state(self):
+        self._compress()
+        empty = not len(self.means)
+        return {"compression": self.compression, "means": self.means.tolist(), "weights": self.weights.tolist(),
+                "min": None if empty else self.min, "max": None if empty else self.max}
+
+    @classmethod
+    def from_state(cls, state):
+        digest = cls(state["compression"])
+        if state["means"]:
+            digest._fold(np.asarray(state["means"], dtype=np.float64), np.asarray(state["weights"], dtype=np.float64))
+            digest.min, digest.max = state["min"], state["max"]
+        return digest
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        values = np.asarray(self._buffer, dtype=np.float64)
+        self._buffer = []
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._fold(values, np.ones(len(values)))
+
+    def _fold(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        scale = self.compression / (2 * math.pi)
+        merged_means, merged_weights = [], []
+        mean, weight = means[0], weights[0]
+        done = 0.0  # weight of the centroids already emitted
+        k_left = scale * math.asin(-1.0)
+        for m, w in zip(means[1:].tolist(), weights[1:].tolist()):
+            q = (done + weight + w) / total
+            if scale * math.asin(2 * min(q, 1.0) - 1) - k_left <= 1:
+                weight += w
+                mean += (m - mean) * w / weight
+            else:
+                merged_means.append(mean)
+                merged_weights.append(weight)
+                done += weight
+                k_left = scale * math.asin(2 * done / total - 1)
+                mean, weight = m, w
+        merged_means.append(mean)
+        merged_weights.append(weight)
+        self.means = np.array(merged_means)
+        self.weights = np.array(merged_weights)
+        self.count = int(round(total))
+
+    def quantile(self, q):
+        self._compress()
+        if not self.count:
+            return math.nan
+        centres = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * self.count, np.concatenate([[0.0], centres, [self.count]]),
+                               np.concatenate([[self.min], self.means, [self.max]])))
+
+
+class TrackingStats:
+    """Running accuracy of one session's (or many merged sessions') coords errors."""
+
+    def __init__(self, compression=100):
+        self.x = RunningStats()
+        self.y = RunningStats()
+        self.distance = RunningStats()
+        self.digest = TDigest(compression)
+
+    @property
+    def count(self):
+        return self.distance.count
+
+    def add(self, error_x, error_y):
+        distance = math.hypot(error_x, error_y)
+        self.x.add(error_x)
+        self.y.add(error_y)
+        self.distance.add(distance)
+        self.digest.add(distance)
+
+    def add_many(self, error_x, error_y):
+        distance = np.hypot(error_x, error_y)
+        self.x.add_many(error_x)
+        self.y.add_many(error_y)
+        self.distance.add_many(distance)
+        self.digest.add_many(distance)
+
+    def merge(self, other):
+        self.x.merge(other.x)
+        self.y.merge(other.y)
+        self.distance.merge(other.distance)
+        self.digest.merge(other.digest)
+        return self
+
+    def state(self):
+        """Plain-JSON state; from_state() rebuilds it, e.g. in another process."""
+        return {"x": self.x.state(), "y": self.y.state(), "distance": self.distance.state(),
+                "digest": self.digest.state()}
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls(state["digest"]["compression"])
+        stats.x = RunningStats.from_state(state["x"])
+        stats.y = RunningStats.from_state(state["y"])
+        stats.distance = RunningStats.from_state(state["distance"])
+        stats.digest = TDigest.from_state(state["digest"])
+        return stats
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_x": self.x.mean,
+            "mean_y": self.y.mean,
+            "std_x": math.sqrt(self.x.variance),
+            "std_y": math.sqrt(self.y.variance),
+            "rmse": math.sqrt(self.x.mean_square + self.y.mean_square),
+            "max": self.distance.max,
+            "p50": self.digest.quantile(0.50),
+            "p95": self.digest.quantile(0.95),
+            "p99": self.digest.quantile(0.99),
+        }
+
+
+class TrackingRegistry:
+    """Live TrackingStats per session plus everything from finished sessions."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.finished = TrackingStats()
+        self.finished_sessions = 0
+
+    def session(self, key):
+        stats = self.sessions.get(key)
+        if stats is None:
+            stats = self.sessions[key] = TrackingStats()
+        return stats
+
+    def close(self, key):
+        stats = self.sessions.pop(key, None)
+        if stats is not None:
+            self.finished.merge(stats)
+            self.finished_sessions += 1
+
+    def aggregate(self):
+        total = TrackingStats().merge(self.finished)
+        for stats in self.sessions.values():
+            total.merge(stats)
+        return total
+
+    def state(self):
+        return {"sessions": {str(key): stats.state() for key, stats in self.sessions.items()},
+                "finished": self.finished.state(), "finished_sessions": self.finished_sessions}
+
+    def merge_state(self, state, prefix=""):
+        """Add another registry's state(), its session keys prefixed with `prefix`."""
+        for key, stats in state["sessions"].items():
+            self.sessions[prefix + key] = TrackingStats.from_state(stats)
+        self.finished.merge(TrackingStats.from_state(state["finished"]))
+        self.finished_sessions += state["finished_sessions"]
+        return self
+
+    def summary(self, per_session=True):
+        result = {
+            "active_sessions": len(self.sessions),
+            "finished_sessions": self.finished_sessions,
+            "aggregate": self.aggregate().summary(),
+        }
+        if per_session:
+            result["sessions"] = {str(key): stats.summary() for key, stats in self.sessions.items()}
+        return result
@@ -7,44 +7,202 @@ from aiortc import VideoStreamTrack
 from av.video.frame import VideoFrame
 import time
 from fractions import Fraction
+from frame_ring import FrameRing
+from pipeline_log import get_logger
+from renderer import planes, blank_frame
+from frame_timeline import PTS_RATE
+from metrics import REGISTRY, TRACK_METRICS
 
-#DEBUG = False
+log = get_logger("track")
+metrics = REGISTRY.local(TRACK_METRICS)
+
+
+class VideoFramePool:
+    """A few av.VideoFrames recycled round-robin and filled straight from ndarrays.
+
+    Rows are copied into the frames' own plane buffers, so there is no
+    per-frame VideoFrame allocation, and I420 input needs no colour
+    conversion. aiortc's sender encodes each frame before it asks for the
+    next one, so a small pool is never overwritten while still in use.
+    """
+
+    def __init__(self, width, height, pixel_format="yuv420p", size=4):
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self.frames = [VideoFrame(width, height, pixel_format) for _ in range(size)]
+        self._views = [[self._plane_view(plane, pixel_format) for plane in frame.planes] for frame in self.frames]
+        self._next = 0
+
+    @staticmethod
+    def _plane_view(plane, pixel_format):
+        if pixel_format == "bgr24":
+            return np.ndarray((plane.height, plane.width, 3), np.uint8, buffer=plane, strides=(plane.line_size, 3, 1))
+        return np.ndarray((plane.height, plane.width), np.uint8, buffer=plane, strides=(plane.line_size, 1))
+
+    @classmethod
+    def for_array(cls, array, size=4):
+        if array.ndim == 2:
+            return cls(array.shape[1], array.shape[0] * 2 // 3, "yuv420p", size)
+        return cls(array.shape[1], array.shape[0], "bgr24", size)
+
+    def matches(self, array):
+        if array.ndim == 2:
+            return self.pixel_format == "yuv420p" and array.shape == (self.height * 3 // 2, self.width)
+        return self.pixel_format == "bgr24" and array.shape == (self.height, self.width, 3)
+
+    def fill(self, array):
+        """Copy `array` into the next pooled frame and return it."""
+        index = self._next
+        self._next = (index + 1) % len(self.frames)
+        for view, (source, _) in zip(self._views[index], planes(array, self.pixel_format)):
+            view[...] = source
+        return self.frames[index]
 
 class BouncingBallTrack(VideoStreamTrack):
-    def __init__(self, frame_queue, fps=30):
+    def __init__(self, frame_queue, fps=30, signal=None):
         super().__init__()
-        self.frame_queue = frame_queue
+        self.frame_queue = frame_queue  # mp.Queue, or a FrameRing read through zero-copy views
+        self.ring = frame_queue if isinstance(frame_queue, FrameRing) else None
+        self.signal = signal  # FrameSignal poked by the producer; None falls back to polling
+        self.last_seq = -1
+        self.last_frame = None
         self.fps = fps
         self.frame_duration = 1.0 / fps
         self._start = time.time()
         self.frame_count = 0
+        self.pool = None
+        self.first_pts = None  # pts of the first frame sent; the receiver's mediaTime 0
+        self.last_pts = None
+        self.pts_offset = None  # added to producer pts so they follow any placeholder frames
+        self.frames_skipped = 0  # ring frames the producer published that we never sent
+        self.recv_interval = None  # smoothed seconds between recv() calls, i.e. how fast the sender drains us
+        self._last_recv = None
 
     async def recv(self):
-        print("[Track] recv() called at", time.time())
-        frame = None
+        now = time.monotonic()
+        if self._last_recv is not None:
+            interval = now - self._last_recv
+            self.recv_interval = interval if self.recv_interval is None else 0.8 * self.recv_interval + 0.2 * interval
+        self._last_recv = now
 
-        # Wait longer on the first few frames to let the producer fill
-        max_attempts = 30 if self.frame_count < 5 else 5
-
-        for _ in range(max_attempts):
-            try:
-                frame = self.frame_queue.get_nowait()
-                print("[Track] Frame dequeued with shape:", frame.shape)
-                break
-            except Exception:
-                await asyncio.sleep(self.frame_duration / 5)
+        frame = self.poll_frame()
+        if frame is None:
+            started = time.perf_counter()
+            frame = await self.wait_frame()
+            metrics["ball_track_wait_seconds"].observe(time.perf_counter() - started)
+        else:
+            metrics["ball_track_wait_seconds"].observe(0.0)
+
+        from_ring = self.ring is not None and frame is not None
 
-        # If no frame was available, reuse the previous frame if any
+        # If no frame was available, repeat the last good one, or black before the first
         if frame is None:
-            print("[Track] Queue empty, dropping to black")
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            frame = self.repeat_frame()
 
-        video_frame = VideoFrame.from_ndarray(frame, format="bgr24")
-        video_frame.pts = int((time.time() - self._start) * 90000)
-        video_frame.time_base = Fraction(1, 90000)
+        video_frame = self.to_video_frame(frame)
+        if from_ring and not self.ring.still_valid(self.last_seq):
+            # The producer lapped the ring while we copied; take the newest slot instead.
+            newest = self.poll_frame(latest_only=False)
+            if newest is not None:
+                video_frame = self.to_video_frame(newest)
+        stamped = self.ring.pts(self.last_seq) if self.ring is not None and self.last_seq >= 0 else None
+        video_frame.pts = self.next_pts(stamped)
+        video_frame.time_base = Fraction(1, PTS_RATE)
 
-        if self.frame_count < 5:
-            print(f"[Track] Sending frame {self.frame_count}, PTS={video_frame.pts}")
+        if self.frame_count < 5 and log.debug_on:
+            log.debug("Sending frame", frame=self.frame_count, pts=video_frame.pts)
 
         self.frame_count += 1
+        metrics["ball_track_frames_total"].inc()
         return video_frame
+
+    async def wait_frame(self):
+        """Wait for the producer's next frame, about one frame interval."""
+        # Wait longer on the first few frames to let the producer fill
+        periods = 6 if self.frame_count < 5 else 1
+
+        if self.signal is None:
+            for _ in range(5 * periods):
+                await asyncio.sleep(self.frame_duration / 5)
+                frame = self.poll_frame()
+                if frame is not None:
+                    return frame
+            return None
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + periods * self.frame_duration
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await self.signal.wait(remaining):
+                return None
+            frame = self.poll_frame()
+            if frame is not None:
+                return frame
+
+    def repeat_frame(self):
+        metrics["ball_track_repeated_frames_total"].inc()
+        if self.ring is not None and self.last_seq >= 0:
+            # The newest slot is never reused before the next commit.
+            frame = self.poll_frame(latest_only=False)
+            if frame is not None:
+                return frame
+        if self.last_frame is not None:
+            log.debug_every("repeat", 1.0, "No new frame, repeating the last one", frame=self.frame_count)
+            return self.last_frame
+        log.debug_every("black", 1.0, "No frame yet, sending black", frame=self.frame_count)
+        metrics["ball_track_black_frames_total"].inc()
+        if self.ring is not None:
+            self.last_frame = blank_frame(self.ring.width, self.ring.height, self.ring.pixel_format)
+        else:
+            self.last_frame = blank_frame(640, 480)
+        return self.last_frame
+
+    def next_pts(self, stamped):
+        """The producer's pts for this frame when it has one, kept strictly increasing."""
+        step = max(1, int(self.frame_duration * PTS_RATE))
+        if stamped is None:
+            pts = int((time.time() - self._start) * PTS_RATE)
+        else:
+            if self.pts_offset is None:
+                self.pts_offset = 0 if self.last_pts is None else max(0, self.last_pts + step - stamped)
+            pts = stamped + self.pts_offset
+        if self.last_pts is not None and pts <= self.last_pts:
+            pts = self.last_pts + step  # a repeated frame
+        if self.first_pts is None:
+            self.first_pts = pts
+        self.last_pts = pts
+        return pts
+
+    def producer_pts(self, media_time):
+        """Map the receiver's mediaTime (seconds since our first frame) to producer pts."""
+        if self.first_pts is None or self.pts_offset is None:
+            return None
+        return self.first_pts + int(media_time * PTS_RATE) - self.pts_offset
+
+    def to_video_frame(self, frame):
+        """Copy an ndarray frame (bgr24, or 2-D I420) into a pooled VideoFrame."""
+        if self.pool is None or not self.pool.matches(frame):
+            self.pool = VideoFramePool.for_array(frame)
+        return self.pool.fill(frame)
+
+    def poll_frame(self, latest_only=True):
+        """Return the next frame without blocking, or None if none is ready."""
+        if self.ring is not None:
+            seq, view = self.ring.latest(self.last_seq if latest_only else -1)
+            if seq is None:
+                return None
+            if self.last_seq >= 0:
+                self.frames_skipped += max(0, seq - self.last_seq - 1)
+            self.last_seq = seq
+            return view
+        try:
+            self.last_frame = self.frame_queue.get_nowait()
+        except Exception:
+            return None
+        return self.last_frame
+
+    def stop(self):
+        super().stop()
+        if self.signal is not None:
+            self.signal.detach()